@@ -0,0 +1,98 @@
+"""
+Deferred model side effects for batch operations.
+
+Some post_save handlers do per-row work: a credit sale creates its debt and
+ledger charge, a received purchase order puts its items into stock, and a
+stock edit on a material writes a StockAdjustment. Inside ``deferred()``
+those handlers only record the affected row (see ``defer``); when the
+outermost block exits, each app applies the equivalent effects for all
+recorded rows at once with bulk queries, in the same transaction as the
+writes. Importers, seeders and recalculation jobs can therefore save rows
+one by one, or bulk insert them and call ``defer`` themselves, and still
+leave the books consistent.
+
+    with batch.deferred():
+        for order in orders:
+            order.status = PurchaseOrder.STATUS_RECEIVED
+            order.save()
+
+Appliers are registered by the app that owns the handler::
+
+    @batch.register('purchase_receipts')
+    def receive_orders(pending):  # {order id: payload}
+        ...
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+_appliers = {}
+
+_state = threading.local()
+
+
+def register(effect):
+    """Register the function applying a deferred ``effect``; it gets {id: payload}."""
+    def decorator(apply):
+        _appliers[effect] = apply
+        return apply
+    return decorator
+
+
+def active():
+    """Whether the current thread is inside a ``deferred()`` block."""
+    return getattr(_state, 'depth', 0) > 0
+
+
+def defer(effect, pk, payload=None):
+    """
+    Record ``pk`` for ``effect`` if a batch is active. Returns whether it was.
+
+    Handlers call this first and skip their per-row work when it returns
+    True. The payload recorded the first time an id is deferred is kept,
+    so it should describe the row as it was before the batch changed it.
+    """
+    if not active():
+        return False
+    _state.pending.setdefault(effect, {}).setdefault(pk, payload)
+    return True
+
+
+def apply_pending():
+    """Apply everything deferred so far, effect by effect, until nothing is left."""
+    while _state.pending:
+        effect = next(iter(_state.pending))
+        pending = _state.pending.pop(effect)
+        _appliers[effect](pending)
+
+
+def chunked(keys, size=1000):
+    """Split ``keys`` into sorted lists of at most ``size``, for IN clauses."""
+    keys = sorted(keys)
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+@contextmanager
+def deferred():
+    """
+    Defer registered side effects until the outermost block exits.
+
+    The block runs in a transaction. On success the deferred effects are
+    applied before it commits; on an exception they are dropped along with
+    the rolled-back writes. Nested blocks join the outermost one.
+    """
+    if not active():
+        _state.pending = {}
+    _state.depth = getattr(_state, 'depth', 0) + 1
+    try:
+        with transaction.atomic():
+            yield
+            if _state.depth == 1:
+                apply_pending()
+    finally:
+        _state.depth -= 1
+        if not _state.depth:
+            _state.pending = {}
@@ -95,6 +95,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -194,4 +195,41 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
-AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.User'
+
+# Credit exposure (debts.exposure) and reorder suggestions
+# (inventory.replenishment) are cached and invalidated when their inputs
+# change, so every web worker and management command must share one cache:
+# a per-process LocMemCache would keep serving another worker's stale
+# entries. The database cache needs no extra service; create its table with
+# `python manage.py createcachetable` on deploy. Redis or Memcached work too.
+# Credit limit checks on sales and debts always read the database.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+CREDIT_EXPOSURE_CACHE_TIMEOUT = 3600
+# Debt reminder scheduling and delivery (see debts.reminders). Set
+# DEBT_REMINDER_CADENCE to override debts.reminders.DEFAULT_CADENCE.
+DEBT_REMINDER_SEND_HOUR = 9
+DEBT_REMINDER_TRANSPORT = 'debts.reminders.ConsoleTransport'
+DEBT_REMINDER_FILE_PATH = BASE_DIR / 'debt_reminders.jsonl'
+
+# Month-end customer statements are written under a dated folder here (see generate_statements)
+DEBT_STATEMENTS_DIR = BASE_DIR / 'statements'
+
+# Seconds a stored Idempotency-Key response is replayed (see users.idempotency)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Reorder suggestions (see inventory.replenishment)
+REORDER_SHORT_WINDOW_DAYS = 7
+REORDER_LONG_WINDOW_DAYS = 28
+REORDER_REVIEW_DAYS = 14
+REORDER_SAFETY_FACTOR = 1.65
+REORDER_DEFAULT_LEAD_TIME_DAYS = 7
+
+# Admin changelists above this many rows show the table's estimated row count
+# instead of running COUNT(*) (see debts.admin.EstimatedCountPaginator)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from customers.models import Customer, CustomerLedgerEntry
+from debts.exposure import refresh_exposures
+
+
+class Command(BaseCommand):
+    help = 'Compare cached customer balances with the ledger and optionally rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Rewrite drifted balances from the ledger')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of mismatched customers to list')
+
+    def handle(self, *args, **options):
+        ledger_balance = Coalesce(
+            models.Subquery(
+                CustomerLedgerEntry.objects.balances(),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+            Decimal('0'),
+        )
+        mismatched = Customer.objects.annotate(ledger_balance=ledger_balance).exclude(
+            outstanding_balance=models.F('ledger_balance')
+        )
+
+        count = mismatched.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS('All customer balances match the ledger.'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'{count} customer(s) differ from the ledger:'))
+        rows = mismatched.order_by('pk').values_list('pk', 'name', 'outstanding_balance', 'ledger_balance')
+        for pk, name, cached, ledger in rows[:options['limit']]:
+            self.stdout.write(f'  #{pk} {name}: cached {cached}, ledger {ledger}')
+
+        if options['fix']:
+            customer_ids = list(mismatched.values_list('pk', flat=True))
+            updated = CustomerLedgerEntry.objects.rebuild_balances(Customer.objects.filter(pk__in=customer_ids))
+            refresh_exposures(customer_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt balances for {updated} customer(s).'))
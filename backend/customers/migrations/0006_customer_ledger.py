@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_remove_address_fields'),
+        ('debts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('charge', 'Charge'), ('payment', 'Payment'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Signed change to the balance; positive increases what the customer owes', max_digits=14)),
+                ('running_balance', models.DecimalField(decimal_places=2, help_text='Customer balance after this entry', max_digits=14)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customer_ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='customers.customer')),
+                ('customer_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='customers.customerpayment')),
+                ('debt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='debts.debt')),
+                ('debt_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='debts.debtpayment')),
+            ],
+            options={
+                'verbose_name': 'customer ledger entry',
+                'verbose_name_plural': 'customer ledger entries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['customer', 'id'], name='customers_c_custome_1d5ad0_idx'), models.Index(fields=['created_at'], name='customers_c_created_b4bd67_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_opening_entries(apps, schema_editor):
+    """Carry every existing non-zero balance into the ledger as an opening adjustment."""
+    Customer = apps.get_model('customers', 'Customer')
+    CustomerLedgerEntry = apps.get_model('customers', 'CustomerLedgerEntry')
+
+    customers = Customer.objects.exclude(outstanding_balance=0).values_list('id', 'outstanding_balance')
+    entries = [
+        CustomerLedgerEntry(
+            customer_id=customer_id,
+            entry_type='adjustment',
+            amount=balance,
+            running_balance=balance,
+            description='Opening balance',
+        )
+        for customer_id, balance in customers.iterator(chunk_size=2000)
+    ]
+    CustomerLedgerEntry.objects.bulk_create(entries, batch_size=2000)
+
+
+def remove_opening_entries(apps, schema_editor):
+    CustomerLedgerEntry = apps.get_model('customers', 'CustomerLedgerEntry')
+    CustomerLedgerEntry.objects.filter(description='Opening balance', debt__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_customer_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_entries, remove_opening_entries),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_opening_ledger_balances'),
+        ('sales', '0004_sale_due_date_sale_payment_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerpayment',
+            index=models.Index(fields=['status', 'payment_date'], name='customers_c_status_4ee3fb_idx'),
+        ),
+    ]
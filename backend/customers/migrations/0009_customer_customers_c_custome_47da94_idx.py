@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0008_customerpayment_customers_c_status_4ee3fb_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['customer_type'], name='customers_c_custome_47da94_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 # customers/models.py
 
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.validators import MinValueValidator
@@ -110,13 +113,28 @@ class Customer(models.Model):
         related_name='customer_profile'
     )
     
+    # Cached projections of the customer ledger, written only by CustomerLedgerEntry.objects
+    LEDGER_PROJECTION_FIELDS = ('outstanding_balance', 'current_debt')
+    
     class Meta:
         verbose_name = _('customer')
         verbose_name_plural = _('customers')
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['customer_type']),
+        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        """Save the customer without overwriting the ledger-maintained balance fields."""
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.LEDGER_PROJECTION_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 class CustomerContact(models.Model):
@@ -219,6 +237,177 @@ class CustomerPayment(models.Model):
         verbose_name = _('customer payment')
         verbose_name_plural = _('customer payments')
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['status', 'payment_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.customer.name} - {self.amount} - {self.payment_date}"
+
+
+class CustomerLedgerManager(models.Manager):
+    """Manager that appends ledger entries and keeps the customer balance projection in sync."""
+    
+    def record(self, customer, entry_type, amount, description='', created_by=None,
+               debt=None, debt_payment=None, customer_payment=None, floor=None):
+        """
+        Append a ledger entry and move the customer's balance by ``amount``.
+        
+        Positive amounts increase what the customer owes, negative amounts reduce it.
+        If ``floor`` is given the balance never drops below it; the entry amount is
+        reduced to what could actually be applied. The customer row is locked, so
+        concurrent postings serialize and running balances stay consistent.
+        """
+        amount = Decimal(str(amount))
+        with transaction.atomic(using=self.db):
+            list(Customer.objects.select_for_update().filter(pk=customer.pk).values_list('pk', flat=True))
+            balance = self.filter(customer_id=customer.pk).order_by('-id').values_list(
+                'running_balance', flat=True
+            ).first() or Decimal('0')
+            
+            if floor is not None and balance + amount < floor:
+                amount = min(floor - balance, Decimal('0'))
+            balance += amount
+            
+            entry = self.create(
+                customer_id=customer.pk,
+                entry_type=entry_type,
+                amount=amount,
+                running_balance=balance,
+                description=description,
+                debt=debt,
+                debt_payment=debt_payment,
+                customer_payment=customer_payment,
+                created_by=created_by,
+            )
+            Customer.objects.filter(pk=customer.pk).update(
+                outstanding_balance=balance,
+                current_debt=max(balance, Decimal('0')),
+            )
+        
+        customer.outstanding_balance = balance
+        customer.current_debt = max(balance, Decimal('0'))
+        return entry
+
+    def record_many(self, entries, batch_size=1000):
+        """
+        Append many unsaved entries with one insert, in list order per customer.
+
+        Running balances continue from each customer's cached balance. The
+        customers are locked in primary key order, so this serializes with
+        ``record`` and with other batches.
+        """
+        customer_ids = sorted({entry.customer_id for entry in entries})
+        if not customer_ids:
+            return []
+        with transaction.atomic(using=self.db):
+            balances = dict(
+                Customer.objects.select_for_update().filter(pk__in=customer_ids).order_by('pk')
+                .values_list('pk', 'outstanding_balance')
+            )
+            for entry in entries:
+                balances[entry.customer_id] += Decimal(str(entry.amount))
+                entry.running_balance = balances[entry.customer_id]
+            self.bulk_create(entries, batch_size=batch_size)
+            self.rebuild_balances(Customer.objects.filter(pk__in=customer_ids))
+        return entries
+
+    def balances(self):
+        """Ledger balance per customer id, as a queryset usable in a Subquery."""
+        return self.filter(customer=models.OuterRef('pk')).values('customer').annotate(
+            total=models.Sum('amount')
+        ).values('total')
+    
+    def rebuild_balances(self, customers=None):
+        """Rebuild the cached balance fields from the ledger with one UPDATE."""
+        customers = Customer.objects.all() if customers is None else customers
+        balance = Coalesce(
+            models.Subquery(self.balances(), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            Decimal('0'),
+        )
+        return customers.update(
+            outstanding_balance=balance,
+            current_debt=Greatest(balance, Decimal('0')),
+        )
+
+
+class CustomerLedgerEntry(models.Model):
+    """Append-only record of every change to a customer's balance."""
+    
+    CHARGE = 'charge'
+    PAYMENT = 'payment'
+    ADJUSTMENT = 'adjustment'
+    
+    ENTRY_TYPE_CHOICES = [
+        (CHARGE, _('Charge')),
+        (PAYMENT, _('Payment')),
+        (ADJUSTMENT, _('Adjustment')),
+    ]
+    
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        help_text=_('Signed change to the balance; positive increases what the customer owes')
+    )
+    running_balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        help_text=_('Customer balance after this entry')
+    )
+    description = models.CharField(max_length=255, blank=True)
+    
+    # Source documents
+    debt = models.ForeignKey(
+        'debts.Debt',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    debt_payment = models.ForeignKey(
+        'debts.DebtPayment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    customer_payment = models.ForeignKey(
+        CustomerPayment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='customer_ledger_entries'
+    )
+    
+    objects = CustomerLedgerManager()
+    
+    class Meta:
+        verbose_name = _('customer ledger entry')
+        verbose_name_plural = _('customer ledger entries')
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['customer', 'id']),
+            models.Index(fields=['created_at']),
+        ]
     
     def __str__(self):
-        return f"{self.customer.name} - {self.amount} - {self.payment_date}"
\ No newline at end of file
+        return f"{self.customer.name} - {self.entry_type} - {self.amount}"
+    
+    def save(self, *args, **kwargs):
+        """Ledger entries are immutable once written."""
+        if not self._state.adding:
+            raise ValueError(_('Ledger entries cannot be modified; record an adjustment instead.'))
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError(_('Ledger entries cannot be deleted; record an adjustment instead.'))
@@ -1,7 +1,7 @@
 # customers/serializers.py
 
 from rest_framework import serializers
-from .models import Customer, CustomerContact, CustomerShippingAddress, CustomerPayment
+from .models import Customer, CustomerContact, CustomerShippingAddress, CustomerPayment, CustomerLedgerEntry
 
 
 class CustomerContactSerializer(serializers.ModelSerializer):
@@ -42,6 +42,19 @@ class CustomerPaymentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class CustomerLedgerEntrySerializer(serializers.ModelSerializer):
+    """Serializer for CustomerLedgerEntry model."""
+    
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = CustomerLedgerEntry
+        fields = ['id', 'customer', 'entry_type', 'amount', 'running_balance', 
+                  'description', 'debt', 'debt_payment', 'customer_payment', 
+                  'created_at', 'created_by', 'created_by_name']
+        read_only_fields = fields
+
+
 class CustomerSerializer(serializers.ModelSerializer):
     """Serializer for Customer model."""
     
@@ -53,7 +66,8 @@ class CustomerSerializer(serializers.ModelSerializer):
                   'debt_limit', 'debt_status', 'status', 'registration_date', 'notes', 
                   'created_at', 'updated_at', 'created_by', 'updated_by', 'user_account']
         read_only_fields = ['created_at', 'updated_at', 'created_by', 
-                            'updated_by', 'registration_date', 'outstanding_balance']
+                            'updated_by', 'registration_date', 'outstanding_balance',
+                            'current_debt']
     
     def create(self, validated_data):
         """Create a new customer and record who created it."""
@@ -1,3 +1,67 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from .models import Customer, CustomerLedgerEntry
+
+
+class CustomerLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='cashier@example.com', password='x', role=User.ADMIN)
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+
+    def post(self, entry_type, amount, **kwargs):
+        return CustomerLedgerEntry.objects.record(self.customer, entry_type, Decimal(amount), **kwargs)
+
+    def test_postings_keep_running_balances_and_the_cached_balance(self):
+        stale = Customer.objects.get(pk=self.customer.pk)
+        self.post(CustomerLedgerEntry.CHARGE, '100.00')
+        self.post(CustomerLedgerEntry.PAYMENT, '-30.00')
+        capped = self.post(CustomerLedgerEntry.PAYMENT, '-200.00', floor=0)
+        self.assertEqual(capped.amount, Decimal('-70.00'))
+
+        balances = CustomerLedgerEntry.objects.filter(customer=self.customer).order_by('id')
+        self.assertEqual(
+            list(balances.values_list('running_balance', flat=True)),
+            [Decimal('100.00'), Decimal('70.00'), Decimal('0.00')],
+        )
+
+        # A save from a copy loaded before the postings leaves the balance alone
+        self.post(CustomerLedgerEntry.CHARGE, '25.00')
+        stale.name = 'Builder Ltd'
+        stale.save()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.name, self.customer.outstanding_balance), ('Builder Ltd', Decimal('25.00')))
+
+    def test_entries_cannot_be_changed(self):
+        entry = self.post(CustomerLedgerEntry.CHARGE, '10.00')
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_reconcile_rebuilds_drifted_balances(self):
+        self.post(CustomerLedgerEntry.CHARGE, '40.00')
+        Customer.objects.filter(pk=self.customer.pk).update(outstanding_balance=Decimal('5.00'))
+
+        stdout = io.StringIO()
+        call_command('reconcile_customer_ledger', '--fix', stdout=stdout)
+        self.assertIn('1 customer(s) differ from the ledger', stdout.getvalue())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_balance, Decimal('40.00'))
+
+    def test_ledger_endpoint_lists_entries_newest_first(self):
+        self.post(CustomerLedgerEntry.CHARGE, '40.00')
+        self.post(CustomerLedgerEntry.PAYMENT, '-15.00')
+        client = APIClient()
+        client.force_authenticate(self.user)
 
-# Create your tests here.
+        response = client.get(f'/api/customers/customers/{self.customer.pk}/ledger/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['running_balance'] for row in rows], [Decimal('25.00'), Decimal('40.00')])
@@ -7,11 +7,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
 
 from .models import (
-    Customer, CustomerContact, CustomerShippingAddress, CustomerPayment
+    Customer, CustomerContact, CustomerShippingAddress, CustomerPayment, CustomerLedgerEntry
 )
 from .serializers import (
-    CustomerSerializer, CustomerDetailSerializer,
-    CustomerContactSerializer, CustomerShippingAddressSerializer, CustomerPaymentSerializer
+    CustomerSerializer, CustomerDetailSerializer, CustomerContactSerializer,
+    CustomerShippingAddressSerializer, CustomerPaymentSerializer, CustomerLedgerEntrySerializer
 )
 from users.permissions import IsAdminOrManagerOrReadOnly
 from users.models import UserActivity
@@ -85,6 +85,17 @@ class CustomerViewSet(viewsets.ModelViewSet):
         serializer = CustomerPaymentSerializer(payments, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def ledger(self, request, pk=None):
+        """Get the ledger entries (charges, payments, adjustments) for a customer."""
+        entries = CustomerLedgerEntry.objects.filter(customer_id=pk).select_related('created_by')
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            serializer = CustomerLedgerEntrySerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = CustomerLedgerEntrySerializer(entries, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def all(self, request):
         """Get all customers without pagination for dropdowns and exports."""
@@ -150,9 +161,17 @@ class CustomerPaymentViewSet(viewsets.ModelViewSet):
         # Adjust customer's outstanding balance if payment completed
         if payment.status == CustomerPayment.COMPLETED:
             customer = payment.customer
-            customer.outstanding_balance = max(customer.outstanding_balance - payment.amount, 0)
+            CustomerLedgerEntry.objects.record(
+                customer,
+                CustomerLedgerEntry.PAYMENT,
+                -payment.amount,
+                description=f"Customer payment #{payment.id}",
+                created_by=self.request.user,
+                customer_payment=payment,
+                floor=0,
+            )
             customer.updated_by = self.request.user
-            customer.save()
+            customer.save(update_fields=['updated_by', 'updated_at'])
         UserActivity.objects.create(
             user=self.request.user,
             action="Customer Payment Recorded",
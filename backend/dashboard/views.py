@@ -6,8 +6,9 @@ from rest_framework.response import Response
 from django.db.models import Sum, F, Count, Q
 from django.utils import timezone
 
+from inventory import costing
 from inventory.models import Material, Category
-from sales.models import SaleItem
+from sales.models import MaterialDailySales, SaleItem
 from purchases.models import PurchaseOrderItem
 from expenses.models import Expense
 from users.models import UserActivity
@@ -16,6 +17,10 @@ from customers.models import Customer
 from suppliers.models import Supplier
 from debts.models import Debt
 
+# Days covered by each top-selling-materials window
+LEADERBOARD_WINDOWS = {'7d': 7, '30d': 30, '365d': 365}
+
+
 class DashboardViewSet(viewsets.ViewSet):
     """
     Dashboard endpoints:
@@ -29,28 +34,55 @@ class DashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='inventory-value')
     def inventory_value(self, request):
         """
-        Total stock value = sum(quantity_in_stock * price_per_unit)
+        Stock on hand at cost, read from the maintained material valuations.
+        total_inventory_value is the FIFO value; average_value uses weighted-average cost.
         """
-        total = Material.objects.aggregate(
-            total_value=Sum(F('quantity_in_stock') * F('price_per_unit'))
-        )['total_value'] or 0
-        return Response({'total_inventory_value': total})
-    # Aggregating on `quantity_in_stock` and `price_per_unit` fields :contentReference[oaicite:0]{index=0}
+        valuation = costing.warehouse_valuation()
+        return Response({
+            'total_inventory_value': valuation['fifo_value'],
+            'fifo_value': valuation['fifo_value'],
+            'average_value': valuation['average_value'],
+            'total_quantity': valuation['quantity'],
+            'materials': valuation['materials'],
+        })
 
     @action(detail=False, methods=['get'], url_path='top-selling-materials')
     def top_selling_materials(self, request):
         """
-        Top-selling materials by quantity.
-        Optional ?limit=<n> (default 5)
+        Top-selling materials by quantity, read from the daily sales aggregate.
+        Optional ?limit=<n> (default 5), ?window=7d|30d|365d (default: all time)
+        and ?category=<id> (includes its subcategories).
         """
         limit = int(request.query_params.get('limit', 5))
-        qs = SaleItem.objects.values(
-                'material__id', 'material__name'
-            ).annotate(
-                total_sold=Sum('quantity'),
-                revenue=Sum(F('quantity') * F('price'))
-            ).order_by('-total_sold')[:limit]
-        return Response(qs)
+        window = request.query_params.get('window')
+        since = None
+        if window:
+            if window not in LEADERBOARD_WINDOWS:
+                return Response(
+                    {'detail': f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}."},
+                    status=400
+                )
+            since = timezone.localdate() - timezone.timedelta(days=LEADERBOARD_WINDOWS[window] - 1)
+
+        category_ids = None
+        category = request.query_params.get('category')
+        if category:
+            if not category.isdigit():
+                return Response({'detail': 'category must be an id.'}, status=400)
+            category_ids = list(
+                Category.objects.filter(Q(id=category) | Q(parent_id=category)).values_list('id', flat=True)
+            )
+
+        rows = MaterialDailySales.objects.leaderboard(since, category_ids, limit)
+        return Response([
+            {
+                'material__id': row['material_id'],
+                'material__name': row['material__name'],
+                'total_sold': row['total_sold'],
+                'revenue': row['total_revenue'],
+            }
+            for row in rows
+        ])
 
     @action(detail=False, methods=['get'], url_path='recent-activities')
     def recent_activities(self, request):
@@ -1,20 +1,90 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import Debt, DebtPayment, DebtReminder
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the row count of an unfiltered changelist from the
+    database's table statistics instead of running COUNT(*).
+
+    The estimate is only used above ADMIN_ESTIMATED_COUNT_THRESHOLD rows and
+    on MySQL and PostgreSQL; filtered lists and small tables are counted
+    exactly, as are other backends.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = table_row_estimate(self.object_list.model._meta.db_table)
+            if estimate is not None and estimate > getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000):
+                return estimate
+        return super().count
+
+
+def table_row_estimate(table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class InterestRateFilter(admin.SimpleListFilter):
+    """Fixed interest bands, so the filter never scans for distinct rates."""
+    title = 'interest rate'
+    parameter_name = 'interest'
+
+    def lookups(self, request, model_admin):
+        return [('none', 'No interest'), ('low', 'Up to 5%'), ('high', 'Above 5%')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'none':
+            return queryset.filter(interest_rate=0)
+        if self.value() == 'low':
+            return queryset.filter(interest_rate__gt=0, interest_rate__lte=5)
+        if self.value() == 'high':
+            return queryset.filter(interest_rate__gt=5)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: estimated
+    counts, no second count for "show all", and no date hierarchy (its
+    distinct-date queries scan the whole table); date filters are plain
+    list filters on indexed columns instead.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(Debt)
-class DebtAdmin(admin.ModelAdmin):
+class DebtAdmin(LargeTableAdmin):
     list_display = [
         'id', 'customer', 'total_amount', 'paid_amount', 'remaining_amount_display',
         'status_display', 'priority_display', 'due_date', 'days_overdue_display', 'created_at'
     ]
     list_filter = [
         'status', 'priority', 'due_date', 'created_at', 
-        'customer__customer_type', 'interest_rate'
+        'customer__customer_type', InterestRateFilter
     ]
+    list_select_related = ['customer']
     search_fields = [
         'customer__name', 'customer__phone', 'customer__email',
         'notes', 'payment_terms'
@@ -43,18 +113,23 @@ class DebtAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
-    date_hierarchy = 'created_at'
     ordering = ['-created_at']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            remaining=F('total_amount') - F('paid_amount')
+        )
+    
     def remaining_amount_display(self, obj):
-        amount = obj.remaining_amount
+        amount = getattr(obj, 'remaining', obj.remaining_amount)
         if amount > 0:
             return format_html(
-                '<span style="color: #e74c3c; font-weight: bold;">${:.2f}</span>',
-                amount
+                '<span style="color: #e74c3c; font-weight: bold;">${}</span>',
+                f'{amount:.2f}'
             )
         return format_html('<span style="color: #27ae60;">$0.00</span>')
     remaining_amount_display.short_description = 'Remaining Amount'
+    remaining_amount_display.admin_order_field = 'remaining'
     
     def status_display(self, obj):
         colors = {
@@ -104,14 +179,14 @@ class DebtAdmin(admin.ModelAdmin):
         else:
             color = '#e74c3c'
         return format_html(
-            '<span style="color: {}; font-weight: bold;">{:.1f}%</span>',
-            color, percentage
+            '<span style="color: {}; font-weight: bold;">{}%</span>',
+            color, f'{percentage:.1f}'
         )
     payment_percentage_display.short_description = 'Payment %'
 
 
 @admin.register(DebtPayment)
-class DebtPaymentAdmin(admin.ModelAdmin):
+class DebtPaymentAdmin(LargeTableAdmin):
     list_display = [
         'id', 'debt_link', 'customer', 'amount', 'payment_method',
         'payment_date', 'status_display', 'received_by'
@@ -120,6 +195,7 @@ class DebtPaymentAdmin(admin.ModelAdmin):
         'payment_method', 'status', 'payment_date',
         'customer__customer_type', 'received_by'
     ]
+    list_select_related = ['customer', 'received_by']
     search_fields = [
         'customer__name', 'debt__id', 'reference_number',
         'receipt_number', 'notes'
@@ -137,13 +213,13 @@ class DebtPaymentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
-    date_hierarchy = 'payment_date'
     ordering = ['-payment_date']
     
     def debt_link(self, obj):
-        url = reverse('admin:debts_debt_change', args=[obj.debt.pk])
-        return format_html('<a href="{}">{}</a>', url, f'Debt #{obj.debt.id}')
+        url = reverse('admin:debts_debt_change', args=[obj.debt_id])
+        return format_html('<a href="{}">{}</a>', url, f'Debt #{obj.debt_id}')
     debt_link.short_description = 'Debt'
+    debt_link.admin_order_field = 'debt'
     
     def status_display(self, obj):
         colors = {
@@ -161,7 +237,7 @@ class DebtPaymentAdmin(admin.ModelAdmin):
 
 
 @admin.register(DebtReminder)
-class DebtReminderAdmin(admin.ModelAdmin):
+class DebtReminderAdmin(LargeTableAdmin):
     list_display = [
         'id', 'debt_link', 'customer', 'reminder_type',
         'scheduled_date', 'sent_date', 'status_display'
@@ -170,6 +246,7 @@ class DebtReminderAdmin(admin.ModelAdmin):
         'reminder_type', 'status', 'scheduled_date',
         'sent_date', 'customer__customer_type'
     ]
+    list_select_related = ['customer']
     search_fields = [
         'customer__name', 'debt__id', 'message', 'notes'
     ]
@@ -186,13 +263,13 @@ class DebtReminderAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
-    date_hierarchy = 'scheduled_date'
     ordering = ['-scheduled_date']
     
     def debt_link(self, obj):
-        url = reverse('admin:debts_debt_change', args=[obj.debt.pk])
-        return format_html('<a href="{}">{}</a>', url, f'Debt #{obj.debt.id}')
+        url = reverse('admin:debts_debt_change', args=[obj.debt_id])
+        return format_html('<a href="{}">{}</a>', url, f'Debt #{obj.debt_id}')
     debt_link.short_description = 'Debt'
+    debt_link.admin_order_field = 'debt'
     
     def status_display(self, obj):
         colors = {
@@ -0,0 +1,124 @@
+"""
+Lump-sum payment allocation.
+
+A customer payment that covers several debts is split across their open
+debts, oldest due first or highest priority score first. Everything happens
+in one transaction with a fixed number of queries however many debts are
+settled: the open debts are locked and read once, the per-debt DebtPayment
+rows are bulk created, the debts are bulk updated, and the customer ledger
+gets a single entry for the whole payment.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from customers.models import Customer, CustomerLedgerEntry
+
+from .models import Debt, DebtPayment
+
+
+OPEN_STATUSES = [Debt.PENDING, Debt.PARTIALLY_PAID, Debt.OVERDUE]
+
+OLDEST = 'oldest'
+PRIORITY = 'priority'
+
+ORDERINGS = {
+    OLDEST: ['due_date', 'created_at', 'id'],
+    PRIORITY: ['-priority_score', 'due_date', 'id'],
+}
+
+
+class AllocationError(ValueError):
+    """Raised when a payment cannot be allocated as requested."""
+
+
+def plan_allocation(debts, amount):
+    """Split ``amount`` over (id, remaining) pairs in order. Returns [(debt id, amount)]."""
+    allocations, left = [], amount
+    for debt_id, remaining in debts:
+        if left <= 0:
+            break
+        applied = min(remaining, left)
+        if applied > 0:
+            allocations.append((debt_id, applied))
+            left -= applied
+    return allocations
+
+
+@transaction.atomic
+def allocate_payment(customer, amount, received_by=None, payment_method=DebtPayment.CASH,
+                     strategy=OLDEST, debt_ids=None, reference_number=None, notes=None,
+                     payment_date=None):
+    """
+    Pay ``amount`` off the customer's open debts in ``strategy`` order.
+
+    ``debt_ids`` limits the allocation to those debts. Raises AllocationError
+    when there is nothing to pay or the amount exceeds what is owed.
+    Returns [(debt, amount applied)] with the updated debts.
+    """
+    amount = Decimal(str(amount))
+    payment_date = payment_date or timezone.now()
+    if strategy not in ORDERINGS:
+        raise AllocationError(f"strategy must be one of {', '.join(ORDERINGS)}.")
+
+    # Customer first, then its open debts: the order DebtPayment.save and the ledger lock in
+    list(Customer.objects.select_for_update().filter(pk=customer.pk).values_list('pk', flat=True))
+    debts = Debt.objects.select_for_update().filter(
+        customer_id=customer.pk, is_deleted=False, status__in=OPEN_STATUSES
+    )
+    if debt_ids is not None:
+        debts = debts.filter(id__in=debt_ids)
+    debts = {debt.id: debt for debt in debts.order_by(*ORDERINGS[strategy])}
+
+    outstanding = sum((debt.remaining_amount for debt in debts.values()), Decimal('0'))
+    if outstanding <= 0:
+        raise AllocationError('Customer has no open debts to pay.')
+    if amount > outstanding:
+        raise AllocationError(
+            f"Payment amount (${amount}) exceeds the open debt balance (${outstanding})."
+        )
+
+    allocations = plan_allocation(((pk, debt.remaining_amount) for pk, debt in debts.items()), amount)
+    DebtPayment.objects.bulk_create(
+        [
+            DebtPayment(
+                debt_id=debt_id,
+                customer_id=customer.pk,
+                amount=applied,
+                payment_method=payment_method,
+                payment_date=payment_date,
+                reference_number=reference_number,
+                notes=notes,
+                status=DebtPayment.COMPLETED,
+                received_by=received_by,
+            )
+            for debt_id, applied in allocations
+        ],
+        batch_size=1000,
+    )
+
+    now = timezone.now()
+    updated = []
+    for debt_id, applied in allocations:
+        debt = debts[debt_id]
+        debt.paid_amount += applied
+        debt.status = Debt.PAID if debt.paid_amount >= debt.total_amount else Debt.PARTIALLY_PAID
+        debt.last_payment_date = payment_date
+        debt.updated_by = received_by
+        debt.updated_at = now
+        updated.append((debt, applied))
+    Debt.objects.bulk_update(
+        [debt for debt, _ in updated],
+        ['paid_amount', 'status', 'last_payment_date', 'updated_by', 'updated_at'],
+        batch_size=500,
+    )
+
+    CustomerLedgerEntry.objects.record(
+        customer,
+        CustomerLedgerEntry.PAYMENT,
+        -amount,
+        description=f"Payment of {amount} allocated across {len(allocations)} debts",
+        created_by=received_by,
+    )
+    return updated
@@ -0,0 +1,177 @@
+"""
+Cached per-customer credit exposure.
+
+Exposure is what a customer already owes (the ledger balance) plus credit
+sales that have not been turned into debts yet. Figures are kept in the
+cache and refreshed write-through from debt, payment, sale and ledger
+writes, so credit displays read a single cache entry instead of recomputing
+from the database.
+
+The cache is only as shared as the configured backend: on a per-process
+backend such as LocMemCache another worker's writes reach it only when its
+entries expire. Decisions that grant credit therefore go through
+check_credit_limit, which reads the database under the customer's row lock.
+"""
+import threading
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from customers.models import Customer
+from sales.models import Sale
+
+from .models import Debt
+
+
+CACHE_KEY = 'credit_exposure:{}'
+
+ZERO = Decimal('0')
+
+# Customers whose exposure changed in the current thread's open transaction.
+_pending = threading.local()
+
+
+def _cache_timeout():
+    """Keep entries at most until midnight, when debts can become overdue without a write."""
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min))
+    timeout = getattr(settings, 'CREDIT_EXPOSURE_CACHE_TIMEOUT', 3600)
+    return max(1, min(timeout, int((midnight - now).total_seconds())))
+
+
+class CreditLimitExceeded(Exception):
+    """Raised when new credit would take a customer over their credit limit."""
+
+    def __init__(self, exposure, amount, what='sale'):
+        self.exposure = exposure
+        self.amount = amount
+        super().__init__(
+            f"This {what} would exceed customer's credit limit of ${float(exposure['credit_limit']):,.2f}. "
+            f"Current exposure: ${float(exposure['total_exposure']):,.2f}, "
+            f"{what.capitalize()} amount: ${float(amount):,.2f}, "
+            f"Available credit: ${float(exposure['available_credit']):,.2f}"
+        )
+
+
+def compute_exposures(customer_ids, lock=False):
+    """
+    Compute exposure for many customers with three grouped queries.
+
+    With ``lock`` the customer rows are read with SELECT ... FOR UPDATE,
+    which must happen inside a transaction.
+    """
+    customer_ids = list(customer_ids)
+    today = timezone.now().date()
+
+    overdue = dict(
+        Debt.objects.filter(customer_id__in=customer_ids, is_deleted=False, due_date__lt=today)
+        .exclude(status__in=[Debt.PAID, Debt.CANCELLED])
+        .values('customer_id')
+        .annotate(total=Sum(F('total_amount') - F('paid_amount')))
+        .values_list('customer_id', 'total')
+    )
+    pending_orders = dict(
+        Sale.objects.filter(
+            customer_id__in=customer_ids,
+            payment_method=Sale.CREDIT,
+            payment_status=Sale.PENDING,
+            debt__isnull=True,
+        )
+        .values('customer_id')
+        .annotate(total=Sum('total_amount'))
+        .values_list('customer_id', 'total')
+    )
+
+    exposures = {}
+    customers = Customer.objects.filter(id__in=customer_ids)
+    if lock:
+        customers = customers.select_for_update().order_by('id')
+    customers = customers.values_list('id', 'name', 'credit_limit', 'outstanding_balance')
+    for customer_id, name, credit_limit, outstanding_balance in customers:
+        pending = pending_orders.get(customer_id) or ZERO
+        total = outstanding_balance + pending
+        exposures[customer_id] = {
+            'customer_id': customer_id,
+            'customer_name': name,
+            'credit_limit': credit_limit,
+            'outstanding_balance': outstanding_balance,
+            'overdue_amount': overdue.get(customer_id) or ZERO,
+            'pending_orders': pending,
+            'total_exposure': total,
+            'available_credit': credit_limit - total,
+        }
+    return exposures
+
+
+def refresh_exposures(customer_ids):
+    """Recompute and store exposure for the given customers, dropping entries for deleted ones."""
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return {}
+    exposures = compute_exposures(customer_ids)
+    cache.set_many({CACHE_KEY.format(pk): exposure for pk, exposure in exposures.items()}, _cache_timeout())
+    missing = customer_ids - exposures.keys()
+    if missing:
+        cache.delete_many([CACHE_KEY.format(pk) for pk in missing])
+    return exposures
+
+
+def get_exposures(customer_ids):
+    """Exposure per customer id, served from the cache and filling misses in one batch."""
+    keys = {pk: CACHE_KEY.format(pk) for pk in set(customer_ids)}
+    cached = cache.get_many(keys.values())
+    exposures = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    misses = keys.keys() - exposures.keys()
+    if misses:
+        exposures.update(refresh_exposures(misses))
+    return exposures
+
+
+def get_exposure(customer_id):
+    """Exposure for one customer, or None if the customer does not exist."""
+    return get_exposures([customer_id]).get(customer_id)
+
+
+def schedule_refresh(customer_id):
+    """
+    Refresh a customer's exposure once the current transaction commits.
+
+    Ids are collected so a transaction touching the same customer many times
+    recomputes it once; a rolled-back transaction leaves the cache untouched.
+    """
+    if not hasattr(_pending, 'customer_ids'):
+        _pending.customer_ids = set()
+    _pending.customer_ids.add(customer_id)
+    transaction.on_commit(_flush_pending_refresh)
+
+
+def _flush_pending_refresh():
+    customer_ids = getattr(_pending, 'customer_ids', None)
+    if customer_ids:
+        _pending.customer_ids = set()
+        refresh_exposures(customer_ids)
+
+
+def exceeds_credit_limit(exposure, amount):
+    """Whether adding ``amount`` would take a customer with a credit limit over it."""
+    return exposure['credit_limit'] > 0 and exposure['total_exposure'] + amount > exposure['credit_limit']
+
+
+def check_credit_limit(customer_id, amount, what='sale'):
+    """
+    Lock the customer row and raise CreditLimitExceeded if ``amount`` more
+    credit would exceed the limit. Returns the exposure read.
+
+    Reads the database rather than the cache, so concurrent credit sales
+    for one customer are checked one after the other against committed
+    figures. Call it inside the transaction that writes the credit.
+    """
+    exposure = compute_exposures([customer_id], lock=True).get(customer_id)
+    if exposure and exceeds_credit_limit(exposure, amount):
+        raise CreditLimitExceeded(exposure, amount, what)
+    return exposure
@@ -0,0 +1,375 @@
+"""
+Bulk import of historical debts and payments.
+
+Branch ledgers are migrated from CSV or XLSX files, read row by row so a
+large file is never held in memory. Customers are resolved by phone or tax
+id from one preloaded lookup, and debts and payments are written in chunks
+with bulk inserts, which skip the per-row cascades of DebtPayment.save and
+the post_save handlers. Once every row is in, the derived figures are
+recomputed set-based: paid amount, last payment date and status of the
+imported debts, one ledger charge and one ledger payment per customer, and
+the cached customer balances.
+
+Debts file columns: reference, customer_phone or customer_tax_id,
+total_amount, due_date and optionally interest_rate, payment_terms, notes.
+Payments file columns: debt_reference, amount, payment_date and optionally
+payment_method, reference_number, receipt_number, notes. Payments may refer
+to debts imported earlier; a debt whose reference already exists is skipped.
+
+A payment is identified by its debt, date, amount, reference number and
+receipt number, so a payments file can be re-run: rows already recorded are
+skipped. Payments to cancelled debts, and payments beyond what is still
+outstanding on a debt, are rejected.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from building_material_management import batch
+from customers.models import Customer, CustomerLedgerEntry
+
+from .exposure import refresh_exposures
+from .models import Debt, DebtPayment
+
+
+BATCH_SIZE = 5000
+
+# Row errors kept in the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+PAYMENT_METHODS = {value for value, _ in DebtPayment.PAYMENT_METHOD_CHOICES}
+
+REFERENCE_LENGTH = Debt._meta.get_field('external_reference').max_length
+
+
+class ImportFileError(ValueError):
+    """Raised when an import file cannot be read at all."""
+
+
+class RowError(ValueError):
+    """Raised for a row that cannot be imported; the row is skipped."""
+
+
+def read_rows(fileobj, name):
+    """Yield each data row of a CSV or XLSX file as a dict keyed by lower-cased header."""
+    extension = os.path.splitext(name or '')[1].lower()
+    if extension == '.xlsx':
+        rows = _xlsx_rows(fileobj)
+    elif extension in ('.csv', '.txt', ''):
+        rows = _csv_rows(fileobj)
+    else:
+        raise ImportFileError(f"Unsupported file type '{extension}'; use .csv or .xlsx.")
+
+    header = next(rows, None)
+    if not header:
+        return
+    header = [str(column or '').strip().lower() for column in header]
+    for values in rows:
+        if any(value not in (None, '') for value in values):
+            yield dict(zip(header, values))
+
+
+def _csv_rows(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        return csv.reader(fileobj)
+    return csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files requires openpyxl; export the sheet as CSV instead.')
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    return workbook.worksheets[0].iter_rows(values_only=True)
+
+
+def _text(row, column):
+    value = row.get(column)
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store phone numbers and ids as numbers
+        value = int(value)
+    return str(value).strip()
+
+
+def _decimal(row, column, required=True):
+    value = _text(row, column)
+    if not value:
+        if required:
+            raise RowError(f"{column} is required.")
+        return None
+    try:
+        return Decimal(value.replace(',', ''))
+    except InvalidOperation:
+        raise RowError(f"{column} '{value}' is not a number.")
+
+
+def _date(row, column):
+    value = row.get(column)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(row, column)
+    parsed = parse_date(text[:10]) if text else None
+    if parsed is None:
+        raise RowError(f"{column} '{text}' is not a date (YYYY-MM-DD).")
+    return parsed
+
+
+def _datetime(row, column):
+    value = row.get(column)
+    if not isinstance(value, datetime):
+        text = _text(row, column)
+        value = parse_datetime(text) if text else None
+        if value is None:
+            value = datetime.combine(_date(row, column), time.min)
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+class DebtImporter:
+    """
+    Imports one debts file and/or one payments file in a single transaction.
+
+    Call import_debts and import_payments (in that order, so payments can
+    refer to debts in the same upload), then finish to recompute balances.
+    Bad rows are skipped and reported in ``errors``.
+    """
+
+    def __init__(self, user=None, batch_size=BATCH_SIZE, source='import'):
+        self.user = user
+        self.batch_size = batch_size
+        self.source = source
+        self.charges = {}
+        self.payments = {}
+        self.counts = {'debts': 0, 'debts_skipped': 0, 'payments': 0, 'payments_skipped': 0, 'errors': 0}
+        self.errors = []
+        # Debts referenced by payments: reference -> (id, customer id, status),
+        # what is still outstanding on each, and how often each payment key is
+        # already recorded. Loaded once per debt, before any of its payments.
+        self.debts = {}
+        self.outstanding = {}
+        self.recorded = {}
+
+        self.by_phone, self.by_tax_id = {}, {}
+        for pk, phone, alternative_phone, tax_id in Customer.objects.order_by('id').values_list(
+            'id', 'phone', 'alternative_phone', 'tax_id'
+        ):
+            # The oldest customer wins when a number is shared
+            for number in (phone, alternative_phone):
+                if number:
+                    self.by_phone.setdefault(number.strip(), pk)
+            if tax_id:
+                self.by_tax_id.setdefault(tax_id.strip(), pk)
+
+    def _error(self, kind, line, message):
+        self.counts['errors'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'file': kind, 'row': line, 'error': message})
+
+    def _chunks(self, rows):
+        chunk = []
+        # Line 1 is the header
+        for line, row in enumerate(rows, start=2):
+            chunk.append((line, row))
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _customer_id(self, row):
+        phone, tax_id = _text(row, 'customer_phone'), _text(row, 'customer_tax_id')
+        if not phone and not tax_id:
+            raise RowError('customer_phone or customer_tax_id is required.')
+        customer_id = self.by_tax_id.get(tax_id) if tax_id else None
+        if customer_id is None and phone:
+            customer_id = self.by_phone.get(phone)
+        if customer_id is None:
+            raise RowError(f"No customer with phone '{phone}' or tax id '{tax_id}'.")
+        return customer_id
+
+    def import_debts(self, rows):
+        for chunk in self._chunks(rows):
+            references = {_text(row, 'reference') for _, row in chunk} - {''}
+            seen = set(Debt.objects.filter(external_reference__in=references).values_list(
+                'external_reference', flat=True
+            ))
+            debts = []
+            for line, row in chunk:
+                try:
+                    reference = _text(row, 'reference')
+                    if not reference:
+                        raise RowError('reference is required.')
+                    if len(reference) > REFERENCE_LENGTH:
+                        raise RowError(f"reference is longer than {REFERENCE_LENGTH} characters.")
+                    if reference in seen:
+                        self.counts['debts_skipped'] += 1
+                        continue
+                    total = _decimal(row, 'total_amount')
+                    if total <= 0:
+                        raise RowError('total_amount must be positive.')
+                    debt = Debt(
+                        customer_id=self._customer_id(row),
+                        external_reference=reference,
+                        total_amount=total,
+                        due_date=_date(row, 'due_date'),
+                        interest_rate=_decimal(row, 'interest_rate', required=False) or 0,
+                        payment_terms=_text(row, 'payment_terms') or None,
+                        notes=_text(row, 'notes') or f"Imported from {self.source}",
+                        created_by=self.user,
+                        updated_by=self.user,
+                    )
+                except RowError as e:
+                    self._error('debts', line, str(e))
+                    continue
+                seen.add(reference)
+                debts.append(debt)
+                self.charges[debt.customer_id] = self.charges.get(debt.customer_id, 0) + total
+            Debt.objects.bulk_create(debts, batch_size=self.batch_size)
+            self.counts['debts'] += len(debts)
+
+    def _load_debts(self, references):
+        """Load the debts behind ``references`` and the payments already recorded against them."""
+        debt_ids = []
+        for reference, pk, customer_id, status, total, paid in Debt.objects.filter(
+            external_reference__in=references, is_deleted=False
+        ).values_list('external_reference', 'id', 'customer_id', 'status', 'total_amount', 'paid_amount'):
+            self.debts[reference] = (pk, customer_id, status)
+            self.outstanding[pk] = total - paid
+            debt_ids.append(pk)
+        for key in DebtPayment.objects.filter(debt_id__in=debt_ids, is_deleted=False).values_list(
+            'debt_id', 'payment_date', 'amount', 'reference_number', 'receipt_number'
+        ):
+            self.recorded[key] = self.recorded.get(key, 0) + 1
+
+    def import_payments(self, rows):
+        for chunk in self._chunks(rows):
+            references = {_text(row, 'debt_reference') for _, row in chunk} - {''}
+            self._load_debts(references - self.debts.keys())
+            payments = []
+            for line, row in chunk:
+                try:
+                    reference = _text(row, 'debt_reference')
+                    if reference not in self.debts:
+                        raise RowError(f"No imported debt with reference '{reference}'.")
+                    debt_id, customer_id, status = self.debts[reference]
+                    amount = _decimal(row, 'amount')
+                    if amount <= 0:
+                        raise RowError('amount must be positive.')
+                    method = _text(row, 'payment_method').lower() or DebtPayment.CASH
+                    if method not in PAYMENT_METHODS:
+                        raise RowError(f"Unknown payment_method '{method}'.")
+                    payment = DebtPayment(
+                        debt_id=debt_id,
+                        customer_id=customer_id,
+                        amount=amount,
+                        payment_method=method,
+                        payment_date=_datetime(row, 'payment_date'),
+                        reference_number=_text(row, 'reference_number') or None,
+                        receipt_number=_text(row, 'receipt_number') or None,
+                        notes=_text(row, 'notes') or None,
+                        status=DebtPayment.COMPLETED,
+                        received_by=self.user,
+                    )
+                    key = (debt_id, payment.payment_date, amount, payment.reference_number, payment.receipt_number)
+                    if self.recorded.get(key):
+                        # Already imported; identical payments in one file are
+                        # matched one for one, so only the extra ones go in
+                        self.recorded[key] -= 1
+                        self.counts['payments_skipped'] += 1
+                        continue
+                    if status == Debt.CANCELLED:
+                        raise RowError(f"Debt '{reference}' is cancelled.")
+                    if amount > self.outstanding[debt_id]:
+                        raise RowError(
+                            f"amount {amount} is more than the {self.outstanding[debt_id]} "
+                            f"outstanding on debt '{reference}'."
+                        )
+                except RowError as e:
+                    self._error('payments', line, str(e))
+                    continue
+                self.outstanding[debt_id] -= amount
+                payments.append(payment)
+                self.payments[customer_id] = self.payments.get(customer_id, 0) + amount
+            DebtPayment.objects.bulk_create(payments, batch_size=self.batch_size)
+            self.counts['payments'] += len(payments)
+
+    def finish(self):
+        """Recompute imported debts and post the imported totals to the customer ledgers."""
+        customer_ids = sorted(self.charges.keys() | self.payments.keys())
+        for start in range(0, len(customer_ids), self.batch_size):
+            chunk = customer_ids[start:start + self.batch_size]
+            recompute_debts(Debt.objects.filter(customer_id__in=chunk, external_reference__isnull=False))
+            self._post_to_ledger(chunk)
+        transaction.on_commit(lambda: refresh_exposures(customer_ids))
+        return {**self.counts, 'customers': len(customer_ids), 'error_details': self.errors}
+
+    def _post_to_ledger(self, customer_ids):
+        entries = []
+        for customer_id in customer_ids:
+            for entry_type, totals, sign, label in (
+                (CustomerLedgerEntry.CHARGE, self.charges, 1, 'debts'),
+                (CustomerLedgerEntry.PAYMENT, self.payments, -1, 'payments'),
+            ):
+                if totals.get(customer_id):
+                    entries.append(CustomerLedgerEntry(
+                        customer_id=customer_id,
+                        entry_type=entry_type,
+                        amount=sign * totals[customer_id],
+                        description=f"Imported {label} from {self.source}"[:255],
+                        created_by=self.user,
+                    ))
+        CustomerLedgerEntry.objects.record_many(entries, batch_size=self.batch_size)
+
+
+def recompute_debts(debts, today=None):
+    """Set paid amount, last payment date and status of ``debts`` from their payments."""
+    today = today or timezone.localdate()
+    completed = DebtPayment.objects.filter(
+        debt=OuterRef('pk'), status=DebtPayment.COMPLETED, is_deleted=False
+    ).values('debt')
+    money = DecimalField(max_digits=14, decimal_places=2)
+    debts.update(
+        paid_amount=Coalesce(
+            Subquery(completed.annotate(total=Sum('amount')).values('total'), output_field=money),
+            Value(Decimal('0')), output_field=money,
+        ),
+        last_payment_date=Subquery(completed.annotate(last=Max('payment_date')).values('last')),
+    )
+    # A separate UPDATE, so the status reads the new paid amount on every backend
+    debts.exclude(status=Debt.CANCELLED).update(status=Case(
+        When(paid_amount__gte=F('total_amount'), then=Value(Debt.PAID)),
+        When(paid_amount__gt=0, then=Value(Debt.PARTIALLY_PAID)),
+        When(due_date__lt=today, then=Value(Debt.OVERDUE)),
+        default=Value(Debt.PENDING),
+    ))
+
+
+def import_files(debts_file=None, payments_file=None, user=None, batch_size=BATCH_SIZE):
+    """
+    Import a debts file and/or a payments file, given as (file object, name) pairs.
+
+    Everything is written in one transaction, inside batch.deferred() so the
+    side effects of any saved rows are applied in bulk at the end. Returns a summary with the
+    numbers of rows imported and skipped and the first row errors.
+    """
+    files = [upload for upload in (debts_file, payments_file) if upload]
+    source = ', '.join(os.path.basename(name) for _, name in files) or 'import'
+    with batch.deferred():
+        importer = DebtImporter(user=user, batch_size=batch_size, source=source)
+        if debts_file:
+            importer.import_debts(read_rows(*debts_file))
+        if payments_file:
+            importer.import_payments(read_rows(*payments_file))
+        return importer.finish()
@@ -0,0 +1,88 @@
+"""
+Whole-book interest accrual.
+
+Debt.calculate_interest works one instance at a time. The functions here load
+the rates and due dates of every debt into NumPy arrays to find the debts
+that are overdue, then apply the same simple-interest rule to each of them in
+Decimal, rounded half up to the cent, so a stored snapshot always equals what
+Debt.calculate_interest returns for the same day.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Debt
+
+
+CENT = Decimal('0.01')
+
+ZERO = Decimal('0.00')
+
+
+def simple_interest(remaining, annual_rate, days_overdue):
+    """Interest on ``remaining`` at ``annual_rate`` percent for ``days_overdue`` days, in cents."""
+    if remaining <= 0 or days_overdue <= 0:
+        return ZERO
+    return (remaining * annual_rate / 100 / 365 * days_overdue).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def load_book(queryset=None):
+    """Ids, remaining amounts, annual rates, due dates and current snapshots of the open debts."""
+    queryset = Debt.objects.filter(is_deleted=False) if queryset is None else queryset
+    rows = list(queryset.exclude(status__in=[Debt.PAID, Debt.CANCELLED]).values_list(
+        'id', 'total_amount', 'paid_amount', 'interest_rate', 'due_date', 'accrued_interest'
+    ))
+    if not rows:
+        return np.array([], dtype=np.int64), [], [], np.array([], dtype='datetime64[D]'), []
+
+    ids, totals, paid, rates, due_dates, accrued = zip(*rows)
+    return (
+        np.array(ids, dtype=np.int64),
+        [total - amount for total, amount in zip(totals, paid)],
+        list(rates),
+        np.array(due_dates, dtype='datetime64[D]'),
+        list(accrued),
+    )
+
+
+def compute_interest(remaining, rates, due_dates, as_of):
+    """Interest per debt as a list of Decimals; only overdue debts with a rate are computed."""
+    days_overdue = np.maximum((np.datetime64(as_of, 'D') - due_dates).astype(np.int64), 0)
+    interest = [ZERO] * len(remaining)
+    for i in np.flatnonzero(days_overdue):
+        if rates[i]:
+            interest[i] = simple_interest(remaining[i], rates[i], int(days_overdue[i]))
+    return interest
+
+
+def portfolio_interest(queryset=None, as_of=None):
+    """Total interest accrued across the book as of a date, computed live."""
+    as_of = as_of or timezone.now().date()
+    _, remaining, rates, due_dates, _ = load_book(queryset)
+    return sum(compute_interest(remaining, rates, due_dates, as_of), ZERO)
+
+
+def accrue_interest(queryset=None, as_of=None, batch_size=5000):
+    """
+    Persist each debt's accrued interest as of a date.
+
+    Only rows whose snapshot changed are written. Paid and cancelled debts
+    keep whatever interest was last accrued on them.
+    Returns (debts updated, total accrued interest).
+    """
+    as_of = as_of or timezone.now().date()
+    ids, remaining, rates, due_dates, accrued = load_book(queryset)
+    interest = compute_interest(remaining, rates, due_dates, as_of)
+
+    changed = [i for i, (new, old) in enumerate(zip(interest, accrued)) if new != old]
+    with transaction.atomic():
+        for start in range(0, len(changed), batch_size):
+            Debt.objects.bulk_update(
+                [Debt(id=int(ids[i]), accrued_interest=interest[i]) for i in changed[start:start + batch_size]],
+                ['accrued_interest'],
+                batch_size=1000,
+            )
+
+    return len(changed), sum(interest, ZERO)
@@ -0,0 +1,29 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from debts.interest import accrue_interest
+
+
+class Command(BaseCommand):
+    help = 'Snapshot accrued interest on every open debt (intended to run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Accrual date as YYYY-MM-DD (default: today)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format.')
+
+        started = time.perf_counter()
+        updated, total = accrue_interest(as_of=as_of, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Accrued interest updated on {updated} debts; portfolio total {total:,.2f} ({elapsed:.2f}s).'
+        ))
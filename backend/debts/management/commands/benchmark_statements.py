@@ -0,0 +1,39 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.models import Customer
+from debts.pdf import render_customer_statements
+from debts.statements import customer_statements
+
+
+class Command(BaseCommand):
+    help = 'Measure customer statement throughput (statements per second), serially and in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=200,
+                            help='Number of customers with debts to render statements for')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        customers = list(
+            Customer.objects.filter(debts__is_deleted=False).distinct().order_by('id')[:options['customers']]
+        )
+        if not customers:
+            raise CommandError('No customers with debts found. Run generate_benchmark_data first.')
+
+        started = time.perf_counter()
+        statements = customer_statements(customers)
+        self.report('build data', len(statements), time.perf_counter() - started)
+
+        for label, workers in (('render serial', 1), (f"render {options['workers']} workers", options['workers'])):
+            started = time.perf_counter()
+            size = sum(len(pdf) for _, pdf in render_customer_statements(statements, workers=workers))
+            self.report(label, len(statements), time.perf_counter() - started, size)
+
+    def report(self, label, count, elapsed, size=None):
+        line = f'{label:<22} {count} statements in {elapsed:.2f}s ({count / elapsed:,.1f}/s)'
+        if size is not None:
+            line += f', {size / 1024 / 1024:.1f} MB'
+        self.stdout.write(line)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from debts.reminders import dispatch_due_reminders, get_transport
+
+
+class Command(BaseCommand):
+    help = 'Send due debt reminders through the configured transport'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Reminders claimed per transaction')
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches (default: until none are due)')
+        parser.add_argument('--transport',
+                            help='Dotted path of a transport class (default: DEBT_REMINDER_TRANSPORT)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running as a worker, polling for due reminders')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        transport = get_transport(options['transport'])
+        while True:
+            sent, failed = dispatch_due_reminders(transport, options['batch_size'], options['max_batches'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} reminders, {failed} failed.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+from django.utils.text import slugify
+
+from customers.models import Customer
+from debts.allocation import OPEN_STATUSES
+from debts.pdf import render_customer_statements
+from debts.statements import customer_statements
+
+
+CENT = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Write month-end PDF statements for every customer with open debts, with a manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help='Base directory (default: settings.DEBT_STATEMENTS_DIR)')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Customers loaded and rendered per batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        # Statements show live balances, so they are always dated today
+        as_of = timezone.localdate()
+
+        base = Path(options['output_dir'] or getattr(settings, 'DEBT_STATEMENTS_DIR', 'statements'))
+        output = base / as_of.isoformat()
+        output.mkdir(parents=True, exist_ok=True)
+
+        open_debts = Q(debts__is_deleted=False, debts__status__in=OPEN_STATUSES)
+        debtors = Customer.objects.annotate(
+            open_debts=Count('debts', filter=open_debts),
+            outstanding=Sum(
+                F('debts__total_amount') - F('debts__paid_amount'), filter=open_debts,
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        ).filter(open_debts__gt=0).order_by('id')
+
+        started, entries, size, outstanding = time.perf_counter(), [], 0, Decimal('0')
+        generated_at = timezone.now()
+        executor = ProcessPoolExecutor(max_workers=options['workers']) if options['workers'] > 1 else None
+        try:
+            last_id = 0
+            while True:
+                # Keyset pages keep memory bounded by the chunk size
+                chunk = list(debtors.filter(id__gt=last_id)[:options['chunk_size']])
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+                customers = {customer.id: customer for customer in chunk}
+
+                statements = customer_statements(chunk, generated_at=generated_at)
+                for customer_id, pdf in render_customer_statements(statements, workers=1, executor=executor):
+                    customer = customers[customer_id]
+                    filename = f"statement_{as_of:%Y%m}_{customer_id}_{slugify(customer.name)[:40]}.pdf"
+                    (output / filename).write_bytes(pdf)
+                    size += len(pdf)
+                    customer_outstanding = customer.outstanding.quantize(CENT)
+                    outstanding += customer_outstanding
+                    entries.append({
+                        'customer_id': customer_id,
+                        'customer_name': customer.name,
+                        'file': filename,
+                        'open_debts': customer.open_debts,
+                        'outstanding': str(customer_outstanding),
+                        'bytes': len(pdf),
+                    })
+                self.stdout.write(f'{len(entries)} statements written...')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        manifest = {
+            'as_of': as_of.isoformat(),
+            'generated_at': generated_at.isoformat(),
+            'statements': len(entries),
+            'total_outstanding': str(outstanding),
+            'seconds': round(elapsed, 2),
+            'files': entries,
+        }
+        (output / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+        rate = len(entries) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(entries)} statements ({size / 1024 / 1024:.1f} MB) to {output} '
+            f'in {elapsed:.2f}s ({rate:,.1f}/s).'
+        ))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from debts.imports import BATCH_SIZE, ImportFileError, import_files
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import historical debts and payments from CSV or XLSX files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debts', help='Debts file (.csv or .xlsx)')
+        parser.add_argument('--payments', help='Payments file (.csv or .xlsx)')
+        parser.add_argument('--user', help='Email of the user recorded as creator of the imported rows')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not options['debts'] and not options['payments']:
+            raise CommandError('Give --debts and/or --payments.')
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']}.")
+
+        files = {}
+        try:
+            for kind in ('debts', 'payments'):
+                if options[kind]:
+                    files[kind] = (open(options[kind], 'rb'), options[kind])
+            started = time.perf_counter()
+            summary = import_files(
+                debts_file=files.get('debts'),
+                payments_file=files.get('payments'),
+                user=user,
+                batch_size=options['batch_size'],
+            )
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+        finally:
+            for fileobj, _ in files.values():
+                fileobj.close()
+        elapsed = time.perf_counter() - started
+
+        for error in summary['error_details']:
+            self.stderr.write(f"{error['file']} row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['debts']} debts ({summary['debts_skipped']} already present) and "
+            f"{summary['payments']} payments ({summary['payments_skipped']} already present) "
+            f"for {summary['customers']} customers; "
+            f"{summary['errors']} rows rejected ({elapsed:.2f}s)."
+        ))
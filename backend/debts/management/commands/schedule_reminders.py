@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from debts.reminders import schedule_reminders
+
+
+class Command(BaseCommand):
+    help = 'Create debt reminders due under the configured cadence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Scheduling date as YYYY-MM-DD (default: today)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the reminders that would be created without saving them')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format.')
+
+        created = schedule_reminders(as_of, options['batch_size'], options['dry_run'])
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {created} reminders.'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from debts.priority import changed_debts, last_run, score_debts
+
+
+class Command(BaseCommand):
+    help = 'Recompute collections priority scores for open debts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only rescore debts touched since the last run, scored over a day ago, '
+                                 'or fallen due since they were scored')
+        parser.add_argument('--keep-priority', action='store_true',
+                            help='Only save scores; leave priorities (including ones set by hand) unchanged')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = None
+        if options['incremental']:
+            since = last_run()
+            if since is not None:
+                queryset = changed_debts(since)
+                self.stdout.write(f'Rescoring debts changed since {since:%Y-%m-%d %H:%M:%S}.')
+
+        started = time.perf_counter()
+        scored, changed = score_debts(queryset, options['batch_size'], not options['keep_priority'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} debts; {changed} priorities changed ({elapsed:.2f}s).'
+        ))
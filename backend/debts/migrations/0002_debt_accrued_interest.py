@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='accrued_interest',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Interest accrued as of the last accrual run', max_digits=14),
+        ),
+    ]
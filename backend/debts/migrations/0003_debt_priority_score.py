@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_opening_ledger_balances'),
+        ('debts', '0002_debt_accrued_interest'),
+        ('sales', '0004_sale_due_date_sale_payment_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='priority_score',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Collections score from 0 to 100, set by the score_debts job', max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='debt',
+            name='priority_scored_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['status', 'priority_score'], name='debts_debt_status_c444eb_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_opening_ledger_balances'),
+        ('debts', '0003_debt_priority_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debtpayment',
+            index=models.Index(fields=['status', 'payment_date'], name='debts_debtp_status_431f64_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('debts', '0004_debtpayment_status_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debt',
+            name='external_reference',
+            field=models.CharField(blank=True, help_text='Reference of the debt in the ledger it was imported from', max_length=100, null=True, unique=True),
+        ),
+    ]
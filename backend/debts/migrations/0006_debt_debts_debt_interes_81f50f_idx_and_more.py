@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0009_customer_customers_c_custome_47da94_idx'),
+        ('debts', '0005_debt_external_reference'),
+        ('sales', '0007_populate_material_daily_sales'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debt',
+            index=models.Index(fields=['interest_rate'], name='debts_debt_interes_81f50f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtreminder',
+            index=models.Index(fields=['scheduled_date'], name='debts_debtr_schedul_475b77_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtreminder',
+            index=models.Index(fields=['status', 'scheduled_date'], name='debts_debtr_status_8051ed_idx'),
+        ),
+    ]
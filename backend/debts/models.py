@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
@@ -6,7 +6,8 @@ from django.utils import timezone
 from datetime import timedelta
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from customers.models import Customer
+from building_material_management import batch
+from customers.models import Customer, CustomerLedgerEntry
 from sales.models import Sale
 
 
@@ -78,6 +79,13 @@ class Debt(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)],
         help_text=_('Annual interest rate percentage')
     )
+    accrued_interest = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text=_('Interest accrued as of the last accrual run')
+    )
     
     # Dates
     created_at = models.DateTimeField(auto_now_add=True)
@@ -101,12 +109,28 @@ class Debt(models.Model):
         choices=PRIORITY_CHOICES, 
         default=MEDIUM
     )
+    priority_score = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_('Collections score from 0 to 100, set by the score_debts job')
+    )
+    priority_scored_at = models.DateTimeField(null=True, blank=True, editable=False)
     payment_terms = models.CharField(
         max_length=255, 
         blank=True, 
         null=True,
         help_text=_('Special payment terms or conditions')
     )
+    external_reference = models.CharField(
+        max_length=100,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text=_('Reference of the debt in the ledger it was imported from')
+    )
     notes = models.TextField(
         blank=True, 
         null=True,
@@ -139,6 +163,8 @@ class Debt(models.Model):
             models.Index(fields=['customer', 'status']),
             models.Index(fields=['due_date', 'status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'priority_score']),
+            models.Index(fields=['interest_rate']),
         ]
     
     def __str__(self):
@@ -168,17 +194,16 @@ class Debt(models.Model):
             return 0
         return (self.paid_amount / self.total_amount) * 100
     
-    def calculate_interest(self):
-        """Calculate interest amount based on time overdue."""
-        if not self.is_overdue or self.interest_rate == 0:
+    def calculate_interest(self, as_of=None):
+        """Calculate interest amount based on time overdue (see debts.interest for whole-book accrual)."""
+        as_of = as_of or timezone.now().date()
+        days_overdue = (as_of - self.due_date).days
+        if days_overdue <= 0 or self.interest_rate == 0 or self.status in [self.PAID, self.CANCELLED]:
             return 0
         
-        # Simple interest calculation
-        days_overdue = self.days_overdue
-        yearly_rate = self.interest_rate / 100
-        daily_rate = yearly_rate / 365
-        interest = self.remaining_amount * daily_rate * days_overdue
-        return round(interest, 2)
+        # Simple interest, rounded half up like the whole-book accrual
+        from .interest import simple_interest
+        return simple_interest(self.remaining_amount, self.interest_rate, days_overdue)
     
     def update_status(self):
         """Update debt status based on payment amount and due date."""
@@ -367,40 +392,73 @@ class DebtPayment(models.Model):
             models.Index(fields=['debt', 'status']),
             models.Index(fields=['customer', 'payment_date']),
             models.Index(fields=['payment_date']),
+            models.Index(fields=['status', 'payment_date']),
         ]
     
     def __str__(self):
         return f"Payment #{self.id} - {self.customer.name} - ${self.amount}"
     
+    def lock_debt(self):
+        """
+        Lock the customer row, then the debt row, and return the debt as stored.
+        
+        This is the order allocate_payment and the customer ledger lock in. It is
+        taken before the payment row is written, because inserting the payment
+        also locks the debt row for its foreign key check.
+        """
+        list(Customer.objects.select_for_update().filter(pk=self.customer_id).values_list('pk', flat=True))
+        self.debt = Debt.objects.select_for_update().get(pk=self.debt_id)
+        return self.debt
+    
     def save(self, *args, **kwargs):
         """Override save to update debt status and customer balance."""
         is_new = self.pk is None
         
-        # Call the original save method
-        super().save(*args, **kwargs)
-        
-        # Update debt paid amount and status
-        if is_new and self.status == self.COMPLETED:
-            self.debt.paid_amount += self.amount
-            self.debt.last_payment_date = self.payment_date
-            self.debt.update_status()
+        with transaction.atomic():
+            applies = is_new and self.status == self.COMPLETED
+            if applies:
+                self.lock_debt()
+            
+            # Call the original save method
+            super().save(*args, **kwargs)
             
-            # Update customer outstanding balance
-            self.customer.outstanding_balance -= self.amount
-            self.customer.save()
+            # Update debt paid amount and status from the locked, current row
+            if applies:
+                self.debt.paid_amount += self.amount
+                self.debt.last_payment_date = self.payment_date
+                self.debt.update_status()
+                
+                # Post the payment to the customer ledger
+                CustomerLedgerEntry.objects.record(
+                    self.customer,
+                    CustomerLedgerEntry.PAYMENT,
+                    -self.amount,
+                    description=f"Payment #{self.id} for debt #{self.debt_id}",
+                    created_by=self.received_by,
+                    debt=self.debt,
+                    debt_payment=self,
+                )
     
     def delete(self, *args, **kwargs):
         """Override delete to update debt and customer balance."""
-        if self.status == self.COMPLETED:
-            # Reverse the payment effects
-            self.debt.paid_amount -= self.amount
-            self.debt.update_status()
+        with transaction.atomic():
+            if self.status == self.COMPLETED:
+                # Reverse the payment effects on the locked, current debt row
+                debt = self.lock_debt()
+                debt.paid_amount -= self.amount
+                debt.update_status()
+                
+                # Reverse the payment in the customer ledger
+                CustomerLedgerEntry.objects.record(
+                    self.customer,
+                    CustomerLedgerEntry.ADJUSTMENT,
+                    self.amount,
+                    description=f"Reversal of payment #{self.id} for debt #{self.debt_id}",
+                    created_by=self.updated_by,
+                    debt=debt,
+                )
             
-            # Update customer outstanding balance
-            self.customer.outstanding_balance += self.amount
-            self.customer.save()
-        
-        super().delete(*args, **kwargs)
+            return super().delete(*args, **kwargs)
 
 
 class DebtReminder(models.Model):
@@ -474,17 +532,30 @@ class DebtReminder(models.Model):
         verbose_name = _('debt reminder')
         verbose_name_plural = _('debt reminders')
         ordering = ['-scheduled_date']
+        indexes = [
+            models.Index(fields=['scheduled_date']),
+            models.Index(fields=['status', 'scheduled_date']),
+        ]
     
     def __str__(self):
         return f"Reminder for {self.customer.name} - {self.reminder_type} - {self.scheduled_date}"
 
 
+# Deferred by create_debt_for_credit_sale inside building_material_management.batch.deferred()
+CREDIT_SALE_DEBTS = 'credit_sale_debts'
+
+
 # Signal handlers for automatic debt creation
 @receiver(post_save, sender=Sale)
 def create_debt_for_credit_sale(sender, instance, created, **kwargs):
     """
     Automatically create a debt record when a credit sale is created.
     """
+    if instance.payment_method == Sale.CREDIT and batch.defer(
+        CREDIT_SALE_DEBTS, instance.pk, getattr(instance, '_debt_fields', {})
+    ):
+        return None
+    
     if created and instance.payment_method == Sale.CREDIT:
         # Check if debt doesn't already exist (to prevent duplicates)
         if not hasattr(instance, 'debt'):
@@ -493,7 +564,8 @@ def create_debt_for_credit_sale(sender, instance, created, **kwargs):
             if not due_date:
                 due_date = (instance.sale_date + timedelta(days=30)).date()
             
-            # Create the debt record
+            # Create the debt record; sales.orders passes extra terms in _debt_fields
+            debt_fields = getattr(instance, '_debt_fields', {})
             debt = Debt.objects.create(
                 customer=instance.customer,
                 sale=instance,
@@ -501,14 +573,22 @@ def create_debt_for_credit_sale(sender, instance, created, **kwargs):
                 due_date=due_date,
                 status=Debt.PENDING,
                 priority=Debt.MEDIUM,
+                interest_rate=debt_fields.get('interest_rate', 0),
+                payment_terms=debt_fields.get('payment_terms') or None,
                 created_by=instance.created_by,
                 updated_by=instance.created_by,
-                notes=f"Auto-created debt for credit sale #{instance.id}"
+                notes=debt_fields.get('notes') or f"Auto-created debt for credit sale #{instance.id}"
             )
             
-            # Update customer outstanding balance
-            instance.customer.outstanding_balance += instance.total_amount
-            instance.customer.save()
+            # Charge the customer ledger
+            CustomerLedgerEntry.objects.record(
+                instance.customer,
+                CustomerLedgerEntry.CHARGE,
+                instance.total_amount,
+                description=f"Credit sale #{instance.id}",
+                created_by=instance.created_by,
+                debt=debt,
+            )
             
             return debt
     
@@ -519,13 +599,112 @@ def create_debt_for_credit_sale(sender, instance, created, **kwargs):
             # Update debt amount if sale total changed
             if debt.total_amount != instance.total_amount:
                 # Adjust customer balance
-                balance_adjustment = instance.total_amount - debt.total_amount
-                instance.customer.outstanding_balance += balance_adjustment
-                instance.customer.save()
+                CustomerLedgerEntry.objects.record(
+                    instance.customer,
+                    CustomerLedgerEntry.ADJUSTMENT,
+                    instance.total_amount - debt.total_amount,
+                    description=f"Credit sale #{instance.id} total changed",
+                    created_by=instance.updated_by,
+                    debt=debt,
+                )
                 
                 # Update debt
                 debt.total_amount = instance.total_amount
                 debt.updated_by = instance.updated_by
                 debt.update_status()
     
-    return None
\ No newline at end of file
+    return None
+
+
+@batch.register(CREDIT_SALE_DEBTS)
+def apply_credit_sale_debts(pending):
+    """
+    Batch equivalent of create_debt_for_credit_sale for {sale id: debt fields}.
+
+    Credit sales without a debt get one, with its ledger charge; sales whose
+    total changed since their debt was written move the debt and post the
+    difference as an adjustment.
+    """
+    from .exposure import schedule_refresh
+    from .imports import recompute_debts
+    
+    for sale_ids in batch.chunked(pending):
+        sales = Sale.objects.filter(id__in=sale_ids, payment_method=Sale.CREDIT).select_related('debt')
+        new, changed = [], []
+        for sale in sales:
+            if not hasattr(sale, 'debt'):
+                new.append(sale)
+            elif sale.debt.total_amount != sale.total_amount:
+                changed.append(sale)
+        
+        Debt.objects.bulk_create([
+            Debt(
+                customer_id=sale.customer_id,
+                sale=sale,
+                total_amount=sale.total_amount,
+                due_date=sale.due_date or (sale.sale_date + timedelta(days=30)).date(),
+                status=Debt.PENDING,
+                priority=Debt.MEDIUM,
+                interest_rate=pending[sale.pk].get('interest_rate', 0),
+                payment_terms=pending[sale.pk].get('payment_terms') or None,
+                created_by_id=sale.created_by_id,
+                updated_by_id=sale.created_by_id,
+                notes=pending[sale.pk].get('notes') or f"Auto-created debt for credit sale #{sale.pk}",
+            )
+            for sale in new
+        ], batch_size=1000)
+        # bulk_create does not return primary keys on every backend
+        debt_ids = dict(Debt.objects.filter(sale__in=new).values_list('sale_id', 'id'))
+        entries = [
+            CustomerLedgerEntry(
+                customer_id=sale.customer_id,
+                entry_type=CustomerLedgerEntry.CHARGE,
+                amount=sale.total_amount,
+                description=f"Credit sale #{sale.pk}",
+                created_by_id=sale.created_by_id,
+                debt_id=debt_ids[sale.pk],
+            )
+            for sale in new
+        ]
+        
+        for sale in changed:
+            entries.append(CustomerLedgerEntry(
+                customer_id=sale.customer_id,
+                entry_type=CustomerLedgerEntry.ADJUSTMENT,
+                amount=sale.total_amount - sale.debt.total_amount,
+                description=f"Credit sale #{sale.pk} total changed",
+                created_by_id=sale.updated_by_id,
+                debt_id=sale.debt.pk,
+            ))
+            sale.debt.total_amount = sale.total_amount
+            sale.debt.updated_by_id = sale.updated_by_id
+            sale.debt.updated_at = timezone.now()
+        if changed:
+            Debt.objects.bulk_update(
+                [sale.debt for sale in changed], ['total_amount', 'updated_by', 'updated_at'], batch_size=1000
+            )
+            recompute_debts(Debt.objects.filter(sale__in=changed))
+        
+        CustomerLedgerEntry.objects.record_many(entries)
+        for customer_id in {entry.customer_id for entry in entries}:
+            schedule_refresh(customer_id)
+
+
+# Write-through refresh of cached credit exposure (see debts.exposure)
+@receiver(post_save, sender=Debt)
+@receiver(post_save, sender=Sale)
+@receiver(post_save, sender=CustomerLedgerEntry)
+def refresh_customer_credit_exposure(sender, instance, **kwargs):
+    """Refresh the customer's cached credit exposure after debt, sale and balance changes."""
+    if sender is Sale and instance.payment_method != Sale.CREDIT:
+        return
+    from .exposure import schedule_refresh
+    schedule_refresh(instance.customer_id)
+
+
+@receiver(post_save, sender=Customer)
+def refresh_credit_exposure_for_customer(sender, instance, created, **kwargs):
+    """Refresh cached credit exposure when a customer's limit or details change."""
+    if not created:
+        from .exposure import schedule_refresh
+        schedule_refresh(instance.pk)
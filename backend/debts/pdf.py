@@ -0,0 +1,284 @@
+"""
+PDF rendering for debt reports and statements.
+
+Paragraph and table styles are built once at import time and shared by
+every document. The render functions only take plain dicts (see
+debts.statements) and return PDF bytes, so they need no database access
+and can run in worker processes: render_customer_statements spreads a
+batch of statements over a process pool.
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+COMPANY_NAME = 'NurBuild Management System'
+
+STYLES = getSampleStyleSheet()
+NORMAL = STYLES['Normal']
+HEADING = STYLES['Heading2']
+TITLE = ParagraphStyle(
+    'StatementTitle',
+    parent=STYLES['Heading1'],
+    fontSize=18,
+    textColor=colors.darkblue,
+    spaceAfter=20,
+    alignment=1,  # Center alignment
+)
+
+
+def table_style(header_color, body_color, header_size, body_size, header_padding=12, *extra):
+    """Header row on ``header_color``, body on ``body_color``, gridded and centred."""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), header_padding),
+        ('BACKGROUND', (0, 1), (-1, -1), body_color),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), body_size),
+        *extra,
+    ])
+
+
+SUMMARY_TABLE = table_style(colors.darkblue, colors.lightgrey, 12, 10)
+MATERIALS_TABLE = table_style(colors.darkgreen, colors.lightgreen, 10, 8)
+ITEMS_TABLE = table_style(colors.darkgreen, colors.lightgreen, 10, 9)
+DEBTS_TABLE = table_style(
+    colors.darkorange, colors.lightyellow, 8, 7, 8, ('VALIGN', (0, 0), (-1, -1), 'MIDDLE')
+)
+PAYMENTS_TABLE = table_style(colors.darkblue, colors.lightblue, 9, 8, 8)
+
+
+def money(value, places=2):
+    return f"${value:,.{places}f}"
+
+
+def _date(value, fmt):
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d')
+    return value.strftime(fmt)
+
+
+def _table(rows, widths, style):
+    table = Table(rows, colWidths=[width * inch for width in widths])
+    table.setStyle(style)
+    return table
+
+
+def _section(title, table):
+    return [Paragraph(title, HEADING), Spacer(1, 12), table, Spacer(1, 20)]
+
+
+def _footer(label, generated_at):
+    return Paragraph(f"{label} generated on {generated_at} | {COMPANY_NAME}", NORMAL)
+
+
+def _build(elements):
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75 * inch).build(elements)
+    return buffer.getvalue()
+
+
+def render_debt_report(data):
+    """
+    The portfolio debt report.
+
+    ``data``: generated_by, generated_at (datetime), summary (as returned
+    by DebtViewSet.summary), materials (statements.report_materials) and
+    debts (statements.report_debts).
+    """
+    summary, generated_at = data['summary'], data['generated_at']
+    elements = [
+        Paragraph(COMPANY_NAME, TITLE),
+        Paragraph("Comprehensive Debt Report", HEADING),
+        Spacer(1, 12),
+        Paragraph(escape(
+            f"Generated by: {data['generated_by']} on {generated_at:%B %d, %Y at %I:%M %p}"
+        ), NORMAL),
+        Spacer(1, 20),
+    ]
+    elements += _section("Executive Summary", _table([
+        ['Metric', 'Value'],
+        ['Total Debts', str(summary['total_debts'])],
+        ['Total Amount', money(summary['total_amount'])],
+        ['Paid Amount', money(summary['paid_amount'])],
+        ['Outstanding Amount', money(summary['remaining_amount'])],
+        ['Overdue Debts', str(summary['overdue_count'])],
+        ['Overdue Amount', money(summary['overdue_amount'])],
+        ['Collection Rate', f"{summary['collection_rate']:.1f}%"],
+    ], [3, 2], SUMMARY_TABLE))
+
+    if data['materials']:
+        elements += _section("Top Materials in Debt", _table(
+            [['Material', 'Outstanding Value', 'Customers']] + [
+                [material['material_name'][:25], money(material['outstanding_value']),
+                 str(material['customers_count'])]
+                for material in data['materials']
+            ],
+            [3, 2, 1.5], MATERIALS_TABLE,
+        ))
+
+    if data['debts']:
+        elements += _section(f"Detailed Debt Records (Top {len(data['debts'])})", _table(
+            [['Customer', 'Amount', 'Paid', 'Outstanding', 'Due Date', 'Status', 'Materials']] + [
+                [
+                    debt['customer_name'][:15],
+                    money(debt['total_amount'], 0),
+                    money(debt['paid_amount'], 0),
+                    money(debt['remaining_amount'], 0),
+                    _date(debt['due_date'], '%m/%d/%y'),
+                    debt['status'][:8],
+                    debt['materials'] if len(debt['materials']) <= 30 else debt['materials'][:27] + '...',
+                ]
+                for debt in data['debts']
+            ],
+            [1.2, 0.8, 0.8, 0.8, 0.8, 0.8, 1.8], DEBTS_TABLE,
+        ))
+
+    elements.append(_footer("Report", f"{generated_at:%Y-%m-%d %H:%M:%S}"))
+    return _build(elements)
+
+
+def render_debt_statement(data, generated_at):
+    """Statement of a single debt from a statements.debt_statement dict."""
+    customer, debt = data['customer'], data['debt']
+    elements = [
+        Paragraph(COMPANY_NAME, TITLE),
+        Paragraph(f"Debt Statement #{debt['id']}", HEADING),
+        Spacer(1, 20),
+        Paragraph(
+            "<b>Customer Information:</b><br/>"
+            f"Name: {escape(customer['name'])}<br/>"
+            f"Phone: {escape(customer['phone'])}<br/>"
+            f"Email: {escape(customer['email'])}<br/>"
+            f"Credit Limit: {money(customer['credit_limit'])}",
+            NORMAL,
+        ),
+        Spacer(1, 20),
+        Paragraph(
+            "<b>Debt Summary:</b><br/>"
+            f"Debt ID: #{debt['id']}<br/>"
+            f"Created Date: {_date(debt['created_at'], '%B %d, %Y')}<br/>"
+            f"Due Date: {_date(debt['due_date'], '%B %d, %Y')}<br/>"
+            f"Status: {debt['status']}<br/>"
+            f"Priority: {debt['priority']}<br/>"
+            f"Total Amount: {money(debt['total_amount'])}<br/>"
+            f"Paid Amount: {money(debt['paid_amount'])}<br/>"
+            f"<b>Outstanding Balance: {money(debt['remaining_amount'])}</b>",
+            NORMAL,
+        ),
+        Spacer(1, 20),
+    ]
+    if data['items']:
+        elements += _section("Materials Breakdown", _table(
+            [['Material', 'Quantity', 'Unit Price', 'Total Value']] + [
+                [item['material_name'], f"{item['quantity']:g} {item['unit']}",
+                 money(item['price']), money(item['total_value'])]
+                for item in data['items']
+            ],
+            [3, 1.3, 1.2, 1.2], ITEMS_TABLE,
+        ))
+    if data['payments']:
+        elements += _section("Payment History", _table(
+            [['Date', 'Amount', 'Method', 'Reference', 'Received By']] + [
+                [_date(payment['date'], '%m/%d/%Y'), money(payment['amount']), payment['payment_method'],
+                 payment['reference_number'], payment['received_by']]
+                for payment in data['payments']
+            ],
+            [1.2, 1, 1.2, 1.5, 1.6], PAYMENTS_TABLE,
+        ))
+    elements.append(_footer("Statement", generated_at))
+    return _build(elements)
+
+
+def render_customer_statement(data):
+    """Statement of all of a customer's debts from a statements.customer_statements dict."""
+    customer, summary = data['customer'], data['summary']
+    elements = [
+        Paragraph(COMPANY_NAME, TITLE),
+        Paragraph(f"Customer Statement - {escape(customer['name'])}", HEADING),
+        Spacer(1, 12),
+        Paragraph(
+            f"Phone: {escape(customer['phone'])}<br/>"
+            f"Email: {escape(customer['email'])}<br/>"
+            f"Credit Limit: {money(customer['credit_limit'])}<br/>"
+            f"<b>Balance: {money(customer['outstanding_balance'])}</b>",
+            NORMAL,
+        ),
+        Spacer(1, 20),
+    ]
+    elements += _section("Summary", _table([
+        ['Debts', 'Total Amount', 'Paid', 'Outstanding'],
+        [str(summary['total_debts']), money(summary['total_amount']),
+         money(summary['total_paid']), money(summary['total_outstanding'])],
+    ], [1.2, 1.8, 1.8, 1.8], SUMMARY_TABLE))
+
+    if data['debts']:
+        elements += _section("Debts", _table(
+            [['Debt #', 'Date', 'Due Date', 'Amount', 'Paid', 'Outstanding', 'Status']] + [
+                [
+                    str(debt['id']),
+                    _date(debt['created_date'], '%m/%d/%y'),
+                    _date(debt['due_date'], '%m/%d/%y'),
+                    money(debt['total_amount']),
+                    money(debt['paid_amount']),
+                    money(debt['remaining_amount']),
+                    debt['status'],
+                ]
+                for debt in data['debts']
+            ],
+            [0.7, 0.8, 0.8, 1.1, 1.1, 1.1, 1.0], DEBTS_TABLE,
+        ))
+        payments = [
+            [_date(payment['date'], '%m/%d/%Y'), str(debt['id']), money(payment['amount']),
+             payment['payment_method']]
+            for debt in data['debts'] for payment in debt['payments']
+        ]
+        if payments:
+            elements += _section("Payments", _table(
+                [['Date', 'Debt #', 'Amount', 'Method']] + payments, [1.4, 1, 1.4, 1.6], PAYMENTS_TABLE,
+            ))
+
+    if data['materials']:
+        elements += _section("Materials", _table(
+            [['Material', 'Quantity', 'Value']] + [
+                [material['name'][:40], f"{material['quantity']:g} {material['unit']}",
+                 money(material['total_value'])]
+                for material in data['materials']
+            ],
+            [3.5, 1.5, 1.5], MATERIALS_TABLE,
+        ))
+
+    elements.append(_footer("Statement", data['generated_date']))
+    return _build(elements)
+
+
+def render_customer_statements(statements, workers=None, chunksize=4, executor=None):
+    """
+    Render many customer statements. Yields (customer id, PDF bytes) in order.
+
+    With more than one worker the statements are rendered in a process
+    pool; ``workers`` defaults to the number of CPUs. Callers rendering
+    several batches can pass their own ``executor`` to reuse its workers.
+    """
+    ids = [statement['customer']['id'] for statement in statements]
+    if executor is not None:
+        yield from zip(ids, executor.map(render_customer_statement, statements, chunksize=chunksize))
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(statements) <= 1:
+        yield from zip(ids, map(render_customer_statement, statements))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(ids, executor.map(render_customer_statement, statements, chunksize=chunksize))
@@ -0,0 +1,165 @@
+"""
+Collections priority scoring.
+
+Every open debt gets a 0-100 score from its remaining amount, days overdue,
+payment history and the customer's credit utilization. Scores are computed
+for all selected debts at once with NumPy and written back with bulk_update,
+together with the matching Debt.priority level. That level replaces any
+priority set by hand unless the run is told to keep priorities.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from customers.models import CustomerLedgerEntry
+from .models import Debt, DebtPayment
+
+
+OPEN_STATUSES = [Debt.PENDING, Debt.PARTIALLY_PAID, Debt.OVERDUE]
+
+# Weight of each factor in the final score; they add up to 100
+WEIGHTS = {
+    'overdue': 35,
+    'amount': 25,
+    'payments': 20,
+    'utilization': 20,
+}
+
+# Lowest score for each priority level, checked from the top
+PRIORITY_THRESHOLDS = [
+    (70, Debt.CRITICAL),
+    (50, Debt.HIGH),
+    (25, Debt.MEDIUM),
+    (0, Debt.LOW),
+]
+
+
+def changed_debts(since, now=None):
+    """
+    Open debts whose score may have moved since ``since``.
+
+    Besides debts edited, paid against, or whose customer's balance moved,
+    this takes debts scored more than a day ago and debts that fell due
+    after they were scored: days overdue and days since the last payment
+    grow every day without any write to the row.
+    """
+    now = now or timezone.now()
+    customers = CustomerLedgerEntry.objects.filter(created_at__gt=since).values('customer_id')
+    return Debt.objects.filter(
+        Q(updated_at__gt=since)
+        | Q(customer_id__in=customers)
+        | Q(priority_scored_at__isnull=True)
+        | Q(priority_scored_at__lt=now - timedelta(days=1))
+        | Q(due_date__lt=now.date(), due_date__gte=TruncDate('priority_scored_at'))
+    )
+
+
+def last_run():
+    """When the most recent scoring run finished, or None if debts were never scored."""
+    return Debt.objects.aggregate(last=Max('priority_scored_at'))['last']
+
+
+def compute_scores(remaining, days_overdue, payment_count, days_since_payment, utilization):
+    """Vectorized score for arrays of debt features."""
+    overdue = np.clip(days_overdue / 90, 0, 1)
+    # Log scale so one very large debt does not flatten everything else
+    amount = np.clip(np.log10(np.maximum(remaining, 0) + 1) / 6, 0, 1)
+    # Never paid counts as fully stale; otherwise staleness grows over 60 days
+    payments = np.where(payment_count == 0, 1.0, np.clip(days_since_payment / 60, 0, 1))
+    utilization = np.clip(utilization, 0, 1.5) / 1.5
+    score = (
+        WEIGHTS['overdue'] * overdue
+        + WEIGHTS['amount'] * amount
+        + WEIGHTS['payments'] * payments
+        + WEIGHTS['utilization'] * utilization
+    )
+    return np.round(score, 2)
+
+
+def priority_levels(scores):
+    levels = np.full(scores.shape, Debt.LOW, dtype=object)
+    for threshold, level in reversed(PRIORITY_THRESHOLDS):
+        levels[scores >= threshold] = level
+    return levels
+
+
+def score_debts(queryset=None, batch_size=2000, set_priority=True):
+    """
+    Score open debts (all of them, or those in ``queryset``) and save the results.
+
+    With ``set_priority`` each debt's priority is set to the level of its
+    score, overwriting one chosen by hand; otherwise only the score is saved.
+    Reads the book with two grouped queries and returns (debts scored,
+    priorities changed).
+    """
+    now = timezone.now()
+    queryset = Debt.objects.all() if queryset is None else queryset
+    debts = queryset.filter(is_deleted=False, status__in=OPEN_STATUSES)
+    rows = list(debts.values_list(
+        'id', 'total_amount', 'paid_amount', 'due_date', 'created_at',
+        'customer__outstanding_balance', 'customer__credit_limit', 'priority',
+    ))
+    if not rows:
+        return 0, 0
+
+    ids, totals, paid, due_dates, created, balances, limits, priorities = zip(*rows)
+    history = {
+        row['debt_id']: row
+        for row in DebtPayment.objects.filter(
+            debt_id__in=debts.values('id'), status=DebtPayment.COMPLETED, is_deleted=False
+        ).values('debt_id').annotate(
+            count=Count('id'), first=Min('payment_date'), last=Max('payment_date')
+        )
+    }
+
+    ids = np.array(ids, dtype=np.int64)
+    remaining = np.array(totals, dtype=float) - np.array(paid, dtype=float)
+    today = np.datetime64(now.date(), 'D')
+    days_overdue = (today - np.array(due_dates, dtype='datetime64[D]')).astype(float)
+
+    payment_count = np.array([history.get(pk, {}).get('count', 0) for pk in ids], dtype=float)
+    # Days since the last payment; a debt that pays at a steady cadence is less stale
+    last_paid = np.array([
+        (history[pk]['last'] if pk in history else created_at).date() for pk, created_at in zip(ids, created)
+    ], dtype='datetime64[D]')
+    days_since_payment = (today - last_paid).astype(float)
+    first_paid = np.array([
+        (history[pk]['first'] if pk in history else created_at).date() for pk, created_at in zip(ids, created)
+    ], dtype='datetime64[D]')
+    cadence = np.where(
+        payment_count > 1, (last_paid - first_paid).astype(float) / np.maximum(payment_count - 1, 1), 0
+    )
+    days_since_payment = np.maximum(days_since_payment - cadence, 0)
+
+    limits = np.array(limits, dtype=float)
+    balances = np.array(balances, dtype=float)
+    # Customers without a credit limit count as half used
+    utilization = np.where(limits > 0, balances / np.where(limits > 0, limits, 1), 0.75)
+
+    scores = compute_scores(remaining, days_overdue, payment_count, days_since_payment, utilization)
+    levels = priority_levels(scores) if set_priority else np.array(priorities, dtype=object)
+    fields = ['priority', 'priority_score', 'priority_scored_at'] if set_priority else [
+        'priority_score', 'priority_scored_at'
+    ]
+
+    with transaction.atomic():
+        for start in range(0, len(ids), batch_size):
+            Debt.objects.bulk_update(
+                [
+                    Debt(
+                        id=int(ids[i]),
+                        priority=levels[i],
+                        priority_score=Decimal(f'{scores[i]:.2f}'),
+                        priority_scored_at=now,
+                    )
+                    for i in range(start, min(start + batch_size, len(ids)))
+                ],
+                fields,
+                batch_size=1000,
+            )
+    return len(ids), int((levels != np.array(priorities, dtype=object)).sum())
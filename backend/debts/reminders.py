@@ -0,0 +1,290 @@
+"""
+Debt reminder scheduling and delivery.
+
+The scheduler creates reminders for open debts from a cadence of steps
+relative to the due date (DEBT_REMINDER_CADENCE). The dispatcher claims due
+reminders in batches with SELECT ... FOR UPDATE SKIP LOCKED, so several
+dispatcher processes can run side by side without sending the same reminder
+twice. Delivery goes through a transport class named by the
+DEBT_REMINDER_TRANSPORT setting, the same way Django picks an email backend.
+"""
+import json
+import sys
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Debt, DebtReminder
+
+
+DEFAULT_TRANSPORT = 'debts.reminders.ConsoleTransport'
+
+# Steps relative to the due date; negative offsets are before it. A step may
+# set 'priorities' to apply only to debts of those priorities.
+DEFAULT_CADENCE = [
+    {
+        'offset_days': -3,
+        'reminder_type': DebtReminder.SMS,
+        'message': 'Dear {customer_name}, {remaining_amount} on debt #{debt_id} is due on {due_date}.',
+    },
+    {
+        'offset_days': 1,
+        'reminder_type': DebtReminder.SMS,
+        'message': 'Dear {customer_name}, {remaining_amount} on debt #{debt_id} was due on {due_date}. '
+                   'Please arrange payment.',
+    },
+    {
+        'offset_days': 7,
+        'reminder_type': DebtReminder.SMS,
+        'message': 'Dear {customer_name}, debt #{debt_id} is {days_overdue} days overdue with '
+                   '{remaining_amount} outstanding. Please pay as soon as possible.',
+    },
+    {
+        'offset_days': 30,
+        'reminder_type': DebtReminder.PHONE,
+        'message': 'Call {customer_name} about debt #{debt_id}: {remaining_amount} outstanding, '
+                   '{days_overdue} days overdue.',
+    },
+]
+
+OPEN_STATUSES = [Debt.PENDING, Debt.PARTIALLY_PAID, Debt.OVERDUE]
+
+
+class BaseTransport:
+    """Deliver rendered reminders. Subclasses implement send()."""
+
+    def open(self):
+        """Prepare for a batch of sends."""
+
+    def close(self):
+        """Release anything opened for a batch."""
+
+    def send(self, reminder, message):
+        """Deliver one message; raise an exception to mark the reminder failed."""
+        raise NotImplementedError('Reminder transports must implement send()')
+
+
+class ConsoleTransport(BaseTransport):
+    """Write reminders to a stream (stdout by default) instead of sending them."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminder, message):
+        self.stream.write(
+            f"[{reminder.reminder_type}] to {reminder.customer.name} "
+            f"({reminder.customer.phone}) re debt #{reminder.debt_id}: {message}\n"
+        )
+
+
+class FileTransport(BaseTransport):
+    """Append reminders as JSON lines to DEBT_REMINDER_FILE_PATH."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'DEBT_REMINDER_FILE_PATH', 'debt_reminders.jsonl')
+        self.file = None
+
+    def open(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def send(self, reminder, message):
+        self.file.write(json.dumps({
+            'reminder_id': reminder.id,
+            'type': reminder.reminder_type,
+            'customer_id': reminder.customer_id,
+            'phone': reminder.customer.phone,
+            'email': reminder.customer.email,
+            'debt_id': reminder.debt_id,
+            'message': message,
+            'sent_at': timezone.now().isoformat(),
+        }) + '\n')
+
+
+def get_transport(path=None, **kwargs):
+    """Instantiate the configured transport class, or the one at ``path``."""
+    path = path or getattr(settings, 'DEBT_REMINDER_TRANSPORT', DEFAULT_TRANSPORT)
+    return import_string(path)(**kwargs)
+
+
+class _MessageContext(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def render_message(reminder, as_of=None):
+    """
+    Fill placeholders in the reminder text.
+
+    Supports {customer_name}, {debt_id}, {total_amount}, {remaining_amount},
+    {due_date} and {days_overdue}; unknown placeholders are left as written.
+    """
+    debt = reminder.debt
+    as_of = as_of or timezone.now().date()
+    context = _MessageContext(
+        customer_name=reminder.customer.name,
+        debt_id=debt.id,
+        total_amount=f'{debt.total_amount:,.2f}',
+        remaining_amount=f'{debt.remaining_amount:,.2f}',
+        due_date=debt.due_date.isoformat(),
+        days_overdue=max((as_of - debt.due_date).days, 0),
+    )
+    try:
+        return reminder.message.format_map(context)
+    except (ValueError, IndexError):
+        # Stray braces in free text: send it unchanged
+        return reminder.message
+
+
+def dispatch_batch(transport, batch_size=100, now=None):
+    """
+    Claim, send and mark up to ``batch_size`` due reminders.
+
+    Rows stay locked until the batch is marked, so a concurrent dispatcher
+    skips them. Only reminders of open, undeleted debts are claimed.
+    Delivery is at-least-once: if the process dies after sending but before
+    commit, the batch is sent again by the next run. Returns (sent, failed).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        reminders = list(
+            DebtReminder.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('debt', 'customer')
+            .filter(
+                status=DebtReminder.SCHEDULED,
+                scheduled_date__lte=now,
+                debt__status__in=OPEN_STATUSES,
+                debt__is_deleted=False,
+            )
+            .order_by('scheduled_date', 'id')[:batch_size]
+        )
+        if not reminders:
+            return 0, 0
+
+        sent, failed = [], []
+        transport.open()
+        try:
+            for reminder in reminders:
+                try:
+                    transport.send(reminder, render_message(reminder, now.date()))
+                except Exception:
+                    failed.append(reminder.id)
+                else:
+                    sent.append(reminder.id)
+        finally:
+            transport.close()
+
+        if sent:
+            DebtReminder.objects.filter(id__in=sent).update(
+                status=DebtReminder.SENT, sent_date=now, updated_at=now
+            )
+        if failed:
+            DebtReminder.objects.filter(id__in=failed).update(
+                status=DebtReminder.FAILED, updated_at=now
+            )
+    return len(sent), len(failed)
+
+
+def cancel_closed_reminders(now=None):
+    """Cancel scheduled reminders whose debt was paid, cancelled or deleted. Returns the count."""
+    now = now or timezone.now()
+    return DebtReminder.objects.filter(status=DebtReminder.SCHEDULED).filter(
+        Q(debt__is_deleted=True) | ~Q(debt__status__in=OPEN_STATUSES)
+    ).update(status=DebtReminder.CANCELLED, updated_at=now)
+
+
+def dispatch_due_reminders(transport=None, batch_size=100, max_batches=None):
+    """
+    Send due reminders batch by batch until none are left. Returns (sent, failed).
+
+    Reminders of debts closed since they were scheduled are cancelled first.
+    """
+    transport = transport or get_transport()
+    cancel_closed_reminders()
+    total_sent = total_failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        sent, failed = dispatch_batch(transport, batch_size)
+        if not sent and not failed:
+            break
+        total_sent += sent
+        total_failed += failed
+        batches += 1
+    return total_sent, total_failed
+
+
+def get_cadence():
+    """Configured cadence steps, ordered by offset."""
+    cadence = getattr(settings, 'DEBT_REMINDER_CADENCE', DEFAULT_CADENCE)
+    return sorted(cadence, key=lambda step: step['offset_days'])
+
+
+def schedule_reminders(as_of=None, batch_size=2000, dry_run=False):
+    """
+    Create the reminders due under the cadence as of a date.
+
+    Each open debt gets a reminder for the latest cadence step it has reached,
+    unless it already has a scheduled reminder or any reminder on or after that
+    step's date, so repeated runs do not duplicate and missed steps are not
+    back-filled. One query per step selects the debts; rows are bulk created.
+    Returns the number of reminders created (or that would be, with dry_run).
+    """
+    as_of = as_of or timezone.now().date()
+    send_hour = getattr(settings, 'DEBT_REMINDER_SEND_HOUR', 9)
+    cadence = get_cadence()
+
+    pending = DebtReminder.objects.filter(debt=OuterRef('pk'), status=DebtReminder.SCHEDULED)
+    created = 0
+    for index, step in enumerate(cadence):
+        offset = step['offset_days']
+        debts = Debt.objects.filter(
+            is_deleted=False,
+            status__in=OPEN_STATUSES,
+            due_date__lte=as_of - timedelta(days=offset),
+        )
+        if index + 1 < len(cadence):
+            # Debts past the next step are handled by that step
+            debts = debts.filter(due_date__gt=as_of - timedelta(days=cadence[index + 1]['offset_days']))
+        if step.get('priorities'):
+            debts = debts.filter(priority__in=step['priorities'])
+
+        reached = DebtReminder.objects.filter(
+            debt=OuterRef('pk'),
+            scheduled_date__date__gte=OuterRef('due_date') + timedelta(days=offset),
+        )
+        rows = debts.exclude(Exists(pending)).exclude(Exists(reached)).order_by(
+            'due_date', 'id'
+        ).values_list('id', 'customer_id', 'due_date')
+
+        reminders = []
+        for debt_id, customer_id, due_date in rows.iterator(chunk_size=batch_size):
+            scheduled = timezone.make_aware(
+                datetime.combine(due_date + timedelta(days=offset), time(hour=send_hour))
+            )
+            reminders.append(DebtReminder(
+                debt_id=debt_id,
+                customer_id=customer_id,
+                reminder_type=step['reminder_type'],
+                scheduled_date=scheduled,
+                message=step['message'],
+                notes=f"Scheduled automatically ({offset:+d} days from due date)",
+            ))
+            if len(reminders) >= batch_size:
+                created += _create_reminders(reminders, dry_run)
+        created += _create_reminders(reminders, dry_run)
+    return created
+
+
+def _create_reminders(reminders, dry_run):
+    count = len(reminders)
+    if reminders and not dry_run:
+        DebtReminder.objects.bulk_create(reminders)
+    reminders.clear()
+    return count
@@ -1,7 +1,12 @@
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
+from .allocation import OLDEST, ORDERINGS
+from .exposure import CreditLimitExceeded, check_credit_limit
 from .models import Debt, DebtPayment, DebtReminder
-from customers.models import Customer
+from customers.models import Customer, CustomerLedgerEntry
 from sales.models import Sale
 
 
@@ -32,48 +37,33 @@ class DebtSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer', 'customer_name', 'customer_phone', 'customer_email',
             'sale', 'sale_id', 'total_amount', 'paid_amount', 'remaining_amount',
-            'interest_rate', 'interest_amount', 'created_at', 'due_date',
-            'last_payment_date', 'status', 'priority', 'payment_terms',
-            'notes', 'is_overdue', 'days_overdue', 'payment_percentage',
+            'interest_rate', 'interest_amount', 'accrued_interest', 'created_at', 'due_date',
+            'last_payment_date', 'status', 'priority', 'priority_score', 'payment_terms',
+            'external_reference', 'notes', 'is_overdue', 'days_overdue', 'payment_percentage',
             'materials_count', 'materials_summary', 'material_breakdown',
             'created_by', 'created_by_name', 'updated_by', 'updated_at', 'is_deleted'
         ]
         read_only_fields = [
             'id', 'created_at', 'updated_at', 'last_payment_date', 
-            'remaining_amount', 'is_overdue', 'days_overdue', 'payment_percentage'
+            'remaining_amount', 'is_overdue', 'days_overdue', 'payment_percentage',
+            'accrued_interest', 'priority_score'
         ]
     
     def get_interest_amount(self, obj):
         """Calculate current interest amount."""
-        return obj.calculate_interest()
+        # Shared by every row of a list response, so the date is only read once
+        if 'interest_as_of' not in self.context:
+            self.context['interest_as_of'] = timezone.now().date()
+        return obj.calculate_interest(self.context['interest_as_of'])
     
     def get_material_breakdown(self, obj):
         """Get detailed breakdown of materials in this debt."""
         return obj.get_material_breakdown()
     
     def validate(self, data):
-        """Custom validation for debt creation/update."""
-        customer = data.get('customer')
+        """Custom validation for debt creation/update; the credit limit is checked on write."""
         total_amount = data.get('total_amount', 0)
         
-        # Check customer credit limit using Decimal for consistency
-        if customer and customer.credit_limit and customer.credit_limit > 0:
-            from decimal import Decimal
-            
-            current_outstanding = Decimal(str(customer.outstanding_balance or 0))
-            total_amount_decimal = Decimal(str(total_amount))
-            credit_limit = Decimal(str(customer.credit_limit))
-            
-            if self.instance:
-                # If updating, subtract current debt amount
-                current_outstanding -= Decimal(str(self.instance.remaining_amount))
-            
-            if current_outstanding + total_amount_decimal > credit_limit:
-                raise serializers.ValidationError(
-                    f"This debt would exceed customer's credit limit of ${float(credit_limit):,.2f}. "
-                    f"Current outstanding: ${float(current_outstanding):,.2f}, Requested: ${float(total_amount_decimal):,.2f}"
-                )
-        
         # Validate due date is not in the past
         due_date = data.get('due_date')
         if due_date and due_date < timezone.now().date():
@@ -86,28 +76,54 @@ class DebtSerializer(serializers.ModelSerializer):
         
         return data
     
+    def check_credit_limit(self, customer, requested):
+        """Check ``requested`` new credit against the customer's locked, current exposure."""
+        try:
+            check_credit_limit(customer.pk, requested, what='debt')
+        except CreditLimitExceeded as e:
+            raise serializers.ValidationError(str(e))
+    
+    @transaction.atomic
     def create(self, validated_data):
         """Override create to update customer outstanding balance."""
+        self.check_credit_limit(validated_data['customer'], validated_data.get('total_amount', 0))
         debt = super().create(validated_data)
         
-        # Update customer outstanding balance
-        customer = debt.customer
-        customer.outstanding_balance += debt.remaining_amount
-        customer.save()
+        # Charge the customer ledger
+        CustomerLedgerEntry.objects.record(
+            debt.customer,
+            CustomerLedgerEntry.CHARGE,
+            debt.remaining_amount,
+            description=f"Debt #{debt.id}",
+            created_by=debt.created_by,
+            debt=debt,
+        )
         
         return debt
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Override update to handle balance changes."""
         old_remaining = instance.remaining_amount
+        if 'total_amount' in validated_data:
+            # Only the change in what is owed adds exposure
+            self.check_credit_limit(
+                validated_data.get('customer', instance.customer),
+                validated_data['total_amount'] - instance.total_amount,
+            )
         debt = super().update(instance, validated_data)
         new_remaining = debt.remaining_amount
         
-        # Update customer outstanding balance
+        # Adjust the customer ledger by the change in what is owed
         if old_remaining != new_remaining:
-            customer = debt.customer
-            customer.outstanding_balance = customer.outstanding_balance - old_remaining + new_remaining
-            customer.save()
+            CustomerLedgerEntry.objects.record(
+                debt.customer,
+                CustomerLedgerEntry.ADJUSTMENT,
+                new_remaining - old_remaining,
+                description=f"Debt #{debt.id} updated",
+                created_by=debt.updated_by,
+                debt=debt,
+            )
         
         return debt
 
@@ -270,41 +286,52 @@ class CreateCreditSaleSerializer(serializers.Serializer):
     payment_terms = serializers.CharField(max_length=255, required=False)
     notes = serializers.CharField(required=False)
     
+    def validate_items(self, value):
+        """Turn each item into (material_id, quantity, price) with Decimal amounts."""
+        if not value:
+            raise serializers.ValidationError("At least one item is required.")
+        items = []
+        for item in value:
+            try:
+                material_id = int(item['material_id'])
+                quantity = Decimal(item['quantity'])
+                price = Decimal(item['price'])
+            except KeyError as e:
+                raise serializers.ValidationError(f"Each item needs material_id, quantity and price (missing {e}).")
+            except (ValueError, InvalidOperation):
+                raise serializers.ValidationError("Item material_id, quantity and price must be numbers.")
+            if not quantity.is_finite() or quantity <= 0 or not price.is_finite() or price < 0:
+                raise serializers.ValidationError("Item quantity must be positive and price not negative.")
+            items.append((material_id, quantity, price))
+        return items
+    
     def validate(self, data):
         """Validate credit sale data."""
-        customer = data['customer']
         items = data['items']
         
-        # Calculate total amount using Decimal for consistency
-        from decimal import Decimal
-        
-        total_amount = Decimal('0')
-        for item in items:
-            quantity = Decimal(str(item['quantity']))
-            price = Decimal(str(item['price']))
-            total_amount += quantity * price
+        total_amount = sum((quantity * price for _, quantity, price in items), Decimal('0'))
         
-        # Add tax, subtract discount
-        tax = Decimal(str(data.get('tax', 0)))
-        discount = Decimal(str(data.get('discount', 0)))
-        total_amount += tax
-        total_amount -= discount
-        
-        # Check customer credit limit
-        if customer.credit_limit and customer.credit_limit > 0:
-            outstanding_balance = Decimal(str(customer.outstanding_balance or 0))
-            credit_limit = Decimal(str(customer.credit_limit))
-            
-            if outstanding_balance + total_amount > credit_limit:
-                raise serializers.ValidationError(
-                    f"This sale would exceed customer's credit limit of ${float(credit_limit):,.2f}. "
-                    f"Current outstanding: ${float(outstanding_balance):,.2f}, Sale amount: ${float(total_amount):,.2f}"
-                )
+        # Add tax, subtract discount (already Decimals from their fields)
+        total_amount += data.get('tax', 0) - data.get('discount', 0)
         
+        # The credit limit is checked by write_sale under the customer's row lock
         # Validate due date
         due_date = data['due_date']
         if due_date <= timezone.now().date():
             raise serializers.ValidationError("Due date must be in the future.")
         
-        data['calculated_total'] = float(total_amount)
-        return data
\ No newline at end of file
+        data['calculated_total'] = total_amount
+        return data
+
+
+class PaymentAllocationSerializer(serializers.Serializer):
+    """Serializer for a lump-sum payment allocated across a customer's open debts."""
+    
+    customer = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all())
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=Decimal('0.01'))
+    payment_method = serializers.ChoiceField(choices=DebtPayment.PAYMENT_METHOD_CHOICES, default=DebtPayment.CASH)
+    strategy = serializers.ChoiceField(choices=list(ORDERINGS), default=OLDEST)
+    debts = serializers.ListField(child=serializers.IntegerField(), required=False)
+    payment_date = serializers.DateTimeField(required=False)
+    reference_number = serializers.CharField(max_length=100, required=False)
+    notes = serializers.CharField(required=False)
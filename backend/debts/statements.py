@@ -0,0 +1,292 @@
+"""
+Customer statement data.
+
+Statements are built from plain dicts filled by grouped queries: totals per
+customer come from one aggregate, material totals from one GROUP BY over
+the sale items of the customer's debts, and debt records are read in
+chunks with the payments of each chunk fetched in one query. Memory stays
+bounded by the chunk size however many debts a customer has.
+"""
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from sales.models import SaleItem
+
+from .models import Debt, DebtPayment
+
+
+CHUNK_SIZE = 500
+
+STATUS_LABELS = dict(Debt.STATUS_CHOICES)
+
+METHOD_LABELS = dict(DebtPayment.PAYMENT_METHOD_CHOICES)
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def customer_info(customer):
+    return {
+        'id': customer.id,
+        'name': customer.name,
+        'phone': customer.phone or 'N/A',
+        'email': customer.email or 'N/A',
+        'customer_type': customer.get_customer_type_display(),
+        'credit_limit': float(customer.credit_limit or 0),
+        'outstanding_balance': float(customer.outstanding_balance or 0),
+    }
+
+
+def debt_totals(debts):
+    """Count, total, paid and outstanding over ``debts`` in one aggregate."""
+    totals = debts.aggregate(
+        count=Count('id'),
+        total=Coalesce(Sum('total_amount'), 0, output_field=MONEY),
+        paid=Coalesce(Sum('paid_amount'), 0, output_field=MONEY),
+        outstanding=Coalesce(Sum(F('total_amount') - F('paid_amount')), 0, output_field=MONEY),
+    )
+    return {
+        'total_debts': totals['count'],
+        'total_amount': float(totals['total']),
+        'total_paid': float(totals['paid']),
+        'total_outstanding': float(totals['outstanding']),
+    }
+
+
+def material_totals(debts):
+    """Quantity and value per material sold on credit in ``debts``, largest value first."""
+    rows = SaleItem.objects.filter(sale__debt__in=debts).values(
+        'material_id', 'material__name', 'material__unit__abbreviation'
+    ).annotate(
+        sold=Sum('quantity'),
+        value=Sum(F('quantity') * F('price'), output_field=MONEY),
+    ).order_by('-value', 'material_id')
+    return [
+        {
+            'material_id': row['material_id'],
+            'name': row['material__name'],
+            'unit': row['material__unit__abbreviation'],
+            'sku': 'N/A',
+            'quantity': float(row['sold']),
+            'total_value': float(row['value']),
+        }
+        for row in rows
+    ]
+
+
+def payments_by_debt(debt_ids):
+    """Payment rows of ``debt_ids``, oldest first, grouped by debt id."""
+    payments = {}
+    rows = DebtPayment.objects.filter(debt_id__in=debt_ids, is_deleted=False).order_by(
+        'payment_date', 'id'
+    ).values_list('debt_id', 'id', 'amount', 'payment_method', 'payment_date', 'notes')
+    for debt_id, pk, amount, method, payment_date, notes in rows:
+        payments.setdefault(debt_id, []).append({
+            'id': pk,
+            'amount': float(amount),
+            'payment_method': method,
+            'date': payment_date.strftime('%Y-%m-%d'),
+            'notes': notes or '',
+        })
+    return payments
+
+
+def iter_debt_records(debts, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict per debt with its payments, newest debt first.
+
+    Debts are read in pages of ``chunk_size`` keyed on (created_at, id)
+    rather than through one cursor, so nothing is buffered beyond a chunk
+    even on backends that fetch whole result sets.
+    """
+    rows = debts.order_by('-created_at', '-id').values_list(
+        'id', 'created_at', 'due_date', 'total_amount', 'paid_amount', 'status', 'notes'
+    )
+    page = rows
+    while True:
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield from _debt_records(chunk)
+        last_id, last_created = chunk[-1][:2]
+        page = rows.filter(Q(created_at__lt=last_created) | Q(created_at=last_created, id__lt=last_id))
+
+
+def _debt_records(rows):
+    payments = payments_by_debt([row[0] for row in rows])
+    for row in rows:
+        yield debt_record(row, payments.get(row[0], []))
+
+
+def debt_record(row, payments):
+    pk, created_at, due_date, total_amount, paid_amount, status, notes = row[:7]
+    return {
+        'id': pk,
+        'created_date': created_at.strftime('%Y-%m-%d'),
+        'due_date': due_date.strftime('%Y-%m-%d'),
+        'total_amount': float(total_amount),
+        'paid_amount': float(paid_amount),
+        'remaining_amount': float(total_amount - paid_amount),
+        'status': str(STATUS_LABELS.get(status, status)),
+        'notes': notes or '',
+        'payments': payments,
+    }
+
+
+def customer_statements(customers, generated_at=None):
+    """
+    Statement dicts for many customers with a fixed number of queries.
+
+    Each has the same shape as the export_customer document: customer,
+    summary, materials and debts with their payments. Cancelled debts are
+    listed but left out of the summary totals. Memory grows with the
+    customers passed in, so callers page through large sets.
+    """
+    generated_at = generated_at or timezone.now()
+    customers = list(customers)
+    debts = Debt.objects.filter(customer__in=customers, is_deleted=False)
+
+    totals = {
+        row['customer_id']: row
+        for row in debts.exclude(status=Debt.CANCELLED).values('customer_id').annotate(
+            count=Count('id'),
+            total=Sum('total_amount'),
+            paid=Sum('paid_amount'),
+        )
+    }
+    materials = {}
+    for row in SaleItem.objects.filter(sale__debt__in=debts).values(
+        'sale__debt__customer_id', 'material_id', 'material__name', 'material__unit__abbreviation'
+    ).annotate(
+        sold=Sum('quantity'), value=Sum(F('quantity') * F('price'), output_field=MONEY)
+    ).order_by('sale__debt__customer_id', '-value', 'material_id'):
+        materials.setdefault(row['sale__debt__customer_id'], []).append({
+            'material_id': row['material_id'],
+            'name': row['material__name'],
+            'unit': row['material__unit__abbreviation'],
+            'sku': 'N/A',
+            'quantity': float(row['sold']),
+            'total_value': float(row['value']),
+        })
+
+    rows = list(debts.order_by('customer_id', '-created_at', '-id').values_list(
+        'id', 'created_at', 'due_date', 'total_amount', 'paid_amount', 'status', 'notes', 'customer_id'
+    ))
+    payments = payments_by_debt([row[0] for row in rows])
+    records = {}
+    for row in rows:
+        records.setdefault(row[7], []).append(debt_record(row, payments.get(row[0], [])))
+
+    statements = []
+    for customer in customers:
+        total = totals.get(customer.id, {})
+        amount, paid = total.get('total') or 0, total.get('paid') or 0
+        statements.append({
+            'report_type': 'customer_statement',
+            'generated_date': generated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'customer': customer_info(customer),
+            'summary': {
+                'total_debts': total.get('count', 0),
+                'total_amount': float(amount),
+                'total_paid': float(paid),
+                'total_outstanding': float(amount - paid),
+            },
+            'materials': materials.get(customer.id, []),
+            'debts': records.get(customer.id, []),
+        })
+    return statements
+
+
+def report_materials(debts, limit=10):
+    """
+    Materials with the most outstanding value across ``debts``.
+
+    Each sale line counts in proportion to the unpaid share of its debt.
+    """
+    outstanding = ExpressionWrapper(
+        F('quantity') * F('price') * (F('sale__debt__total_amount') - F('sale__debt__paid_amount'))
+        / F('sale__debt__total_amount'),
+        output_field=MONEY,
+    )
+    rows = SaleItem.objects.filter(sale__debt__in=debts, sale__debt__total_amount__gt=0).values(
+        'material_id', 'material__name'
+    ).annotate(
+        outstanding_value=Sum(outstanding),
+        customers_count=Count('sale__debt__customer', distinct=True),
+    ).order_by('-outstanding_value', 'material_id')[:limit]
+    return [
+        {
+            'material_name': row['material__name'],
+            'outstanding_value': float(row['outstanding_value'] or 0),
+            'customers_count': row['customers_count'],
+        }
+        for row in rows
+    ]
+
+
+def report_debts(debts, limit=50):
+    """The first ``limit`` debts as report rows, with their materials from one query."""
+    rows = list(debts.values_list(
+        'id', 'customer__name', 'total_amount', 'paid_amount', 'due_date', 'status', 'sale_id'
+    )[:limit])
+    items = {}
+    for sale_id, quantity, unit, name in SaleItem.objects.filter(
+        sale_id__in=[row[6] for row in rows if row[6]]
+    ).order_by('id').values_list('sale_id', 'quantity', 'material__unit__abbreviation', 'material__name'):
+        items.setdefault(sale_id, []).append(f"{quantity} {unit} {name}")
+    return [
+        {
+            'id': pk,
+            'customer_name': customer_name,
+            'total_amount': float(total_amount),
+            'paid_amount': float(paid_amount),
+            'remaining_amount': float(total_amount - paid_amount),
+            'due_date': due_date,
+            'status': str(STATUS_LABELS.get(status, status)),
+            'materials': (", ".join(items.get(sale_id, [])) or "No materials") if sale_id else "No associated sale",
+        }
+        for pk, customer_name, total_amount, paid_amount, due_date, status, sale_id in rows
+    ]
+
+
+def debt_statement(debt):
+    """Statement dict for one debt: customer, debt details, sale lines and completed payments."""
+    customer = debt.customer
+    return {
+        'customer': customer_info(customer),
+        'debt': {
+            'id': debt.id,
+            'created_at': debt.created_at,
+            'due_date': debt.due_date,
+            'status': debt.get_status_display(),
+            'priority': debt.get_priority_display(),
+            'total_amount': float(debt.total_amount),
+            'paid_amount': float(debt.paid_amount),
+            'remaining_amount': float(debt.remaining_amount),
+        },
+        'items': [
+            {
+                'material_name': name,
+                'quantity': float(quantity),
+                'unit': unit,
+                'price': float(price),
+                'total_value': float(quantity * price),
+            }
+            for name, quantity, unit, price in SaleItem.objects.filter(sale_id=debt.sale_id).order_by('id')
+            .values_list('material__name', 'quantity', 'material__unit__abbreviation', 'price')
+        ] if debt.sale_id else [],
+        'payments': [
+            {
+                'date': payment_date,
+                'amount': float(amount),
+                'payment_method': str(METHOD_LABELS.get(method, method)),
+                'reference_number': reference or 'N/A',
+                'received_by': received_by or 'N/A',
+            }
+            for payment_date, amount, method, reference, received_by in debt.payments.filter(
+                is_deleted=False, status=DebtPayment.COMPLETED
+            ).order_by('-payment_date').values_list(
+                'payment_date', 'amount', 'payment_method', 'reference_number', 'received_by__email'
+            )
+        ],
+    }
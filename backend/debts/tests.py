@@ -1,3 +1,698 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from building_material_management import batch
+from customers.models import Customer, CustomerLedgerEntry
+from inventory.models import Category, Material, UnitOfMeasure
+from sales.models import Sale
+from users.models import User
+
+from .allocation import OLDEST, PRIORITY, AllocationError, allocate_payment
+from .exposure import get_exposure
+from .interest import accrue_interest, portfolio_interest
+from .models import Debt, DebtPayment, DebtReminder
+from .pdf import render_customer_statements
+from .priority import changed_debts, score_debts
+from .reminders import ConsoleTransport, dispatch_due_reminders, schedule_reminders
+from .statements import customer_statements, iter_debt_records
+
+
+class CreditSaleMixin:
+    def make_fixtures(self, stock):
+        self.user = User.objects.create_user(email='cashier@example.com', password='x', role=User.ADMIN)
+        self.customer = Customer.objects.create(name='Builder', phone='123', credit_limit=Decimal('1000000'))
+        self.material = Material.objects.create(
+            name='Cement',
+            category=Category.objects.create(name='Binders'),
+            unit=UnitOfMeasure.objects.create(name='Bag', abbreviation='bag'),
+            quantity_in_stock=stock,
+            price_per_unit=Decimal('12.00'),
+            cost_per_unit=Decimal('9.00'),
+        )
+
+    def post_credit_sale(self, quantity, **headers):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/debts/create-credit-sale/', {
+            'customer': self.customer.id,
+            'items': [{'material_id': str(self.material.id), 'quantity': str(quantity), 'price': '12.00'}],
+            'due_date': (timezone.now().date() + timedelta(days=30)).isoformat(),
+        }, format='json', **headers)
+
+
+class CreateCreditSaleTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('10'))
+
+    def test_creates_one_sale_one_debt_and_decrements_stock(self):
+        response = self.post_credit_sale('2.5')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.quantity_in_stock, Decimal('7.50'))
+        debt = Debt.objects.get()
+        self.assertEqual(debt.id, response.data['debt_id'])
+        self.assertEqual(debt.total_amount, Decimal('30.00'))
+        self.assertEqual(Sale.objects.get().items.count(), 1)
+
+    def test_rejects_oversell_without_writing(self):
+        response = self.post_credit_sale('11')
+        self.assertEqual(response.status_code, 400)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.quantity_in_stock, Decimal('10.00'))
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Debt.objects.exists())
+
+    def test_retry_with_idempotency_key_replays_response(self):
+        first = self.post_credit_sale('2', HTTP_IDEMPOTENCY_KEY='counter-1')
+        retry = self.post_credit_sale('2', HTTP_IDEMPOTENCY_KEY='counter-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.quantity_in_stock, Decimal('8.00'))
+        self.assertEqual(Debt.objects.count(), 1)
+
+        reused = self.post_credit_sale('3', HTTP_IDEMPOTENCY_KEY='counter-1')
+        self.assertEqual(reused.status_code, 422)
+
+    def test_credit_limit_is_checked_against_the_database_not_the_cache(self):
+        cache.clear()
+        Customer.objects.filter(pk=self.customer.pk).update(credit_limit=Decimal('100'))
+        self.assertEqual(get_exposure(self.customer.pk)['total_exposure'], Decimal('0'))
+        # A write the cache of this process never hears about, as from another worker
+        Customer.objects.filter(pk=self.customer.pk).update(outstanding_balance=Decimal('90'))
+
+        response = self.post_credit_sale('2')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('credit limit', response.data['error'])
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(get_exposure(self.customer.pk)['total_exposure'], Decimal('0'))
+
+
+class DebtAgingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='manager@example.com', password='x', role=User.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.builder = Customer.objects.create(name='Builder', phone='123')
+        self.mason = Customer.objects.create(name='Mason', phone='456')
+        today = timezone.now().date()
+        for customer, days_overdue, amount in [
+            (self.builder, -5, '10.00'), (self.builder, 0, '20.00'), (self.builder, 30, '30.00'),
+            (self.builder, 31, '40.00'), (self.mason, 75, '50.00'), (self.mason, 120, '60.00'),
+        ]:
+            Debt.objects.create(
+                customer=customer, total_amount=Decimal(amount), due_date=today - timedelta(days=days_overdue)
+            )
+        Debt.objects.create(
+            customer=self.mason, total_amount=Decimal('99.00'), paid_amount=Decimal('99.00'),
+            due_date=today - timedelta(days=200), status=Debt.PAID,
+        )
+
+    def test_buckets_per_customer_and_overall(self):
+        response = self.client.get('/api/debts/debts/aging/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['buckets'], ['current', '0-30', '31-60', '61-90', '90+'])
+        totals = response.data['totals']
+        self.assertEqual(
+            [totals[key] for key in ('days_current', 'days_0_30', 'days_31_60', 'days_61_90', 'days_90_plus')],
+            [Decimal('10'), Decimal('50'), Decimal('40'), Decimal('50'), Decimal('60')],
+        )
+        self.assertEqual((totals['debts_count'], totals['total_outstanding']), (6, Decimal('210')))
+
+        rows = {row['customer_id']: row for row in response.data['results']}
+        self.assertEqual(list(rows), [self.mason.id, self.builder.id])
+        self.assertEqual(rows[self.mason.id]['days_90_plus'], Decimal('60'))
+        self.assertEqual(rows[self.builder.id]['days_0_30'], Decimal('50'))
+
+    def test_csv_export_streams_every_customer(self):
+        response = self.client.get('/api/debts/debts/aging/', {'export': 'csv', 'customer': self.builder.id})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'customer_id,customer_name,debts_count,total_outstanding,current,0-30,31-60,61-90,90+')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{self.builder.id},Builder,4,'))
+
+
+class PaymentDailySummaryTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='manager@example.com', password='x', role=User.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        customer = Customer.objects.create(name='Builder', phone='123')
+        debt = Debt.objects.create(customer=customer, total_amount=Decimal('500.00'), due_date=date(2026, 3, 31))
+        for day, method, amount, fields in [
+            (1, DebtPayment.CASH, '10.00', {}), (1, DebtPayment.CASH, '15.00', {}),
+            (1, DebtPayment.ZAAD, '20.00', {}), (2, DebtPayment.CASH, '5.00', {}),
+            (2, DebtPayment.CASH, '99.00', {'status': DebtPayment.PENDING}),
+            (2, DebtPayment.CASH, '98.00', {'is_deleted': True}), (3, DebtPayment.CASH, '7.00', {}),
+        ]:
+            DebtPayment.objects.create(
+                debt=debt, customer=customer, amount=Decimal(amount), payment_method=method,
+                payment_date=timezone.make_aware(datetime(2026, 3, day, 23, 30)), **fields
+            )
+
+    def summary(self, **params):
+        return self.client.get('/api/debts/payments/daily_summary/', params)
+
+    def test_totals_per_method_for_a_day(self):
+        data = self.summary(date='2026-03-01').data
+        self.assertEqual((data['total_payments'], data['total_amount']), (3, Decimal('45.00')))
+        self.assertEqual(data['payment_methods'], {
+            DebtPayment.CASH: {'count': 2, 'amount': 25.0}, DebtPayment.ZAAD: {'count': 1, 'amount': 20.0},
+        })
+        self.assertNotIn('series', data)
+
+    def test_date_range_adds_a_series_of_completed_payments(self):
+        data = self.summary(start_date='2026-03-01', end_date='2026-03-02').data
+        self.assertEqual((data['total_payments'], data['total_amount']), (4, Decimal('50.00')))
+        self.assertEqual([(day['count'], day['amount']) for day in data['series']], [(3, 45.0), (1, 5.0)])
+
+        self.assertEqual(self.summary(start_date='2026-03-02', end_date='2026-03-01').status_code, 400)
+        self.assertEqual(self.summary(date='01/03/2026').status_code, 400)
+
+
+class CreditCheckTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.make_fixtures(Decimal('10'))
+        Customer.objects.filter(pk=self.customer.pk).update(credit_limit=Decimal('100'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.debt_id = self.post_credit_sale('5').data['debt_id']
+
+    def check(self, amount):
+        response = self.client.post(
+            '/api/debts/validate-credit/', {'customer_id': self.customer.id, 'credit_amount': amount}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_decisions_follow_the_written_exposure(self):
+        allowed = self.check('30')
+        self.assertEqual(
+            (allowed['total_exposure'], allowed['available_credit'], allowed['can_take_credit']), (60.0, 40.0, True)
+        )
+        refused = self.check('50')
+        self.assertEqual((refused['can_take_credit'], refused['shortfall']), (False, 10.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DebtPayment.objects.create(debt_id=self.debt_id, customer=self.customer, amount=Decimal('20.00'))
+        self.assertTrue(self.check('50')['can_take_credit'])
+
+    def test_editing_a_partly_paid_debt_checks_only_the_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DebtPayment.objects.create(debt_id=self.debt_id, customer=self.customer, amount=Decimal('20.00'))
+
+        # 40.00 is still owed; raising the total by 50.00 reaches 90.00 of the 100.00 limit
+        url = f'/api/debts/debts/{self.debt_id}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            raised = self.client.patch(url, {'total_amount': '110.00'}, format='json')
+        self.assertEqual(raised.status_code, 200, raised.data)
+        self.assertEqual(Debt.objects.get(pk=self.debt_id).remaining_amount, Decimal('90.00'))
+
+        refused = self.client.patch(url, {'total_amount': '121.00'}, format='json')
+        self.assertEqual(refused.status_code, 400)
+        self.assertEqual(self.client.patch(url, {'total_amount': '110.00'}, format='json').status_code, 200)
+
+    def test_batch_checks_are_evaluated_one_by_one(self):
+        response = self.client.post('/api/debts/validate-credit/batch/', {'checks': [
+            {'customer_id': self.customer.id, 'credit_amount': '50'},
+            {'customer_id': 999, 'credit_amount': '1'},
+            {'customer_id': 'x', 'credit_amount': '1'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        first, missing, invalid = response.data['results']
+        self.assertFalse(first['can_take_credit'])
+        self.assertEqual(missing['error'], 'Customer not found')
+        self.assertEqual(invalid['error'], 'Invalid customer_id or credit amount')
+
+
+class IdempotencyKeyTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('10'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_duplicate_payment_posts_record_one_payment(self):
+        debt_id = self.post_credit_sale('5').data['debt_id']
+        payment = {'debt': debt_id, 'customer': self.customer.id, 'amount': '20.00', 'payment_method': 'cash'}
+        first = self.client.post('/api/debts/payments/', payment, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        retry = self.client.post('/api/debts/payments/', payment, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(DebtPayment.objects.count(), 1)
+        self.assertEqual(Debt.objects.get(pk=debt_id).paid_amount, Decimal('20.00'))
+
+    def test_rejected_requests_release_the_key(self):
+        for _ in range(2):
+            rejected = self.post_credit_sale('11', HTTP_IDEMPOTENCY_KEY='sale-1')
+            self.assertEqual(rejected.status_code, 400)
+            self.assertNotIn('Idempotent-Replayed', rejected.headers)
+
+        accepted = self.post_credit_sale('4', HTTP_IDEMPOTENCY_KEY='sale-1')
+        self.assertEqual(accepted.status_code, 201)
+        self.assertEqual(Sale.objects.count(), 1)
+
+
+class ImportLedgerTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('10'))
+
+    def upload(self, **files):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/debts/debts/import/', {
+            kind: SimpleUploadedFile(f'{kind}.csv', content.encode()) for kind, content in files.items()
+        }, format='multipart')
+
+    def test_imports_debts_and_payments_and_recomputes_balances(self):
+        response = self.upload(
+            debts='reference,customer_phone,total_amount,due_date\n'
+                  'B1-1,123,100.00,2020-01-31\nB1-2,123,50.00,2099-01-31\nB1-3,999,10.00,2020-01-31\n',
+            payments='debt_reference,amount,payment_date\nB1-1,100.00,2020-02-01\nB1-2,20.00,2020-02-01\n',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['debts'], response.data['payments'], response.data['errors']), (2, 2, 1))
+
+        statuses = dict(Debt.objects.values_list('external_reference', 'status'))
+        self.assertEqual(statuses, {'B1-1': Debt.PAID, 'B1-2': Debt.PARTIALLY_PAID})
+        self.assertEqual(Debt.objects.get(external_reference='B1-2').paid_amount, Decimal('20.00'))
+        self.assertEqual(DebtPayment.objects.count(), 2)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_balance, Decimal('30.00'))
+        self.assertEqual(CustomerLedgerEntry.objects.first().running_balance, Decimal('30.00'))
+
+        again = self.upload(debts='reference,customer_phone,total_amount,due_date\nB1-1,123,100.00,2020-01-31\n')
+        self.assertEqual((again.data['debts'], again.data['debts_skipped']), (0, 1))
+
+    def test_rerunning_a_payments_file_skips_recorded_payments(self):
+        self.upload(debts='reference,customer_phone,total_amount,due_date\nB1-1,123,100.00,2099-01-31\n')
+        payments = 'debt_reference,amount,payment_date,receipt_number\nB1-1,40.00,2020-02-01,R-7\n'
+        self.assertEqual(self.upload(payments=payments).data['payments'], 1)
+
+        again = self.upload(payments=payments)
+        self.assertEqual((again.data['payments'], again.data['payments_skipped']), (0, 1))
+        self.assertEqual(DebtPayment.objects.count(), 1)
+        self.assertEqual(Debt.objects.get().paid_amount, Decimal('40.00'))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_balance, Decimal('60.00'))
+        self.assertEqual(CustomerLedgerEntry.objects.first().running_balance, Decimal('60.00'))
+
+    def test_rejects_overpayments_and_payments_to_cancelled_debts(self):
+        self.upload(
+            debts='reference,customer_phone,total_amount,due_date\n'
+                  'B1-1,123,100.00,2099-01-31\nB1-2,123,50.00,2099-01-31\n'
+        )
+        Debt.objects.filter(external_reference='B1-2').update(status=Debt.CANCELLED)
+        response = self.upload(
+            payments='debt_reference,amount,payment_date\n'
+                     'B1-1,500.00,2020-02-01\nB1-1,60.00,2020-02-02\nB1-1,60.00,2020-02-03\nB1-2,10.00,2020-02-01\n'
+        )
+        self.assertEqual((response.data['payments'], response.data['errors']), (1, 3))
+        self.assertEqual([error['row'] for error in response.data['error_details']], [2, 4, 5])
+        self.assertEqual(Debt.objects.get(external_reference='B1-1').paid_amount, Decimal('60.00'))
+        self.assertFalse(DebtPayment.objects.filter(debt__external_reference='B1-2').exists())
+
+
+class DeferredCreditSaleTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('10'))
+
+    def test_debts_are_created_in_bulk_when_the_batch_exits(self):
+        with batch.deferred():
+            sales = [
+                Sale.objects.create(
+                    customer=self.customer, total_amount=Decimal('25.00'), created_by=self.user,
+                    payment_method=Sale.CREDIT, payment_status=Sale.PENDING,
+                )
+                for _ in range(3)
+            ]
+            self.assertFalse(Debt.objects.exists())
+            sales[0].total_amount = Decimal('40.00')
+            sales[0].save()
+
+        self.assertEqual(Debt.objects.count(), 3)
+        self.assertEqual(Debt.objects.get(sale=sales[0]).total_amount, Decimal('40.00'))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_balance, Decimal('90.00'))
+        self.assertEqual(CustomerLedgerEntry.objects.first().running_balance, Decimal('90.00'))
+
+
+class AllocationTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+        today = timezone.now().date()
+        # Oldest due first: a, b, c; highest priority score first: c, b, a
+        self.a, self.b, self.c = [
+            Debt.objects.create(
+                customer=self.customer, total_amount=Decimal('100.00'),
+                due_date=today + timedelta(days=days), priority_score=score,
+            )
+            for days, score in ((1, Decimal('10')), (2, Decimal('50')), (3, Decimal('90')))
+        ]
+
+    def paid(self):
+        return [Debt.objects.get(pk=debt.pk).paid_amount for debt in (self.a, self.b, self.c)]
+
+    def test_oldest_and_priority_orders(self):
+        allocate_payment(self.customer, Decimal('150.00'), strategy=OLDEST)
+        self.assertEqual(self.paid(), [Decimal('100.00'), Decimal('50.00'), Decimal('0.00')])
+        self.assertEqual(Debt.objects.get(pk=self.a.pk).status, Debt.PAID)
+
+        allocate_payment(self.customer, Decimal('120.00'), strategy=PRIORITY)
+        self.assertEqual(self.paid(), [Decimal('100.00'), Decimal('70.00'), Decimal('100.00')])
+
+    def test_one_ledger_entry_per_allocation(self):
+        updated = allocate_payment(self.customer, Decimal('250.00'))
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(DebtPayment.objects.count(), 3)
+        [entry] = CustomerLedgerEntry.objects.filter(customer=self.customer)
+        self.assertEqual(entry.amount, Decimal('-250.00'))
+
+    def test_rejects_amounts_above_the_open_balance(self):
+        with self.assertRaises(AllocationError):
+            allocate_payment(self.customer, Decimal('300.01'))
+        self.assertFalse(DebtPayment.objects.exists())
+        self.assertFalse(CustomerLedgerEntry.objects.exists())
+
+    def test_single_payment_applies_to_the_current_debt_row(self):
+        stale = Debt.objects.get(pk=self.a.pk)
+        allocate_payment(self.customer, Decimal('30.00'))
+        DebtPayment.objects.create(debt=stale, customer=self.customer, amount=Decimal('10.00'))
+        self.assertEqual(self.paid()[0], Decimal('40.00'))
+
+        payment = DebtPayment.objects.get(amount=Decimal('10.00'))
+        payment.delete()
+        self.assertEqual(self.paid()[0], Decimal('30.00'))
+
+
+class InterestAccrualTests(TestCase):
+    def test_snapshot_matches_per_debt_interest_rounded_half_up(self):
+        customer = Customer.objects.create(name='Builder', phone='123')
+        today = timezone.now().date()
+        debts = [
+            Debt.objects.create(customer=customer, total_amount=amount, interest_rate=rate, due_date=today)
+            for amount, rate in [(Decimal('1.00'), Decimal('36.50')), (Decimal('1234.56'), Decimal('7.25')),
+                                 (Decimal('500.00'), Decimal('0'))]
+        ]
+        as_of = today + timedelta(days=5)
+
+        updated, total = accrue_interest(as_of=as_of)
+        self.assertEqual(updated, 2)
+        expected = []
+        for debt in debts:
+            debt.refresh_from_db()
+            self.assertEqual(debt.accrued_interest, debt.calculate_interest(as_of))
+            expected.append(debt.accrued_interest)
+        self.assertEqual(expected[0], Decimal('0.01'))
+        self.assertEqual(total, sum(expected))
+        self.assertEqual(portfolio_interest(as_of=as_of), total)
+        self.assertEqual(accrue_interest(as_of=as_of)[0], 0)
+
+
+class PriorityScoringTests(TestCase):
+    def setUp(self):
+        customer = Customer.objects.create(name='Builder', phone='123')
+        today = timezone.now().date()
+        self.fresh, self.stale, self.fell_due = [
+            Debt.objects.create(customer=customer, total_amount=Decimal('100.00'), due_date=today + timedelta(days=days))
+            for days in (10, 10, 0)
+        ]
+
+    def test_incremental_selection_includes_debts_aging_without_writes(self):
+        self.assertEqual(score_debts()[0], 3)
+        today = timezone.localdate()
+        morning = timezone.make_aware(datetime.combine(today, time(6)))
+        Debt.objects.filter(pk__in=[self.fresh.pk, self.fell_due.pk]).update(priority_scored_at=morning)
+        Debt.objects.filter(pk=self.fell_due.pk).update(due_date=today)
+        Debt.objects.filter(pk=self.stale.pk).update(priority_scored_at=morning - timedelta(days=1))
+
+        # Early next morning: less than a day since the last run
+        now = morning + timedelta(hours=23)
+        selected = set(changed_debts(now, now=now).values_list('id', flat=True))
+        self.assertEqual(selected, {self.stale.id, self.fell_due.id})
+
+    def test_keep_priority_only_saves_scores(self):
+        Debt.objects.filter(pk=self.fresh.pk).update(priority=Debt.CRITICAL)
+        self.assertEqual(score_debts(set_priority=False), (3, 0))
+        self.fresh.refresh_from_db()
+        self.assertEqual(self.fresh.priority, Debt.CRITICAL)
+        self.assertIsNotNone(self.fresh.priority_score)
+
+        score_debts()
+        self.fresh.refresh_from_db()
+        self.assertNotEqual(self.fresh.priority, Debt.CRITICAL)
+
+
+class ReminderDispatchTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+
+    def remind(self, debt):
+        return DebtReminder.objects.create(
+            debt=debt, customer=self.customer, reminder_type=DebtReminder.SMS,
+            scheduled_date=timezone.now() - timedelta(hours=1), message='{remaining_amount} outstanding',
+        )
+
+    def test_reminders_of_closed_debts_are_cancelled_not_sent(self):
+        due_date = timezone.now().date()
+        open_debt = Debt.objects.create(customer=self.customer, total_amount=Decimal('100.00'), due_date=due_date)
+        paid = Debt.objects.create(customer=self.customer, total_amount=Decimal('50.00'), due_date=due_date)
+        deleted = Debt.objects.create(customer=self.customer, total_amount=Decimal('70.00'), due_date=due_date)
+        reminders = [self.remind(debt) for debt in (open_debt, paid, deleted)]
+        Debt.objects.filter(pk=paid.pk).update(status=Debt.PAID, paid_amount=Decimal('50.00'))
+        Debt.objects.filter(pk=deleted.pk).update(is_deleted=True)
+
+        stream = io.StringIO()
+        self.assertEqual(dispatch_due_reminders(ConsoleTransport(stream)), (1, 0))
+        self.assertIn(f'debt #{open_debt.id}: 100.00 outstanding', stream.getvalue())
+        self.assertEqual(
+            [DebtReminder.objects.get(pk=reminder.pk).status for reminder in reminders],
+            [DebtReminder.SENT, DebtReminder.CANCELLED, DebtReminder.CANCELLED],
+        )
+
+
+class ReminderSchedulingTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+        self.today = timezone.now().date()
+
+    def debt(self, days_until_due, **fields):
+        return Debt.objects.create(
+            customer=self.customer, total_amount=Decimal('100.00'),
+            due_date=self.today + timedelta(days=days_until_due), **fields
+        )
+
+    def test_schedules_the_latest_step_reached_once(self):
+        upcoming = self.debt(2)
+        overdue = self.debt(-10)
+        self.debt(10)
+        self.debt(-10, status=Debt.PAID, paid_amount=Decimal('100.00'))
+
+        self.assertEqual(schedule_reminders(self.today, dry_run=True), 2)
+        self.assertFalse(DebtReminder.objects.exists())
+        self.assertEqual(schedule_reminders(self.today), 2)
+
+        scheduled = {
+            reminder.debt_id: timezone.localtime(reminder.scheduled_date).date()
+            for reminder in DebtReminder.objects.all()
+        }
+        self.assertEqual(scheduled, {
+            upcoming.id: upcoming.due_date - timedelta(days=3),
+            overdue.id: overdue.due_date + timedelta(days=7),
+        })
+
+        # Neither a pending reminder nor one already sent for the step is repeated
+        self.assertEqual(schedule_reminders(self.today), 0)
+        DebtReminder.objects.update(status=DebtReminder.SENT)
+        self.assertEqual(schedule_reminders(self.today), 0)
+        # Later steps are scheduled once they are reached, for the third debt too
+        self.assertEqual(schedule_reminders(self.today + timedelta(days=20)), 3)
+        self.assertTrue(DebtReminder.objects.filter(debt=overdue, reminder_type=DebtReminder.PHONE).exists())
+
+
+class DebtAdminTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client.force_login(admin)
+        self.due_date = timezone.now().date() + timedelta(days=30)
+
+    def add_debts(self, count):
+        for index in range(count):
+            customer = Customer.objects.create(name=f'Customer {index}', phone=f'55{index}')
+            debt = Debt.objects.create(customer=customer, total_amount=Decimal('100.00'), due_date=self.due_date)
+            DebtPayment.objects.create(debt=debt, customer=customer, amount=Decimal('10.00'))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'o': '5'} if url.endswith('/debt/') else {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = ['/admin/debts/debt/', '/admin/debts/debtpayment/', '/admin/debts/debtreminder/']
+        self.add_debts(2)
+        few = [self.changelist_queries(url) for url in urls]
+        self.add_debts(8)
+        self.assertEqual([self.changelist_queries(url) for url in urls], few)
+
+    def test_interest_rate_filter(self):
+        self.add_debts(2)
+        Debt.objects.filter(pk=Debt.objects.first().pk).update(interest_rate=Decimal('3.00'))
+        response = self.client.get('/admin/debts/debt/', {'interest': 'low'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class ExportCustomerTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('100'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/debts/debts/export_customer/', {'customer_id': self.customer.id, **params})
+            content = b''.join(response.streaming_content).decode()
+        return content, len(queries)
+
+    def test_streams_one_document_with_grouped_totals(self):
+        debt_ids = [self.post_credit_sale(quantity).data['debt_id'] for quantity in ('2', '3')]
+        DebtPayment.objects.create(debt_id=debt_ids[0], customer=self.customer, amount=Decimal('10.00'))
+
+        content, queries = self.export()
+        document = json.loads(content)
+        self.assertEqual(document['summary'], {
+            'total_debts': 2, 'total_amount': 60.0, 'total_paid': 10.0, 'total_outstanding': 50.0,
+        })
+        self.assertEqual(
+            [(row['name'], row['sku'], row['quantity'], row['total_value']) for row in document['materials']],
+            [('Cement', 'N/A', 5.0, 60.0)],
+        )
+        # Newest first, as the printed report keeps only the first ten
+        self.assertEqual([debt['id'] for debt in document['debts']], debt_ids[::-1])
+        self.assertEqual([len(debt['payments']) for debt in document['debts']], [0, 1])
+
+        for quantity in ('1', '1', '1'):
+            self.post_credit_sale(quantity)
+        content, more_debts_queries = self.export()
+        self.assertEqual(len(json.loads(content)['debts']), 5)
+        self.assertEqual(more_debts_queries, queries)
+
+    def test_jsonl_stream_and_unknown_customer(self):
+        self.post_credit_sale('2')
+        lines = self.export(stream='jsonl')[0].splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['report_type'], 'customer_debt_report')
+        self.assertEqual(json.loads(lines[1])['remaining_amount'], 24.0)
+
+        response = self.client.get('/api/debts/debts/export_customer/', {'customer_id': '999'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_debt_records_page_newest_first(self):
+        debt_ids = [self.post_credit_sale('1').data['debt_id'] for _ in range(5)]
+        # Equal creation times are ordered by id
+        Debt.objects.filter(pk__in=debt_ids[1:4]).update(created_at=Debt.objects.get(pk=debt_ids[2]).created_at)
+        records = iter_debt_records(Debt.objects.all(), chunk_size=2)
+        self.assertEqual([record['id'] for record in records], debt_ids[::-1])
+
+
+class StatementPdfTests(CreditSaleMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('100'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.debt_id = self.post_credit_sale('2').data['debt_id']
+        DebtPayment.objects.create(debt_id=self.debt_id, customer=self.customer, amount=Decimal('5.00'))
+
+    def test_report_and_debt_statement_endpoints_return_pdfs(self):
+        for url in ('/api/debts/debts/export_report/', f'/api/debts/debts/{self.debt_id}/export_individual/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_renders_batches_from_plain_dicts_in_order(self):
+        other = Customer.objects.create(name='Mason & <Sons>', phone='456')
+        Debt.objects.create(customer=other, total_amount=Decimal('10.00'), due_date=timezone.localdate())
+        statements = customer_statements([other, self.customer])
+        # Plain data, so it pickles for worker processes
+        self.assertEqual(json.loads(json.dumps(statements)), statements)
+
+        for workers in (1, 2):
+            rendered = list(render_customer_statements(statements, workers=workers))
+            self.assertEqual([customer_id for customer_id, _ in rendered], [other.id, self.customer.id])
+            self.assertTrue(all(pdf.startswith(b'%PDF') for _, pdf in rendered))
+
+
+class StatementTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+        due_date = timezone.localdate() + timedelta(days=30)
+        self.debt = Debt.objects.create(customer=self.customer, total_amount=Decimal('100.00'), due_date=due_date)
+        DebtPayment.objects.create(debt=self.debt, customer=self.customer, amount=Decimal('40.00'))
+        Debt.objects.create(
+            customer=self.customer, total_amount=Decimal('50.00'), due_date=due_date, status=Debt.CANCELLED
+        )
+        Customer.objects.create(name='Settled', phone='456')
+
+    def test_month_end_manifest_matches_the_statement_summaries(self):
+        with tempfile.TemporaryDirectory() as base:
+            call_command('generate_statements', output_dir=base, workers=1, stdout=io.StringIO())
+            output = Path(base) / timezone.localdate().isoformat()
+            manifest = json.loads((output / 'manifest.json').read_text())
+            [entry] = manifest['files']
+            self.assertTrue((output / entry['file']).read_bytes().startswith(b'%PDF'))
+
+        self.assertEqual((entry['customer_id'], entry['open_debts']), (self.customer.id, 1))
+        self.assertEqual((entry['outstanding'], manifest['total_outstanding']), ('60.00', '60.00'))
+        [statement] = customer_statements([self.customer])
+        self.assertEqual(statement['summary']['total_outstanding'], 60.0)
+        self.assertEqual(len(statement['debts']), 2)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCreditSaleTests(CreditSaleMixin, TransactionTestCase):
+    def setUp(self):
+        self.make_fixtures(Decimal('10'))
+
+    def test_concurrent_sales_never_oversell(self):
+        attempts, statuses = 8, []
+        barrier = threading.Barrier(attempts)
+
+        def sell():
+            try:
+                barrier.wait()
+                statuses.append(self.post_credit_sale('3').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell) for _ in range(attempts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.material.refresh_from_db()
+        sold = statuses.count(201)
+        self.assertEqual(sold, 3)
+        self.assertEqual(self.material.quantity_in_stock, Decimal('1.00'))
+        self.assertEqual(Debt.objects.count(), sold)
@@ -6,7 +6,8 @@ from .views import (
     DebtPaymentViewSet,
     DebtReminderViewSet,
     create_credit_sale,
-    validate_customer_credit
+    validate_customer_credit,
+    validate_customer_credit_batch
 )
 
 router = DefaultRouter()
@@ -18,4 +19,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('create-credit-sale/', create_credit_sale, name='create-credit-sale'),
     path('validate-credit/', validate_customer_credit, name='validate-customer-credit'),
+    path('validate-credit/batch/', validate_customer_credit_batch, name='validate-customer-credit-batch'),
 ]
\ No newline at end of file
@@ -1,31 +1,94 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count, Max
+from django.db.models import (
+    Q, F, Sum, Count, Max, Case, When, Value, DecimalField, ExpressionWrapper
+)
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
 from django.db import transaction
 from datetime import datetime, timedelta
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from django.http import HttpResponse
-import io
+from decimal import Decimal, InvalidOperation
+from django.http import HttpResponse, StreamingHttpResponse
+import csv
+import json
 
+from . import statements
+from .allocation import AllocationError, allocate_payment
+from .exposure import CreditLimitExceeded, get_exposure, get_exposures
+from .imports import ImportFileError, import_files
 from .models import Debt, DebtPayment, DebtReminder
+from .pdf import render_debt_report, render_debt_statement
 from .serializers import (
     DebtSerializer, DebtPaymentSerializer, DebtReminderSerializer,
-    DebtSummarySerializer, CustomerDebtSummarySerializer, CreateCreditSaleSerializer
+    DebtSummarySerializer, CustomerDebtSummarySerializer, CreateCreditSaleSerializer,
+    PaymentAllocationSerializer
 )
-from customers.models import Customer
-from sales.models import Sale, SaleItem
+from customers.models import Customer, CustomerLedgerEntry
+from sales.models import Sale
+from sales.orders import InsufficientStock, write_sale
+from users.idempotency import IdempotentCreateMixin, idempotent, idempotent_response
+from users.permissions import IsAdminOrManager
 from inventory.models import Material
 
 
+# Upper bound on the number of checks accepted by validate_customer_credit_batch
+MAX_CREDIT_CHECKS = 500
+
+# Longest range accepted by DebtPaymentViewSet.daily_summary
+MAX_SUMMARY_DAYS = 366
+
+OPEN_DEBT_STATUSES = [Debt.PENDING, Debt.PARTIALLY_PAID, Debt.OVERDUE]
+
+REMAINING_AMOUNT = ExpressionWrapper(
+    F('total_amount') - F('paid_amount'), output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+# (label, first day past due, last day past due); None means unbounded
+AGING_BUCKETS = [
+    ('current', None, -1),
+    ('0-30', 0, 30),
+    ('31-60', 31, 60),
+    ('61-90', 61, 90),
+    ('90+', 91, None),
+]
+
+
+def aging_field(label):
+    return 'days_' + label.replace('-', '_').replace('+', '_plus')
+
+
+def aging_buckets(today):
+    """Conditional sums of the remaining amount per aging bucket, bounded on due_date."""
+    buckets = {}
+    for label, first_day, last_day in AGING_BUCKETS:
+        bounds = Q()
+        if first_day is not None:
+            bounds &= Q(due_date__lte=today - timedelta(days=first_day))
+        if last_day is not None:
+            bounds &= Q(due_date__gte=today - timedelta(days=last_day))
+        buckets[aging_field(label)] = Coalesce(
+            Sum(Case(When(bounds, then=REMAINING_AMOUNT), default=Value(0), output_field=REMAINING_AMOUNT.output_field)),
+            Value(0), output_field=REMAINING_AMOUNT.output_field,
+        )
+    return buckets
+
+
+def day_start(day):
+    """Aware datetime at midnight starting ``day``, for index-friendly range filters."""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+class Echo:
+    """File-like object whose write returns the value, for streaming csv.writer output."""
+    
+    def write(self, value):
+        return value
+
+
 class DebtViewSet(viewsets.ModelViewSet):
     """ViewSet for managing debts."""
     
@@ -35,7 +98,7 @@ class DebtViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'priority', 'customer', 'due_date', 'created_at']
     search_fields = ['customer__name', 'customer__phone', 'notes', 'payment_terms']
-    ordering_fields = ['created_at', 'due_date', 'total_amount', 'remaining_amount']
+    ordering_fields = ['created_at', 'due_date', 'total_amount', 'remaining_amount', 'priority_score']
     ordering = ['-created_at']
     
     def perform_create(self, serializer):
@@ -48,10 +111,15 @@ class DebtViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         """Soft delete debt and update customer balance."""
-        # Update customer outstanding balance
-        customer = instance.customer
-        customer.outstanding_balance -= instance.remaining_amount
-        customer.save()
+        # Write the outstanding amount off the customer ledger
+        CustomerLedgerEntry.objects.record(
+            instance.customer,
+            CustomerLedgerEntry.ADJUSTMENT,
+            -instance.remaining_amount,
+            description=f"Debt #{instance.id} deleted",
+            created_by=self.request.user,
+            debt=instance,
+        )
         
         # Soft delete
         instance.is_deleted = True
@@ -77,25 +145,79 @@ class DebtViewSet(viewsets.ModelViewSet):
         """Get debt summary statistics."""
         queryset = self.get_queryset()
         
-        total_debts = queryset.count()
-        total_amount = queryset.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        paid_amount = queryset.aggregate(Sum('paid_amount'))['paid_amount__sum'] or 0
-        remaining_amount = total_amount - paid_amount
-        
-        overdue_debts = queryset.filter(status=Debt.OVERDUE)
-        overdue_count = overdue_debts.count()
-        overdue_amount = sum(debt.remaining_amount for debt in overdue_debts)
+        is_overdue = Q(status=Debt.OVERDUE)
+        totals = queryset.aggregate(
+            total_debts=Count('id'),
+            total_amount_sum=Sum('total_amount'),
+            paid_amount_sum=Sum('paid_amount'),
+            overdue_count=Count('id', filter=is_overdue),
+            overdue_amount=Sum(REMAINING_AMOUNT, filter=is_overdue),
+            accrued_interest=Sum('accrued_interest'),
+        )
+        total_amount = totals['total_amount_sum'] or 0
+        paid_amount = totals['paid_amount_sum'] or 0
         
         return Response({
-            'total_debts': total_debts,
+            'total_debts': totals['total_debts'],
             'total_amount': total_amount,
             'paid_amount': paid_amount,
-            'remaining_amount': remaining_amount,
-            'overdue_count': overdue_count,
-            'overdue_amount': overdue_amount,
+            'remaining_amount': total_amount - paid_amount,
+            'overdue_count': totals['overdue_count'],
+            'overdue_amount': totals['overdue_amount'] or 0,
+            'accrued_interest': totals['accrued_interest'] or 0,
             'collection_rate': (paid_amount / total_amount * 100) if total_amount > 0 else 0
         })
     
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """
+        Outstanding debt aged by days past due, per customer and overall.
+        
+        Query params:
+          - customer: limit to one customer
+          - export: csv to stream every customer row as CSV
+        """
+        today = timezone.now().date()
+        queryset = self.get_queryset().filter(status__in=OPEN_DEBT_STATUSES)
+        customer_id = request.query_params.get('customer')
+        if customer_id:
+            queryset = queryset.filter(customer_id=customer_id)
+        
+        buckets = aging_buckets(today)
+        rows = queryset.values('customer_id', 'customer__name').annotate(
+            debts_count=Count('id'), total_outstanding=Sum(REMAINING_AMOUNT), **buckets
+        ).order_by('-total_outstanding', 'customer_id')
+        
+        if request.query_params.get('export') == 'csv':
+            return self._stream_aging_csv(rows, today)
+        
+        totals = queryset.aggregate(
+            debts_count=Count('id'), total_outstanding=Sum(REMAINING_AMOUNT), **buckets
+        )
+        page = self.paginate_queryset(rows)
+        response = self.get_paginated_response(page) if page is not None else Response({'results': list(rows)})
+        response.data['as_of'] = today
+        response.data['buckets'] = [label for label, _, _ in AGING_BUCKETS]
+        response.data['totals'] = {key: value or 0 for key, value in totals.items()}
+        return response
+    
+    def _stream_aging_csv(self, rows, today):
+        fields = ['customer_id', 'customer__name', 'debts_count', 'total_outstanding'] + [
+            aging_field(label) for label, _, _ in AGING_BUCKETS
+        ]
+        
+        def generate():
+            writer = csv.writer(Echo())
+            yield writer.writerow(['customer_id', 'customer_name', 'debts_count', 'total_outstanding'] + [
+                label for label, _, _ in AGING_BUCKETS
+            ])
+            for row in rows.iterator(chunk_size=2000):
+                yield writer.writerow([row[field] for field in fields])
+        
+        response = StreamingHttpResponse(generate(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="debt_aging_{today:%Y%m%d}.csv"'
+        return response
+    
     @action(detail=False, methods=['get'])
     def customer_summary(self, request):
         """Get debt summary by customer."""
@@ -131,6 +253,32 @@ class DebtViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Debt marked as paid'})
     
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        parser_classes=[MultiPartParser], permission_classes=[IsAuthenticated, IsAdminOrManager],
+    )
+    def import_ledger(self, request):
+        """
+        Import historical debts and payments from uploaded CSV/XLSX files
+        (multipart fields ``debts`` and ``payments``) in one transaction.
+        """
+        uploads = {kind: request.FILES.get(kind) for kind in ('debts', 'payments')}
+        if not any(uploads.values()):
+            return Response(
+                {'error': 'Upload a debts and/or a payments file.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            summary = import_files(**{
+                f'{kind}_file': (upload, upload.name)
+                for kind, upload in uploads.items() if upload
+            }, user=request.user)
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(summary, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['get'])
     def materials(self, request, pk=None):
         """Get detailed materials breakdown for a specific debt."""
@@ -157,525 +305,81 @@ class DebtViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def export_report(self, request):
         """Export comprehensive debt report as PDF with materials information."""
-        try:
-            # Check authentication
-            if not request.user.is_authenticated:
-                return Response(
-                    {'error': 'Authentication required for export'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            # Create PDF response
-            response = HttpResponse(content_type='application/pdf')
-            filename = f"debt_report_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            # Create PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch)
-            styles = getSampleStyleSheet()
-            elements = []
-            
-            # Company Header
-            header_style = ParagraphStyle(
-                'CustomHeader',
-                parent=styles['Heading1'],
-                fontSize=18,
-                textColor=colors.darkblue,
-                spaceAfter=20,
-                alignment=1  # Center alignment
-            )
-            title = Paragraph("NurBuild Management System", header_style)
-            subtitle = Paragraph("Comprehensive Debt Report", styles['Heading2'])
-            elements.extend([title, subtitle, Spacer(1, 12)])
-            
-            # Date and Generated By
-            date_str = timezone.now().strftime("%B %d, %Y at %I:%M %p")
-            user_info = f"Generated by: {request.user.username} on {date_str}"
-            date_para = Paragraph(user_info, styles['Normal'])
-            elements.append(date_para)
-            elements.append(Spacer(1, 20))
-            
-            # Summary Section
-            try:
-                summary_data = self.summary(request).data
-                summary_title = Paragraph("Executive Summary", styles['Heading2'])
-                elements.append(summary_title)
-                elements.append(Spacer(1, 12))
-                
-                summary_table_data = [
-                    ['Metric', 'Value'],
-                    ['Total Debts', str(summary_data.get('total_debts', 0))],
-                    ['Total Amount', f"${summary_data.get('total_amount', 0):,.2f}"],
-                    ['Paid Amount', f"${summary_data.get('paid_amount', 0):,.2f}"],
-                    ['Outstanding Amount', f"${summary_data.get('remaining_amount', 0):,.2f}"],
-                    ['Overdue Debts', str(summary_data.get('overdue_count', 0))],
-                    ['Overdue Amount', f"${summary_data.get('overdue_amount', 0):,.2f}"],
-                    ['Collection Rate', f"{summary_data.get('collection_rate', 0):.1f}%"],
-                ]
-                
-                summary_table = Table(summary_table_data, colWidths=[3*inch, 2*inch])
-                summary_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 10)
-                ]))
-                
-                elements.append(summary_table)
-                elements.append(Spacer(1, 24))
-            except Exception as e:
-                # If summary fails, continue without it
-                error_para = Paragraph(f"Summary data unavailable: {str(e)}", styles['Normal'])
-                elements.append(error_para)
-                elements.append(Spacer(1, 12))
-            
-            # Materials Analysis Section
-            try:
-                materials_data = self.materials_analysis(request).data
-                if materials_data.get('materials_analysis'):
-                    materials_title = Paragraph("Top Materials in Debt", styles['Heading2'])
-                    elements.append(materials_title)
-                    elements.append(Spacer(1, 12))
-                    
-                    materials_table_data = [['Material', 'Outstanding Value', 'Customers']]
-                    for material in materials_data['materials_analysis'][:10]:  # Top 10 materials
-                        materials_table_data.append([
-                            material.get('material_name', 'N/A')[:25],
-                            f"${material.get('outstanding_value', 0):,.2f}",
-                            str(material.get('customers_count', 0))
-                        ])
-                    
-                    materials_table = Table(materials_table_data, colWidths=[3*inch, 2*inch, 1.5*inch])
-                    materials_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                        ('FONTSIZE', (0, 1), (-1, -1), 8)
-                    ]))
-                    
-                    elements.append(materials_table)
-                    elements.append(Spacer(1, 24))
-            except Exception as e:
-                # If materials analysis fails, continue without it
-                pass
-            
-            # Detailed Debt List
-            debts = self.get_queryset().select_related('customer').prefetch_related('sale__items__material')[:50]
-            if debts:
-                debt_title = Paragraph("Detailed Debt Records (Top 50)", styles['Heading2'])
-                elements.append(debt_title)
-                elements.append(Spacer(1, 12))
-                
-                debt_data = [['Customer', 'Amount', 'Paid', 'Outstanding', 'Due Date', 'Status', 'Materials']]
-                for debt in debts:
-                    # Get materials summary for this debt
-                    materials_summary = debt.materials_summary if hasattr(debt, 'materials_summary') else 'N/A'
-                    if len(materials_summary) > 30:
-                        materials_summary = materials_summary[:27] + '...'
-                    
-                    debt_data.append([
-                        debt.customer.name[:15],
-                        f"${debt.total_amount:,.0f}",
-                        f"${debt.paid_amount:,.0f}",
-                        f"${debt.remaining_amount:,.0f}",
-                        debt.due_date.strftime("%m/%d/%y"),
-                        debt.get_status_display()[:8],
-                        materials_summary
-                    ])
-                
-                debt_table = Table(debt_data, colWidths=[1.2*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1.8*inch])
-                debt_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkorange),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 8),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.lightyellow),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 7),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE')
-                ]))
-                
-                elements.append(debt_table)
-            
-            # Footer
-            elements.append(Spacer(1, 30))
-            footer_text = f"Report generated on {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} | NurBuild Management System"
-            footer = Paragraph(footer_text, styles['Normal'])
-            elements.append(footer)
-            
-            # Build PDF
-            doc.build(elements)
-            pdf = buffer.getvalue()
-            buffer.close()
-            response.write(pdf)
-            
-            return response
-            
-        except Exception as e:
-            # Return error response instead of crashing
-            return Response(
-                {'error': f'Export failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        debts = self.get_queryset()
+        now = timezone.now()
+        pdf = render_debt_report({
+            'generated_by': request.user.get_full_name() or request.user.email,
+            'generated_at': now,
+            'summary': self.summary(request).data,
+            'materials': statements.report_materials(debts.filter(sale__isnull=False)),
+            'debts': statements.report_debts(debts),
+        })
+        return self._pdf_response(pdf, f"debt_report_{now:%Y%m%d_%H%M%S}.pdf")
     
     @action(detail=True, methods=['get'])
     def export_individual(self, request, pk=None):
         """Export individual debt report with full details."""
-        try:
-            # Check authentication
-            if not request.user.is_authenticated:
-                return Response(
-                    {'error': 'Authentication required for export'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            debt = self.get_object()
-            
-            # Create PDF response
-            response = HttpResponse(content_type='application/pdf')
-            filename = f"debt_{debt.id}_statement_{timezone.now().strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            # Create PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch)
-            styles = getSampleStyleSheet()
-            elements = []
-            
-            # Company Header
-            header_style = ParagraphStyle(
-                'CustomHeader',
-                parent=styles['Heading1'],
-                fontSize=20,
-                textColor=colors.darkblue,
-                spaceAfter=20,
-                alignment=1
-            )
-            title = Paragraph("NurBuild Management System", header_style)
-            subtitle = Paragraph(f"Debt Statement #{debt.id}", styles['Heading2'])
-            elements.extend([title, subtitle, Spacer(1, 20)])
-            
-            # Customer Information
-            customer_info = f"""
-            <b>Customer Information:</b><br/>
-            Name: {debt.customer.name}<br/>
-            Phone: {debt.customer.phone}<br/>
-            Email: {debt.customer.email or 'N/A'}<br/>
-            Credit Limit: ${debt.customer.credit_limit or 0:,.2f}
-            """
-            customer_para = Paragraph(customer_info, styles['Normal'])
-            elements.append(customer_para)
-            elements.append(Spacer(1, 20))
-            
-            # Debt Summary
-            debt_info = f"""
-            <b>Debt Summary:</b><br/>
-            Debt ID: #{debt.id}<br/>
-            Created Date: {debt.created_at.strftime('%B %d, %Y')}<br/>
-            Due Date: {debt.due_date.strftime('%B %d, %Y')}<br/>
-            Status: {debt.get_status_display()}<br/>
-            Priority: {debt.get_priority_display()}<br/>
-            Total Amount: ${debt.total_amount:,.2f}<br/>
-            Paid Amount: ${debt.paid_amount:,.2f}<br/>
-            <b>Outstanding Balance: ${debt.remaining_amount:,.2f}</b>
-            """
-            debt_para = Paragraph(debt_info, styles['Normal'])
-            elements.append(debt_para)
-            elements.append(Spacer(1, 20))
-            
-            # Materials Breakdown
-            if debt.sale and debt.sale.items.exists():
-                materials_title = Paragraph("Materials Breakdown", styles['Heading2'])
-                elements.append(materials_title)
-                elements.append(Spacer(1, 12))
-                
-                materials_data = [['Material', 'SKU', 'Quantity', 'Unit Price', 'Total Value']]
-                for item in debt.sale.items.select_related('material'):
-                    materials_data.append([
-                        item.material.name,
-                        item.material.sku,
-                        f"{item.quantity} {item.material.unit.abbreviation}",
-                        f"${item.price:,.2f}",
-                        f"${(item.quantity * item.price):,.2f}"
-                    ])
-                
-                materials_table = Table(materials_data, colWidths=[2.5*inch, 1.5*inch, 1*inch, 1*inch, 1*inch])
-                materials_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9)
-                ]))
-                
-                elements.append(materials_table)
-                elements.append(Spacer(1, 20))
-            
-            # Payment History
-            payments = debt.payments.filter(is_deleted=False, status='completed').order_by('-payment_date')
-            if payments.exists():
-                payment_title = Paragraph("Payment History", styles['Heading2'])
-                elements.append(payment_title)
-                elements.append(Spacer(1, 12))
-                
-                payment_data = [['Date', 'Amount', 'Method', 'Reference', 'Received By']]
-                for payment in payments:
-                    payment_data.append([
-                        payment.payment_date.strftime('%m/%d/%Y'),
-                        f"${payment.amount:,.2f}",
-                        payment.get_payment_method_display(),
-                        payment.reference_number or 'N/A',
-                        payment.received_by.username if payment.received_by else 'N/A'
-                    ])
-                
-                payment_table = Table(payment_data, colWidths=[1.2*inch, 1*inch, 1.2*inch, 1.5*inch, 1.1*inch])
-                payment_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 9),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8)
-                ]))
-                
-                elements.append(payment_table)
-                elements.append(Spacer(1, 20))
-            
-            # Footer
-            footer_text = f"Statement generated on {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} | NurBuild Management System"
-            footer = Paragraph(footer_text, styles['Normal'])
-            elements.append(footer)
-            
-            # Build PDF
-            doc.build(elements)
-            pdf = buffer.getvalue()
-            buffer.close()
-            response.write(pdf)
-            
-            return response
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Export failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        debt = self.get_object()
+        now = timezone.now()
+        pdf = render_debt_statement(statements.debt_statement(debt), f"{now:%Y-%m-%d %H:%M:%S}")
+        return self._pdf_response(pdf, f"debt_{debt.id}_statement_{now:%Y%m%d}.pdf")
+    
+    def _pdf_response(self, pdf, filename):
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
     
     @action(detail=False, methods=['get'])
     def export_customer(self, request):
-        """Export all debts for a specific customer as JSON data for printing."""
-        import logging
-        logger = logging.getLogger(__name__)
+        """
+        Export all debts of a customer as JSON for printing, streamed.
         
-        try:
-            # Check authentication
-            if not request.user.is_authenticated:
-                return Response(
-                    {'error': 'Authentication required for export'},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-            
-            customer_id = request.query_params.get('customer_id')
-            if not customer_id:
-                return Response(
-                    {'error': 'customer_id parameter is required'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            logger.info(f"Exporting customer data for customer_id: {customer_id}")
-            
-            # Get customer and their debts
-            from customers.models import Customer
-            try:
-                customer = Customer.objects.get(id=customer_id)
-                logger.info(f"Found customer: {customer.name}")
-            except Customer.DoesNotExist:
-                return Response(
-                    {'error': 'Customer not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            debts = self.get_queryset().filter(customer=customer).select_related('sale').prefetch_related('sale__items__material', 'payments')
-            logger.info(f"Found {debts.count()} debts for customer")
-            
-            # Prepare customer information with safe field access
-            try:
-                customer_info = {
-                    'id': customer.id,
-                    'name': getattr(customer, 'name', 'N/A'),
-                    'phone': getattr(customer, 'phone', 'N/A'),
-                    'email': getattr(customer, 'email', None) or 'N/A',
-                    'customer_type': getattr(customer, 'get_customer_type_display', lambda: 'N/A')(),
-                    'credit_limit': float(getattr(customer, 'credit_limit', 0) or 0),
-                    'outstanding_balance': float(getattr(customer, 'outstanding_balance', 0) or 0)
-                }
-                logger.info("Customer info prepared successfully")
-            except Exception as e:
-                logger.error(f"Error preparing customer info: {str(e)}")
-                return Response(
-                    {'error': f'Error preparing customer information: {str(e)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            # Prepare debt summary
-            debt_summary = {
-                'total_debts': debts.count(),
-                'total_amount': 0,
-                'total_paid': 0,
-                'total_outstanding': 0
-            }
-            
-            # Prepare detailed debt records
-            debt_records = []
-            materials_dict = {}
-            
-            try:
-                for debt in debts:
-                    logger.info(f"Processing debt {debt.id}")
-                    
-                    # Safe access to debt amounts
-                    try:
-                        total_amount = float(getattr(debt, 'total_amount', 0) or 0)
-                        paid_amount = float(getattr(debt, 'paid_amount', 0) or 0)
-                        remaining_amount = float(getattr(debt, 'remaining_amount', 0) or 0)
-                        
-                        debt_summary['total_amount'] += total_amount
-                        debt_summary['total_paid'] += paid_amount
-                        debt_summary['total_outstanding'] += remaining_amount
-                    except Exception as e:
-                        logger.error(f"Error calculating debt amounts for debt {debt.id}: {str(e)}")
-                        continue
-                    
-                    # Prepare payment history for this debt
-                    payments = []
-                    try:
-                        for payment in debt.payments.all():
-                            try:
-                                payment_data = {
-                                    'id': payment.id,
-                                    'amount': float(getattr(payment, 'amount', 0) or 0),
-                                    'payment_method': getattr(payment, 'payment_method', 'N/A'),
-                                    'date': getattr(payment, 'created_at', timezone.now()).strftime('%Y-%m-%d') if hasattr(payment, 'created_at') else 'N/A',
-                                    'notes': getattr(payment, 'notes', '') or ''
-                                }
-                                payments.append(payment_data)
-                            except Exception as e:
-                                logger.error(f"Error processing payment {payment.id}: {str(e)}")
-                                continue
-                    except Exception as e:
-                        logger.error(f"Error accessing payments for debt {debt.id}: {str(e)}")
-                    
-                    # Add debt record with safe field access
-                    try:
-                        debt_record = {
-                            'id': debt.id,
-                            'created_date': getattr(debt, 'created_at', timezone.now()).strftime('%Y-%m-%d') if hasattr(debt, 'created_at') else 'N/A',
-                            'due_date': getattr(debt, 'due_date', timezone.now().date()).strftime('%Y-%m-%d') if hasattr(debt, 'due_date') else 'N/A',
-                            'total_amount': total_amount,
-                            'paid_amount': paid_amount,
-                            'remaining_amount': remaining_amount,
-                            'status': getattr(debt, 'get_status_display', lambda: 'N/A')(),
-                            'notes': getattr(debt, 'notes', '') or '',
-                            'payments': payments
-                        }
-                        debt_records.append(debt_record)
-                    except Exception as e:
-                        logger.error(f"Error creating debt record for debt {debt.id}: {str(e)}")
-                        continue
-                    
-                    # Process materials for this debt
-                    try:
-                        if hasattr(debt, 'sale') and debt.sale and hasattr(debt.sale, 'items') and debt.sale.items.exists():
-                            for item in debt.sale.items.all():
-                                try:
-                                    if hasattr(item, 'material') and item.material:
-                                        material_name = getattr(item.material, 'name', 'Unknown Material')
-                                        material_sku = getattr(item.material, 'sku', 'N/A')
-                                        item_quantity = float(getattr(item, 'quantity', 0) or 0)
-                                        item_price = float(getattr(item, 'price', 0) or 0)
-                                        
-                                        if material_name not in materials_dict:
-                                            materials_dict[material_name] = {
-                                                'sku': material_sku,
-                                                'quantity': 0,
-                                                'total_value': 0
-                                            }
-                                        materials_dict[material_name]['quantity'] += item_quantity
-                                        materials_dict[material_name]['total_value'] += (item_quantity * item_price)
-                                except Exception as e:
-                                    logger.error(f"Error processing material item for debt {debt.id}: {str(e)}")
-                                    continue
-                    except Exception as e:
-                        logger.error(f"Error accessing sale items for debt {debt.id}: {str(e)}")
-                        
-            except Exception as e:
-                logger.error(f"Error processing debts: {str(e)}")
-                return Response(
-                    {'error': f'Error processing debt data: {str(e)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            # Convert materials dict to list
-            materials_summary = []
-            try:
-                for material_name, data in materials_dict.items():
-                    materials_summary.append({
-                        'name': material_name,
-                        'sku': data['sku'],
-                        'quantity': data['quantity'],
-                        'total_value': data['total_value']
-                    })
-                logger.info(f"Materials summary prepared: {len(materials_summary)} materials")
-            except Exception as e:
-                logger.error(f"Error preparing materials summary: {str(e)}")
-                materials_summary = []
-            
-            # Prepare response data
-            try:
-                export_data = {
-                    'report_type': 'customer_debt_report',
-                    'generated_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'customer': customer_info,
-                    'summary': debt_summary,
-                    'debts': debt_records,
-                    'materials': materials_summary
-                }
-                
-                logger.info(f"Export data prepared successfully for customer {customer_id}")
-                return Response(export_data, status=status.HTTP_200_OK)
-                
-            except Exception as e:
-                logger.error(f"Error preparing final export data: {str(e)}")
-                return Response(
-                    {'error': f'Error preparing export data: {str(e)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-        except Exception as e:
-            logger.error(f"Unexpected error in export_customer: {str(e)}")
+        Query params:
+          - customer_id: required
+          - stream: jsonl for one JSON object per line (header first, then
+            one line per debt) instead of a single JSON document
+        """
+        customer_id = request.query_params.get('customer_id')
+        if not customer_id:
             return Response(
-                {'error': f'Export failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'customer_id parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        customer = Customer.objects.filter(pk=customer_id).first() if customer_id.isdigit() else None
+        if customer is None:
+            return Response(
+                {'error': 'Customer not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
+        
+        debts = self.get_queryset().filter(customer=customer)
+        header = {
+            'report_type': 'customer_debt_report',
+            'generated_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'customer': statements.customer_info(customer),
+            'summary': statements.debt_totals(debts),
+            'materials': statements.material_totals(debts),
+        }
+        records = statements.iter_debt_records(debts)
+        
+        if request.query_params.get('stream') == 'jsonl':
+            def generate():
+                yield json.dumps(header) + '\n'
+                for record in records:
+                    yield json.dumps(record) + '\n'
+            
+            return StreamingHttpResponse(generate(), content_type='application/x-ndjson')
+        
+        def generate():
+            # The header fields, then the debts array written record by record
+            yield json.dumps(header)[:-1] + ', "debts": ['
+            separator = ''
+            for record in records:
+                yield separator + json.dumps(record)
+                separator = ', '
+            yield ']}'
+        
+        return StreamingHttpResponse(generate(), content_type='application/json')
     
     @action(detail=False, methods=['get'])
     def materials_analysis(self, request):
@@ -742,7 +446,7 @@ class DebtViewSet(viewsets.ModelViewSet):
         })
 
 
-class DebtPaymentViewSet(viewsets.ModelViewSet):
+class DebtPaymentViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """ViewSet for managing debt payments."""
     
     queryset = DebtPayment.objects.filter(is_deleted=False)
@@ -767,6 +471,51 @@ class DebtPaymentViewSet(viewsets.ModelViewSet):
         instance.is_deleted = True
         instance.save()
     
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        """
+        Pay a lump sum off a customer's open debts, oldest due first
+        (strategy=priority: highest priority score first), in one transaction.
+        """
+        return idempotent_response(request, lambda: self._allocate(request))
+    
+    def _allocate(self, request):
+        serializer = PaymentAllocationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        customer = data['customer']
+        
+        try:
+            allocations = allocate_payment(
+                customer,
+                data['amount'],
+                received_by=request.user,
+                payment_method=data['payment_method'],
+                strategy=data['strategy'],
+                debt_ids=data.get('debts'),
+                reference_number=data.get('reference_number'),
+                notes=data.get('notes'),
+                payment_date=data.get('payment_date'),
+            )
+        except AllocationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'customer_id': customer.id,
+            'amount': data['amount'],
+            'debts_paid': len(allocations),
+            'outstanding_balance': customer.outstanding_balance,
+            'allocations': [
+                {
+                    'debt_id': debt.id,
+                    'amount': applied,
+                    'remaining_amount': debt.remaining_amount,
+                    'status': debt.status,
+                }
+                for debt, applied in allocations
+            ],
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def by_customer(self, request):
         """Get payments by customer."""
@@ -783,43 +532,83 @@ class DebtPaymentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def daily_summary(self, request):
-        """Get daily payment summary."""
-        date_str = request.query_params.get('date')
-        if date_str:
-            try:
-                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                return Response(
-                    {'error': 'Invalid date format. Use YYYY-MM-DD'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
-            target_date = timezone.now().date()
+        """
+        Get payment totals per payment method for a day or a date range.
         
-        payments = self.queryset.filter(
-            payment_date__date=target_date,
-            status=DebtPayment.COMPLETED
-        )
+        Query params:
+          - date: single day (default: today)
+          - start_date, end_date: inclusive range, adds a per-day series
+        All figures come from one query grouped by day and payment method.
+        """
+        try:
+            start_date, end_date = self._summary_dates(request)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end_date < start_date:
+            return Response(
+                {'error': 'end_date must not be before start_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (end_date - start_date).days >= MAX_SUMMARY_DAYS:
+            return Response(
+                {'error': f'Date range cannot exceed {MAX_SUMMARY_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        summary = payments.aggregate(
-            total_payments=Count('id'),
-            total_amount=Sum('amount')
-        )
+        rows = self.queryset.filter(
+            status=DebtPayment.COMPLETED,
+            payment_date__gte=day_start(start_date),
+            payment_date__lt=day_start(end_date + timedelta(days=1)),
+        ).annotate(day=TruncDate('payment_date')).values('day', 'payment_method').annotate(
+            count=Count('id'), amount=Sum('amount')
+        ).order_by('day', 'payment_method')
         
+        total_payments = 0
+        total_amount = Decimal('0')
         payment_methods = {}
-        for payment in payments:
-            method = payment.payment_method
-            if method not in payment_methods:
-                payment_methods[method] = {'count': 0, 'amount': 0}
-            payment_methods[method]['count'] += 1
-            payment_methods[method]['amount'] += float(payment.amount)
+        days = {}
+        for row in rows:
+            total_payments += row['count']
+            total_amount += row['amount']
+            method = payment_methods.setdefault(row['payment_method'], {'count': 0, 'amount': 0})
+            method['count'] += row['count']
+            method['amount'] += float(row['amount'])
+            day = days.setdefault(row['day'], {'date': row['day'], 'count': 0, 'amount': 0, 'payment_methods': {}})
+            day['count'] += row['count']
+            day['amount'] += float(row['amount'])
+            day['payment_methods'][row['payment_method']] = {
+                'count': row['count'], 'amount': float(row['amount'])
+            }
         
-        return Response({
-            'date': target_date,
-            'total_payments': summary['total_payments'] or 0,
-            'total_amount': summary['total_amount'] or 0,
-            'payment_methods': payment_methods
-        })
+        data = {
+            'date': start_date,
+            'total_payments': total_payments,
+            'total_amount': total_amount,
+            'payment_methods': payment_methods,
+        }
+        if start_date != end_date:
+            data.update({
+                'start_date': start_date,
+                'end_date': end_date,
+                'series': list(days.values()),
+            })
+        return Response(data)
+    
+    def _summary_dates(self, request):
+        """(start, end) dates from date or start_date/end_date query params."""
+        params = request.query_params
+        today = timezone.now().date()
+        if params.get('start_date') or params.get('end_date'):
+            start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date() if params.get('start_date') else today
+            end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date() if params.get('end_date') else today
+            return start_date, end_date
+        if params.get('date'):
+            target_date = datetime.strptime(params['date'], '%Y-%m-%d').date()
+            return target_date, target_date
+        return today, today
 
 
 class DebtReminderViewSet(viewsets.ModelViewSet):
@@ -863,6 +652,7 @@ class DebtReminderViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_credit_sale(request):
     """Create a credit sale (sale + debt in one transaction)."""
     serializer = CreateCreditSaleSerializer(data=request.data)
@@ -871,49 +661,30 @@ def create_credit_sale(request):
         data = serializer.validated_data
         
         try:
-            with transaction.atomic():
-                # Create the sale
-                sale = Sale.objects.create(
-                    customer=data['customer'],
-                    tax=data.get('tax', 0),
-                    discount=data.get('discount', 0),
-                    total_amount=data['calculated_total'],
-                    payment_method='credit',  # New payment method for credit sales
-                    created_by=request.user
-                )
-                
-                # Create sale items
-                for item_data in data['items']:
-                    material = Material.objects.get(id=item_data['material_id'])
-                    SaleItem.objects.create(
-                        sale=sale,
-                        material=material,
-                        quantity=item_data['quantity'],
-                        price=item_data['price']
-                    )
-                    
-                    # Update inventory
-                    material.quantity_in_stock -= float(item_data['quantity'])
-                    material.save()
-                
-                # Create the debt
-                debt = Debt.objects.create(
-                    customer=data['customer'],
-                    sale=sale,
-                    total_amount=data['calculated_total'],
-                    due_date=data['due_date'],
-                    interest_rate=data.get('interest_rate', 0),
-                    payment_terms=data.get('payment_terms', ''),
-                    notes=data.get('notes', ''),
-                    created_by=request.user
-                )
-                
-                return Response({
-                    'message': 'Credit sale created successfully',
-                    'sale_id': sale.id,
-                    'debt_id': debt.id
-                }, status=status.HTTP_201_CREATED)
-                
+            # The sale's post_save signal creates its one debt
+            sale = write_sale(
+                data['customer'],
+                data['items'],
+                request.user,
+                payment_method=Sale.CREDIT,
+                payment_status=Sale.PENDING,
+                tax=data.get('tax', Decimal('0')),
+                discount=data.get('discount', Decimal('0')),
+                due_date=data['due_date'],
+                debt_fields={
+                    'interest_rate': data.get('interest_rate', 0),
+                    'payment_terms': data.get('payment_terms', ''),
+                    'notes': data.get('notes', ''),
+                },
+            )
+            return Response({
+                'message': 'Credit sale created successfully',
+                'sale_id': sale.id,
+                'debt_id': sale.debt.id
+            }, status=status.HTTP_201_CREATED)
+        
+        except (InsufficientStock, Material.DoesNotExist, CreditLimitExceeded) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {'error': f'Failed to create credit sale: {str(e)}'},
@@ -923,61 +694,103 @@ def create_credit_sale(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def credit_decision(exposure, credit_amount):
+    """Credit check response for a requested amount against a customer's cached exposure."""
+    available_credit = exposure['available_credit']
+    can_take_credit = credit_amount <= available_credit
+    
+    response_data = {
+        'customer_id': exposure['customer_id'],
+        'customer_name': exposure['customer_name'],
+        'credit_limit': float(exposure['credit_limit']),
+        'outstanding_balance': float(exposure['outstanding_balance']),
+        'overdue_amount': float(exposure['overdue_amount']),
+        'pending_orders': float(exposure['pending_orders']),
+        'total_exposure': float(exposure['total_exposure']),
+        'available_credit': float(available_credit),
+        'requested_amount': float(credit_amount),
+        'can_take_credit': can_take_credit,
+        # Approval threshold is 80% of available credit
+        'approval_required': credit_amount > available_credit * Decimal('0.8'),
+    }
+    
+    if not can_take_credit:
+        response_data['reason'] = f"Requested amount ${float(credit_amount):,.2f} exceeds available credit ${float(available_credit):,.2f}"
+        response_data['shortfall'] = float(credit_amount - available_credit)
+    
+    return response_data
+
+
+def parse_credit_request(customer_id, credit_amount):
+    """Parse a customer id and amount, returning (customer_id, amount, error)."""
+    if not customer_id or not credit_amount:
+        return None, None, 'customer_id and credit_amount are required'
+    try:
+        customer_id, credit_amount = int(customer_id), Decimal(str(credit_amount))
+    except (ValueError, TypeError, InvalidOperation):
+        return None, None, 'Invalid customer_id or credit amount'
+    if not credit_amount.is_finite():
+        return None, None, 'Invalid customer_id or credit amount'
+    return customer_id, credit_amount, None
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def validate_customer_credit(request):
     """Validate if a customer can take credit for a specific amount."""
-    customer_id = request.data.get('customer_id')
-    credit_amount = request.data.get('credit_amount')
-    
-    if not customer_id or not credit_amount:
+    customer_id, credit_amount, error = parse_credit_request(
+        request.data.get('customer_id'), request.data.get('credit_amount')
+    )
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    exposure = get_exposure(customer_id)
+    if exposure is None:
         return Response(
-            {'error': 'customer_id and credit_amount are required'},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'Customer not found'},
+            status=status.HTTP_404_NOT_FOUND
         )
     
-    try:
-        customer = Customer.objects.get(id=customer_id)
-        credit_amount = float(credit_amount)
-    except Customer.DoesNotExist:
+    return Response(credit_decision(exposure, credit_amount))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def validate_customer_credit_batch(request):
+    """
+    Validate many customer/amount pairs at once.
+    
+    Expects {"checks": [{"customer_id": 1, "credit_amount": "150.00"}, ...]}. Each
+    check is evaluated on its own against the customer's current exposure.
+    """
+    checks = request.data.get('checks')
+    if not isinstance(checks, list) or not checks:
         return Response(
-            {'error': 'Customer not found'},
-            status=status.HTTP_404_NOT_FOUND
+            {'error': 'checks must be a non-empty list'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    except (ValueError, TypeError):
+    if len(checks) > MAX_CREDIT_CHECKS:
         return Response(
-            {'error': 'Invalid credit amount'},
+            {'error': f'At most {MAX_CREDIT_CHECKS} checks can be validated per request'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Calculate available credit - convert to Decimal for consistent calculations
-    from decimal import Decimal
-    
-    credit_limit = Decimal(str(customer.credit_limit or 0))
-    outstanding_balance = Decimal(str(customer.outstanding_balance or 0))
-    credit_amount_decimal = Decimal(str(credit_amount))
-    available_credit = credit_limit - outstanding_balance
-    
-    # Check if credit is available
-    can_take_credit = credit_amount_decimal <= available_credit
+    parsed = []
+    for check in checks:
+        if not isinstance(check, dict):
+            parsed.append((None, None, 'Each check must be an object'))
+        else:
+            parsed.append(parse_credit_request(check.get('customer_id'), check.get('credit_amount')))
     
-    # Calculate approval threshold (80% of available credit)
-    approval_threshold = available_credit * Decimal('0.8')
+    exposures = get_exposures(customer_id for customer_id, _, error in parsed if not error)
     
-    # Prepare response
-    response_data = {
-        'customer_id': customer.id,
-        'customer_name': customer.name,
-        'credit_limit': float(credit_limit),
-        'outstanding_balance': float(outstanding_balance),
-        'available_credit': float(available_credit),
-        'requested_amount': float(credit_amount_decimal),
-        'can_take_credit': can_take_credit,
-        'approval_required': credit_amount_decimal > approval_threshold,
-    }
-    
-    if not can_take_credit:
-        response_data['reason'] = f"Requested amount ${float(credit_amount_decimal):,.2f} exceeds available credit ${float(available_credit):,.2f}"
-        response_data['shortfall'] = float(credit_amount_decimal - available_credit)
+    results = []
+    for check, (customer_id, credit_amount, error) in zip(checks, parsed):
+        if error:
+            results.append({'input': check, 'error': error})
+        elif customer_id not in exposures:
+            results.append({'customer_id': customer_id, 'error': 'Customer not found'})
+        else:
+            results.append(credit_decision(exposures[customer_id], credit_amount))
     
-    return Response(response_data)
+    return Response({'results': results})
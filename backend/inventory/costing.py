@@ -0,0 +1,238 @@
+"""
+Inventory costing.
+
+Every receipt of stock adds a CostLayer at the unit cost it came in at, and
+every issue consumes the oldest layers first. MaterialValuation keeps each
+material's on-hand quantity with two values that are updated on each
+movement: the FIFO value (what the remaining layers cost) and the
+weighted-average value. Valuing the whole warehouse is then one aggregate
+over those rows instead of a pass over stock and purchase history.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import CostLayer, Material, MaterialValuation
+
+
+ZERO = Decimal('0')
+
+
+def _locked_valuation(material_id):
+    MaterialValuation.objects.bulk_create(
+        [MaterialValuation(material_id=material_id)], ignore_conflicts=True
+    )
+    return MaterialValuation.objects.select_for_update().get(material_id=material_id)
+
+
+def receive(material, quantity, unit_cost, purchase_order_item=None, received_at=None):
+    """Add a cost layer for ``quantity`` units received at ``unit_cost``. Returns the layer."""
+    quantity, unit_cost = Decimal(str(quantity)), Decimal(str(unit_cost))
+    if quantity <= 0:
+        return None
+
+    with transaction.atomic():
+        valuation = _locked_valuation(material.pk)
+        layer = CostLayer.objects.create(
+            material_id=material.pk,
+            purchase_order_item=purchase_order_item,
+            received_at=received_at or timezone.now(),
+            unit_cost=unit_cost,
+            quantity_received=quantity,
+            quantity_remaining=quantity,
+        )
+        valuation.quantity += quantity
+        valuation.fifo_value += quantity * unit_cost
+        valuation.average_value += quantity * unit_cost
+        valuation.save()
+    return layer
+
+
+def receive_many(receipts):
+    """
+    Add cost layers for many receipts at once.
+
+    ``receipts`` are (material_id, quantity, unit_cost, purchase_order_item_id,
+    received_at). Valuations are locked in material order and updated with
+    one bulk update. Returns the number of layers added.
+    """
+    receipts = [receipt for receipt in receipts if receipt[1] > 0]
+    material_ids = sorted({receipt[0] for receipt in receipts})
+    if not material_ids:
+        return 0
+
+    with transaction.atomic():
+        MaterialValuation.objects.bulk_create(
+            [MaterialValuation(material_id=pk) for pk in material_ids], ignore_conflicts=True
+        )
+        valuations = {
+            valuation.material_id: valuation
+            for valuation in MaterialValuation.objects.select_for_update()
+            .filter(material_id__in=material_ids).order_by('material_id')
+        }
+        now, layers = timezone.now(), []
+        for material_id, quantity, unit_cost, item_id, received_at in receipts:
+            quantity, unit_cost = Decimal(str(quantity)), Decimal(str(unit_cost))
+            layers.append(CostLayer(
+                material_id=material_id, purchase_order_item_id=item_id,
+                received_at=received_at or now, unit_cost=unit_cost,
+                quantity_received=quantity, quantity_remaining=quantity,
+            ))
+            valuation = valuations[material_id]
+            valuation.quantity += quantity
+            valuation.fifo_value += quantity * unit_cost
+            valuation.average_value += quantity * unit_cost
+            valuation.updated_at = now
+        CostLayer.objects.bulk_create(layers, batch_size=5000)
+        MaterialValuation.objects.bulk_update(
+            valuations.values(), ['quantity', 'fifo_value', 'average_value', 'updated_at'], batch_size=1000
+        )
+    return len(layers)
+
+
+def issue(material, quantity):
+    """
+    Consume ``quantity`` units, oldest layers first.
+
+    Units beyond what the layers hold (stock that came in without a cost,
+    e.g. a manual correction) are costed at the average, or at the
+    material's cost_per_unit when nothing is on hand.
+    Returns (FIFO cost, weighted-average cost) of the units issued.
+    """
+    quantity = Decimal(str(quantity))
+    if quantity <= 0:
+        return ZERO, ZERO
+
+    with transaction.atomic():
+        valuation = _locked_valuation(material.pk)
+        fallback_cost = valuation.average_cost or material.cost_per_unit
+
+        layers = CostLayer.objects.select_for_update().filter(
+            material_id=material.pk, quantity_remaining__gt=0
+        ).order_by('received_at', 'id')
+        outstanding, layer_cost, consumed = quantity, ZERO, []
+        for layer in layers.iterator(chunk_size=50):
+            take = min(layer.quantity_remaining, outstanding)
+            layer.quantity_remaining -= take
+            layer_cost += take * layer.unit_cost
+            outstanding -= take
+            consumed.append(layer)
+            if not outstanding:
+                break
+        CostLayer.objects.bulk_update(consumed, ['quantity_remaining'])
+        fifo_cost = layer_cost + outstanding * fallback_cost
+
+        if quantity >= valuation.quantity:
+            average_cost = valuation.average_value + max(quantity - valuation.quantity, ZERO) * fallback_cost
+            valuation.average_value = ZERO
+        else:
+            average_cost = quantity * valuation.average_cost
+            valuation.average_value -= average_cost
+        valuation.quantity = max(valuation.quantity - quantity, ZERO)
+        valuation.fifo_value = max(valuation.fifo_value - layer_cost, ZERO)
+        valuation.save()
+    return fifo_cost, average_cost
+
+
+def restock(material, quantity):
+    """Put issued units back (a cancelled or edited sale, a return) at the current average cost."""
+    valuation = MaterialValuation.objects.filter(material_id=material.pk).first()
+    unit_cost = (valuation.average_cost if valuation else ZERO) or material.cost_per_unit
+    return receive(material, quantity, unit_cost)
+
+
+def adjust(material, previous_quantity, new_quantity):
+    """Cost a stock change that only knows the before and after quantities."""
+    change = Decimal(str(new_quantity)) - Decimal(str(previous_quantity))
+    if change > 0:
+        restock(material, change)
+    elif change < 0:
+        issue(material, -change)
+
+
+def rebuild(materials=None):
+    """
+    Recreate cost layers and valuations from current stock and purchase history.
+
+    On-hand stock is matched to the most recent received purchase order items
+    (under FIFO the newest receipts are the ones still on the shelf); any
+    stock older than the recorded receipts becomes an opening layer at the
+    material's cost_per_unit. Returns the number of materials valued.
+    """
+    from purchases.models import PurchaseOrder, PurchaseOrderItem
+
+    opened_at = timezone.now()
+    materials = Material.objects.all() if materials is None else materials
+    stock = {
+        pk: (quantity, cost)
+        for pk, quantity, cost in materials.values_list('id', 'quantity_in_stock', 'cost_per_unit')
+    }
+    receipts = PurchaseOrderItem.objects.filter(
+        material_id__in=list(stock),
+        purchase_order__status=PurchaseOrder.STATUS_RECEIVED,
+        purchase_order__is_deleted=False,
+    ).order_by('material_id', '-purchase_order__received_at', '-id').values_list(
+        'id', 'material_id', 'quantity', 'price', 'purchase_order__received_at'
+    )
+
+    layers, earliest = [], {}
+    needed = {pk: quantity for pk, (quantity, _) in stock.items()}
+    for item_id, material_id, quantity, price, received_at in receipts.iterator(chunk_size=5000):
+        take = min(quantity, needed[material_id])
+        if take <= 0:
+            continue
+        needed[material_id] -= take
+        earliest[material_id] = received_at = received_at or opened_at
+        layers.append(CostLayer(
+            material_id=material_id, purchase_order_item_id=item_id,
+            received_at=received_at, unit_cost=price,
+            quantity_received=quantity, quantity_remaining=take,
+        ))
+    for material_id, quantity in needed.items():
+        if quantity > 0:
+            # Older than anything on record, so it is consumed first
+            layers.append(CostLayer(
+                material_id=material_id,
+                received_at=earliest.get(material_id, opened_at) - timedelta(seconds=1),
+                unit_cost=stock[material_id][1], quantity_received=quantity, quantity_remaining=quantity,
+            ))
+
+    values = {}
+    for layer in layers:
+        value = values.get(layer.material_id, ZERO)
+        values[layer.material_id] = value + layer.quantity_remaining * layer.unit_cost
+
+    with transaction.atomic():
+        CostLayer.objects.filter(material_id__in=list(stock)).delete()
+        MaterialValuation.objects.filter(material_id__in=list(stock)).delete()
+        CostLayer.objects.bulk_create(layers, batch_size=5000)
+        MaterialValuation.objects.bulk_create(
+            [
+                MaterialValuation(
+                    material_id=pk, quantity=quantity,
+                    fifo_value=values.get(pk, ZERO), average_value=values.get(pk, ZERO),
+                )
+                for pk, (quantity, _) in stock.items()
+            ],
+            batch_size=5000,
+        )
+    return len(stock)
+
+
+def warehouse_valuation():
+    """Totals over the maintained valuations of active materials."""
+    totals = MaterialValuation.objects.filter(material__is_active=True).aggregate(
+        materials=Count('id'),
+        quantity=Sum('quantity'),
+        fifo_value=Sum('fifo_value'),
+        average_value=Sum('average_value'),
+    )
+    return {
+        'materials': totals['materials'],
+        'quantity': totals['quantity'] or ZERO,
+        'fifo_value': (totals['fifo_value'] or ZERO).quantize(Decimal('0.01')),
+        'average_value': (totals['average_value'] or ZERO).quantize(Decimal('0.01')),
+    }
@@ -0,0 +1,433 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from building_material_management import batch
+from customers.models import Customer, CustomerLedgerEntry
+from debts.models import Debt, DebtPayment
+from expenses.models import Expense
+from inventory import costing
+from inventory.models import Category, Material, UnitOfMeasure
+from purchases.models import PurchaseOrder, PurchaseOrderItem
+from sales.models import MaterialDailySales, Sale, SaleItem
+from suppliers.models import Supplier, SupplierMaterial
+
+
+BENCHMARK_USER_EMAIL = 'benchmark@nurbuild.local'
+
+MATERIAL_NOUNS = [
+    'Cement', 'Rebar', 'Block', 'Brick', 'Sand', 'Gravel', 'Tile', 'Pipe', 'Cable',
+    'Sheet', 'Beam', 'Plank', 'Paint', 'Primer', 'Sealant', 'Nails', 'Screws', 'Mesh',
+    'Insulation', 'Membrane', 'Glass', 'Door', 'Window', 'Valve', 'Fitting',
+]
+MATERIAL_GRADES = ['Standard', 'Premium', 'Heavy Duty', 'Economy', 'Industrial', 'Marine']
+CUSTOMER_PREFIXES = ['Al', 'Bani', 'Dahir', 'Hodan', 'Jama', 'Nur', 'Omar', 'Sahal', 'Warsame', 'Yusuf']
+CUSTOMER_SUFFIXES = ['Construction', 'Builders', 'Contracting', 'Trading', 'Developers', 'Family']
+EXPENSE_TYPES = ['Delivery', 'Transport', 'Labor', 'Rent', 'Utilities', 'Maintenance', 'Fuel']
+UNITS = [
+    ('Piece', 'pcs'), ('Bag', 'bag'), ('Kilogram', 'kg'), ('Meter', 'm'),
+    ('Square Meter', 'm²'), ('Cubic Meter', 'm³'), ('Liter', 'L'), ('Box', 'box'),
+]
+
+
+@contextmanager
+def auto_now_add_disabled(*fields):
+    """Let bulk inserts keep explicit values for ``auto_now_add`` fields."""
+    previous = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in previous:
+            field.auto_now_add = value
+
+
+def money(cents):
+    """Convert an integer amount of cents to a two-place Decimal."""
+    return Decimal(cents).scaleb(-2)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible, production-scale dataset (materials, customers, sales, '
+        'debts, payments, purchase orders and expenses) for performance benchmarks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materials', type=int, default=50_000)
+        parser.add_argument('--customers', type=int, default=20_000)
+        parser.add_argument('--suppliers', type=int, default=500)
+        parser.add_argument('--sales', type=int, default=1_000_000)
+        parser.add_argument('--debts', type=int, default=200_000,
+                            help='Number of sales generated as credit sales with a debt')
+        parser.add_argument('--payments', type=int, default=200_000)
+        parser.add_argument('--purchase-orders', type=int, default=20_000)
+        parser.add_argument('--expenses', type=int, default=50_000)
+        parser.add_argument('--days', type=int, default=730,
+                            help='Spread generated transactions over this many past days')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every row count, e.g. 0.01 for a quick smoke run')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        scale = options['scale']
+        counts = {
+            key: max(int(options[key] * scale), 1)
+            for key in ('materials', 'customers', 'suppliers', 'sales', 'debts',
+                        'payments', 'purchase_orders', 'expenses')
+        }
+        if counts['debts'] > counts['sales']:
+            raise CommandError('--debts cannot exceed --sales.')
+
+        self.user = self.get_benchmark_user()
+        units = self.create_units()
+        categories = self.create_categories()
+        supplier_ids = self.create_suppliers(counts['suppliers'])
+        material_ids = self.create_materials(counts['materials'], categories, units, supplier_ids)
+        customer_ids = self.create_customers(counts['customers'])
+        self.create_sales(counts['sales'], counts['debts'], counts['payments'], customer_ids, material_ids)
+        self.create_purchase_orders(counts['purchase_orders'], supplier_ids, material_ids)
+        self.create_expenses(counts['expenses'])
+        self.update_customer_balances(customer_ids)
+        # Bulk inserts skip the write-time maintenance of the sales aggregate and cost layers
+        MaterialDailySales.objects.rebuild()
+        costing.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Benchmark data generated: ' + ', '.join(f'{value} {key}' for key, value in counts.items())
+        ))
+
+    # Helpers
+
+    def next_id(self, model):
+        """First free primary key, so bulk inserts can reference rows without reading them back."""
+        last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+        return (last or 0) + 1
+
+    def flush(self, model, objs):
+        if objs:
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+            objs.clear()
+
+    def random_moment(self, position=None, total=None):
+        """Timestamp within the generated window, increasing with ``position`` when given."""
+        span = (self.now - self.start).total_seconds()
+        if position is None:
+            offset = self.rng.random() * span
+        else:
+            offset = (position + self.rng.random()) * span / total
+        return self.start + timedelta(seconds=offset)
+
+    def get_benchmark_user(self):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCHMARK_USER_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(BENCHMARK_USER_EMAIL, role=User.ADMIN)
+        return user
+
+    # Catalog
+
+    def create_units(self):
+        units = []
+        for name, abbreviation in UNITS:
+            unit, _ = UnitOfMeasure.objects.get_or_create(name=name, defaults={'abbreviation': abbreviation})
+            units.append(unit.id)
+        return units
+
+    def create_categories(self):
+        categories = []
+        for index in range(1, 41):
+            category, _ = Category.objects.get_or_create(name=f'Benchmark Category {index:02d}')
+            categories.append(category.id)
+        return categories
+
+    def create_suppliers(self, count):
+        first_id = self.next_id(Supplier)
+        suppliers = [
+            Supplier(
+                id=first_id + index,
+                name=f'Benchmark Supplier {index:05d}',
+                phone=f'+25263{index:07d}',
+                address='Benchmark Street',
+                city=self.rng.choice(['Hargeisa', 'Berbera', 'Burao', 'Borama']),
+                created_by=self.user,
+                updated_by=self.user,
+            )
+            for index in range(count)
+        ]
+        with batch.deferred():
+            self.flush(Supplier, suppliers)
+        self.stdout.write(f'Created {count} suppliers.')
+        return list(range(first_id, first_id + count))
+
+    def create_materials(self, count, categories, units, supplier_ids):
+        first_id = self.next_id(Material)
+        materials, supplier_materials = [], []
+        self.material_prices = {}
+
+        with batch.deferred():
+            for index in range(count):
+                material_id = first_id + index
+                price = self.rng.randint(500, 500_000)
+                cost = int(price * self.rng.uniform(0.65, 0.9))
+                reorder_level = self.rng.randint(5, 500)
+                suppliers = self.rng.sample(supplier_ids, min(len(supplier_ids), self.rng.randint(1, 3)))
+                self.material_prices[material_id] = price
+
+                materials.append(Material(
+                    id=material_id,
+                    name=f'{self.rng.choice(MATERIAL_NOUNS)} {self.rng.choice(MATERIAL_GRADES)} BM-{index:06d}',
+                    category_id=self.rng.choice(categories),
+                    unit_id=self.rng.choice(units),
+                    quantity_in_stock=Decimal(self.rng.randint(0, 5_000)),
+                    reorder_level=Decimal(reorder_level),
+                    reorder_quantity=Decimal(reorder_level * 4),
+                    price_per_unit=money(price),
+                    cost_per_unit=money(cost),
+                    main_supplier_id=suppliers[0],
+                    created_by=self.user,
+                    updated_by=self.user,
+                ))
+                for position, supplier_id in enumerate(suppliers):
+                    supplier_materials.append(SupplierMaterial(
+                        supplier_id=supplier_id,
+                        material_id=material_id,
+                        unit_price=money(int(cost * self.rng.uniform(0.9, 1.1))),
+                        minimum_order_quantity=Decimal(self.rng.choice([1, 5, 10, 50, 100])),
+                        lead_time_days=self.rng.randint(1, 21),
+                        is_preferred=position == 0 and self.rng.random() < 0.5,
+                    ))
+
+                if len(materials) >= self.batch_size:
+                    self.flush(Material, materials)
+                    self.flush(SupplierMaterial, supplier_materials)
+            self.flush(Material, materials)
+            self.flush(SupplierMaterial, supplier_materials)
+
+        self.stdout.write(f'Created {count} materials.')
+        return list(range(first_id, first_id + count))
+
+    def create_customers(self, count):
+        first_id = self.next_id(Customer)
+        customers = []
+        with batch.deferred():
+            for index in range(count):
+                is_company = self.rng.random() < 0.4
+                customers.append(Customer(
+                    id=first_id + index,
+                    name=f'{self.rng.choice(CUSTOMER_PREFIXES)} {self.rng.choice(CUSTOMER_SUFFIXES)} {index:05d}',
+                    customer_type=Customer.COMPANY if is_company else Customer.INDIVIDUAL,
+                    phone=f'+25265{index:07d}',
+                    tax_id=f'TIN-{index:08d}' if is_company else None,
+                    credit_limit=money(self.rng.choice([0, 50_000_00, 200_000_00, 1_000_000_00])),
+                    allow_debt=True,
+                    created_by=self.user,
+                    updated_by=self.user,
+                ))
+                if len(customers) >= self.batch_size:
+                    self.flush(Customer, customers)
+            self.flush(Customer, customers)
+        self.stdout.write(f'Created {count} customers.')
+        return list(range(first_id, first_id + count))
+
+    # Transactions
+
+    def plan_payments(self, debt_count, payment_count):
+        """Number of payments each debt receives, drawn up front so debts are inserted final."""
+        plan = [0] * debt_count
+        for _ in range(payment_count):
+            plan[self.rng.randrange(debt_count)] += 1
+        return plan
+
+    def create_sales(self, sale_count, debt_count, payment_count, customer_ids, material_ids):
+        credit_positions = set(self.rng.sample(range(sale_count), debt_count))
+        payment_plan = self.plan_payments(debt_count, payment_count)
+        today = self.now.date()
+
+        sale_id = self.next_id(Sale)
+        debt_id = self.next_id(Debt)
+        sales, items, debts, payments = [], [], [], []
+        debt_index = 0
+
+        with auto_now_add_disabled(Sale._meta.get_field('sale_date'), Debt._meta.get_field('created_at')):
+            for position in range(sale_count):
+                sale_date = self.random_moment(position, sale_count)
+                customer_id = self.rng.choice(customer_ids)
+                total = 0
+                for material_id in self.rng.sample(material_ids, min(len(material_ids), self.rng.randint(1, 4))):
+                    quantity = self.rng.randint(1, 50)
+                    price = self.material_prices[material_id]
+                    total += quantity * price
+                    items.append(SaleItem(
+                        sale_id=sale_id, material_id=material_id,
+                        quantity=Decimal(quantity), price=money(price),
+                    ))
+
+                is_credit = position in credit_positions
+                due_date = (sale_date + timedelta(days=self.rng.choice([15, 30, 60, 90]))).date()
+                sales.append(Sale(
+                    id=sale_id,
+                    customer_id=customer_id,
+                    sale_date=sale_date,
+                    total_amount=money(total),
+                    payment_method=Sale.CREDIT if is_credit else self.rng.choice([Sale.CASH, Sale.ZAAD, Sale.EDAHAB]),
+                    payment_status=Sale.PENDING if is_credit else Sale.PAID,
+                    due_date=due_date if is_credit else None,
+                    created_by=self.user,
+                ))
+
+                if is_credit:
+                    paid, last_payment = self.build_payments(
+                        payments, debt_id, customer_id, total, sale_date, payment_plan[debt_index]
+                    )
+                    if paid >= total:
+                        debt_status = Debt.PAID
+                    elif paid > 0:
+                        debt_status = Debt.PARTIALLY_PAID
+                    elif due_date < today:
+                        debt_status = Debt.OVERDUE
+                    else:
+                        debt_status = Debt.PENDING
+                    debts.append(Debt(
+                        id=debt_id,
+                        customer_id=customer_id,
+                        sale_id=sale_id,
+                        total_amount=money(total),
+                        paid_amount=money(paid),
+                        interest_rate=Decimal(self.rng.choice([0, 0, 0, 5, 10, 18])),
+                        created_at=sale_date,
+                        due_date=due_date,
+                        last_payment_date=last_payment,
+                        status=debt_status,
+                        priority=self.rng.choice([Debt.LOW, Debt.MEDIUM, Debt.MEDIUM, Debt.HIGH]),
+                        created_by=self.user,
+                        updated_by=self.user,
+                    ))
+                    debt_id += 1
+                    debt_index += 1
+
+                sale_id += 1
+                if len(sales) >= self.batch_size:
+                    self.flush_sales(sales, items, debts, payments)
+                    self.stdout.write(f'  {position + 1}/{sale_count} sales...')
+            self.flush_sales(sales, items, debts, payments)
+
+        self.stdout.write(f'Created {sale_count} sales ({debt_count} on credit) and {payment_count} payments.')
+
+    def build_payments(self, payments, debt_id, customer_id, total, sale_date, count):
+        """Append ``count`` payments for a debt and return (paid cents, last payment date)."""
+        if not count:
+            return 0, None
+        paid_target = total if self.rng.random() < 0.4 else int(total * self.rng.uniform(0.1, 0.9))
+        remaining = paid_target
+        paid, last_payment = 0, None
+        moment = sale_date
+        for number in range(count):
+            amount = remaining if number == count - 1 else max(remaining // (count - number), 1)
+            if amount <= 0:
+                break
+            moment = min(moment + timedelta(days=self.rng.randint(1, 30)), self.now)
+            payments.append(DebtPayment(
+                debt_id=debt_id,
+                customer_id=customer_id,
+                amount=money(amount),
+                payment_method=self.rng.choice([DebtPayment.CASH, DebtPayment.ZAAD, DebtPayment.EDAHAB]),
+                payment_date=moment,
+                status=DebtPayment.COMPLETED,
+                received_by=self.user,
+            ))
+            remaining -= amount
+            paid += amount
+            last_payment = moment
+        return paid, last_payment
+
+    def flush_sales(self, sales, items, debts, payments):
+        with batch.deferred():
+            self.flush(Sale, sales)
+            self.flush(SaleItem, items)
+            self.flush(Debt, debts)
+            self.flush(DebtPayment, payments)
+
+    def create_purchase_orders(self, count, supplier_ids, material_ids):
+        order_id = self.next_id(PurchaseOrder)
+        orders, items = [], []
+        with auto_now_add_disabled(PurchaseOrder._meta.get_field('created_at')):
+            for position in range(count):
+                created_at = self.random_moment(position, count)
+                received = self.rng.random() < 0.85
+                orders.append(PurchaseOrder(
+                    id=order_id,
+                    supplier_id=self.rng.choice(supplier_ids),
+                    status=PurchaseOrder.STATUS_RECEIVED if received else PurchaseOrder.STATUS_PENDING,
+                    created_by=self.user,
+                    created_at=created_at,
+                    received_at=created_at + timedelta(days=self.rng.randint(1, 14)) if received else None,
+                ))
+                for material_id in self.rng.sample(material_ids, min(len(material_ids), self.rng.randint(1, 5))):
+                    items.append(PurchaseOrderItem(
+                        purchase_order_id=order_id,
+                        material_id=material_id,
+                        quantity=Decimal(self.rng.randint(10, 500)),
+                        price=money(int(self.material_prices[material_id] * self.rng.uniform(0.65, 0.9))),
+                    ))
+                order_id += 1
+                if len(orders) >= self.batch_size:
+                    with batch.deferred():
+                        self.flush(PurchaseOrder, orders)
+                        self.flush(PurchaseOrderItem, items)
+            with batch.deferred():
+                self.flush(PurchaseOrder, orders)
+                self.flush(PurchaseOrderItem, items)
+        self.stdout.write(f'Created {count} purchase orders.')
+
+    def create_expenses(self, count):
+        expenses = []
+        with batch.deferred():
+            for _ in range(count):
+                expenses.append(Expense(
+                    type=self.rng.choice(EXPENSE_TYPES),
+                    amount=money(self.rng.randint(1_000, 2_000_000)),
+                    description='Benchmark expense',
+                    paid_by=self.user,
+                    date=self.random_moment().date(),
+                ))
+                if len(expenses) >= self.batch_size:
+                    self.flush(Expense, expenses)
+            self.flush(Expense, expenses)
+        self.stdout.write(f'Created {count} expenses.')
+
+    def update_customer_balances(self, customer_ids):
+        """Post each generated customer's open debt total to the ledger and rebuild the cached balances."""
+        generated = Customer.objects.filter(id__range=(customer_ids[0], customer_ids[-1]))
+        remaining = Debt.objects.filter(
+            customer__in=generated, is_deleted=False
+        ).values('customer').annotate(
+            total=Sum(F('total_amount') - F('paid_amount'))
+        ).exclude(total=0).values_list('customer', 'total')
+
+        entries = [
+            CustomerLedgerEntry(
+                customer_id=customer_id,
+                entry_type=CustomerLedgerEntry.ADJUSTMENT,
+                amount=total,
+                running_balance=total,
+                description='Opening balance',
+            )
+            for customer_id, total in remaining.iterator()
+        ]
+        CustomerLedgerEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+        CustomerLedgerEntry.objects.rebuild_balances(generated)
+        self.stdout.write('Updated customer outstanding balances.')
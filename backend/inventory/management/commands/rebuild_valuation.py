@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from inventory import costing
+from inventory.models import Material
+
+
+class Command(BaseCommand):
+    help = 'Rebuild cost layers and material valuations from current stock and received purchase orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--material', type=int, action='append', help='Only this material id (repeatable)')
+
+    def handle(self, *args, **options):
+        materials = None
+        if options['material']:
+            materials = Material.objects.filter(id__in=options['material'])
+        count = costing.rebuild(materials)
+        valuation = costing.warehouse_valuation()
+        self.stdout.write(self.style.SUCCESS(
+            f"Valued {count} materials: FIFO {valuation['fifo_value']}, "
+            f"weighted average {valuation['average_value']}."
+        ))
@@ -0,0 +1,177 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from debts.models import Debt, DebtPayment
+from inventory.models import Material
+from sales.models import Sale, SaleItem
+
+from .generate_benchmark_data import BENCHMARK_USER_EMAIL
+
+
+# (name, method, path) of the read endpoints that are timed on every run.
+READ_CASES = [
+    ('dashboard.inventory_value', 'get', '/api/dashboard/inventory-value/'),
+    ('dashboard.top_selling_materials', 'get', '/api/dashboard/top-selling-materials/'),
+    ('dashboard.monthly_summary', 'get', '/api/dashboard/monthly-summary/'),
+    ('dashboard.summary_counts', 'get', '/api/dashboard/summary-counts/'),
+    ('dashboard.debt_summary', 'get', '/api/dashboard/debt-summary/'),
+    ('reports.stock', 'get', '/api/reports/stock/'),
+    ('reports.low_stock', 'get', '/api/reports/low_stock/'),
+    ('inventory.reorder_suggestions', 'get', '/api/inventory/materials/reorder-suggestions/'),
+    ('reports.sales_purchase_summary', 'get', '/api/reports/sales_purchase_summary/'),
+    ('debts.list', 'get', '/api/debts/debts/'),
+    ('debts.summary', 'get', '/api/debts/debts/summary/'),
+    ('debts.customer_summary', 'get', '/api/debts/debts/customer_summary/'),
+    ('debts.aging', 'get', '/api/debts/debts/aging/'),
+    ('debts.export_report', 'get', '/api/debts/debts/export_report/'),
+    ('payments.daily_summary', 'get', '/api/debts/payments/daily_summary/'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Time key API endpoints against the current database and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1,
+                            help='Untimed runs per endpoint before measuring')
+        parser.add_argument('--only', help='Comma-separated benchmark names to run')
+        parser.add_argument('--output', help='Result file (default: benchmark_results/benchmark_<timestamp>.json)')
+        parser.add_argument('--compare', help='Previous result file to compare against')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        user = get_user_model().objects.filter(email=BENCHMARK_USER_EMAIL).first()
+        if user is None:
+            raise CommandError('No benchmark user found. Run generate_benchmark_data first.')
+
+        # Requests come from a non-internal address so the debug toolbar stays out of the timings.
+        self.client = APIClient(HTTP_HOST=self.get_host(), REMOTE_ADDR='198.51.100.10')
+        self.client.force_authenticate(user)
+
+        cases = [(name, method, path, None) for name, method, path in READ_CASES]
+        cases.extend(self.write_cases())
+        if options['only']:
+            wanted = set(options['only'].split(','))
+            cases = [case for case in cases if case[0] in wanted]
+
+        results = []
+        for name, method, path, payload in cases:
+            result = self.run_case(name, method, path, payload, options['iterations'], options['warmup'])
+            results.append(result)
+            self.stdout.write(
+                f"{name:<40} {result['status_code']:>4} {result['median_ms']:>10.1f} ms "
+                f"(p95 {result['p95_ms']:.1f} ms, {result['queries']} queries)"
+            )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'dataset': self.dataset_size(),
+            'results': results,
+        }
+        output = Path(options['output'] or f"benchmark_results/benchmark_{timezone.now():%Y%m%d_%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+        if options['compare']:
+            self.compare(results, Path(options['compare']))
+
+    def get_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    def write_cases(self):
+        """Sale creation against a well-stocked material and an existing customer."""
+        material = Material.objects.filter(quantity_in_stock__gte=10).order_by('pk').first()
+        customer = Customer.objects.order_by('pk').first()
+        if material is None or customer is None:
+            return []
+        payload = {
+            'customer': customer.id,
+            'payment_method': Sale.CASH,
+            'tax': '0.00',
+            'discount': '0.00',
+            'items': [{'material': material.id, 'quantity': '1.00', 'price': str(material.price_per_unit)}],
+        }
+        return [('sales.create', 'post', '/api/sales/orders/', payload)]
+
+    def request(self, method, path, payload):
+        if payload is None:
+            return getattr(self.client, method)(path)
+        # Writes are rolled back so repeated runs measure against the same dataset.
+        with transaction.atomic():
+            response = getattr(self.client, method)(path, payload, format='json')
+            transaction.set_rollback(True)
+        return response
+
+    def run_case(self, name, method, path, payload, iterations, warmup):
+        # The request_started signal clears the query log, so start the capture from empty.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request(method, path, payload)
+        for _ in range(max(warmup - 1, 0)):
+            self.request(method, path, payload)
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            self.request(method, path, payload)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        return {
+            'name': name,
+            'method': method.upper(),
+            'path': path,
+            'status_code': response.status_code,
+            'queries': len(queries),
+            'min_ms': round(timings[0], 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            'max_ms': round(timings[-1], 2),
+        }
+
+    def dataset_size(self):
+        return {
+            'materials': Material.objects.count(),
+            'customers': Customer.objects.count(),
+            'sales': Sale.objects.count(),
+            'sale_items': SaleItem.objects.count(),
+            'debts': Debt.objects.count(),
+            'debt_payments': DebtPayment.objects.count(),
+        }
+
+    def compare(self, results, baseline_path):
+        if not baseline_path.exists():
+            raise CommandError(f'Baseline file {baseline_path} does not exist.')
+        baseline = {row['name']: row for row in json.loads(baseline_path.read_text())['results']}
+
+        self.stdout.write(f'\nComparison with {baseline_path}:')
+        for row in results:
+            before = baseline.get(row['name'])
+            if before is None or not before['median_ms']:
+                self.stdout.write(f"{row['name']:<40} (no baseline)")
+                continue
+            change = (row['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+            self.stdout.write(
+                f"{row['name']:<40} {before['median_ms']:>10.1f} -> {row['median_ms']:>10.1f} ms "
+                f"({change:+.1f}%), queries {before['queries']} -> {row['queries']}"
+            )
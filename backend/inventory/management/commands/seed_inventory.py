@@ -1,7 +1,13 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from decimal import Decimal
-from inventory.models import Category, UnitOfMeasure, Material
+from building_material_management import batch
+from inventory.models import (
+    Category, UnitOfMeasure, Material, StockAdjustment, MaterialLocation, CostLayer, MaterialValuation
+)
+from purchases.models import PurchaseOrderItem
+from sales.models import MaterialDailySales, SaleItem
+from suppliers.models import SupplierMaterial
 
 
 class Command(BaseCommand):
@@ -13,19 +19,59 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before seeding',
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Seed with bulk inserts and clear with batched raw deletes (for large catalogs)',
+        )
+        parser.add_argument(
+            '--multiplier',
+            type=int,
+            default=1,
+            help='Repeat the material catalog this many times (bulk mode only), for load testing',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per INSERT/DELETE batch in bulk mode',
+        )
 
     def handle(self, *args, **options):
+        if options['multiplier'] < 1:
+            raise CommandError('--multiplier must be at least 1.')
+        if options['multiplier'] > 1 and not options['bulk']:
+            raise CommandError('--multiplier requires --bulk.')
+        self.batch_size = options['batch_size']
+
         if options['clear']:
             self.stdout.write('Clearing existing inventory data...')
-            with transaction.atomic():
-                Material.objects.all().delete()
-                Category.objects.all().delete()
-                UnitOfMeasure.objects.all().delete()
+            if options['bulk']:
+                self.bulk_clear()
+            else:
+                with batch.deferred():
+                    Material.objects.all().delete()
+                    Category.objects.all().delete()
+                    UnitOfMeasure.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
 
         self.stdout.write('Starting inventory seeding...')
         
-        with transaction.atomic():
+        if options['bulk']:
+            with batch.deferred():
+                units = self.bulk_create_units()
+                self.stdout.write(f'Resolved {len(units)} units of measurement.')
+
+                categories = self.bulk_create_categories()
+                self.stdout.write(f'Resolved {len(categories)} categories.')
+
+                created = self.bulk_create_materials(categories, units, options['multiplier'])
+                self.stdout.write(f'Inserted {created} new materials.')
+
+            self.stdout.write(self.style.SUCCESS('Inventory seeding completed successfully!'))
+            return
+
+        with batch.deferred():
             # Create units of measurement
             units = self.create_units()
             self.stdout.write(f'Created {len(units)} units of measurement.')
@@ -40,8 +86,8 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS('Inventory seeding completed successfully!'))
 
-    def create_units(self):
-        units_data = [
+    def get_units_data(self):
+        return [
             # Volume units
             {'name': 'Cubic Meter', 'abbreviation': 'm³', 'description': 'Volume measurement for concrete, aggregates, etc.'},
             {'name': 'Liter', 'abbreviation': 'L', 'description': 'Volume measurement for liquids'},
@@ -73,22 +119,9 @@ class Command(BaseCommand):
             {'name': 'Box', 'abbreviation': 'box', 'description': 'Boxed materials'},
             {'name': 'Carton', 'abbreviation': 'carton', 'description': 'Carton packaging'},
         ]
-        
-        created_units = {}
-        for unit_data in units_data:
-            unit, created = UnitOfMeasure.objects.get_or_create(
-                name=unit_data['name'],
-                defaults={
-                    'abbreviation': unit_data['abbreviation'],
-                    'description': unit_data['description']
-                }
-            )
-            created_units[unit_data['name']] = unit
-        
-        return created_units
 
-    def create_categories(self):
-        categories_data = [
+    def get_categories_data(self):
+        return [
             # Main categories
             {'name': 'Structural Materials', 'description': 'Load-bearing construction materials', 'parent': None},
             {'name': 'Roofing Materials', 'description': 'Materials for roof construction and waterproofing', 'parent': None},
@@ -101,9 +134,9 @@ class Command(BaseCommand):
             {'name': 'Glass & Glazing', 'description': 'Glass products and glazing materials', 'parent': None},
             {'name': 'Landscaping Materials', 'description': 'Outdoor and landscaping materials', 'parent': None},
         ]
-        
-        # Subcategories
-        subcategories_data = [
+
+    def get_subcategories_data(self):
+        return [
             # Structural Materials subcategories
             {'name': 'Concrete Products', 'description': 'Ready-mix concrete, blocks, precast elements', 'parent': 'Structural Materials'},
             {'name': 'Steel Products', 'description': 'Structural steel, reinforcement, sheets', 'parent': 'Structural Materials'},
@@ -150,37 +183,9 @@ class Command(BaseCommand):
             {'name': 'Nails & Staples', 'description': 'Construction nails and staples', 'parent': 'Hardware & Fasteners'},
             {'name': 'Construction Adhesives', 'description': 'Structural and general adhesives', 'parent': 'Hardware & Fasteners'},
         ]
-        
-        created_categories = {}
-        
-        # Create main categories first
-        for cat_data in categories_data:
-            category, created = Category.objects.get_or_create(
-                name=cat_data['name'],
-                defaults={
-                    'description': cat_data['description'],
-                    'parent': None
-                }
-            )
-            created_categories[cat_data['name']] = category
-        
-        # Create subcategories
-        for subcat_data in subcategories_data:
-            parent_category = created_categories.get(subcat_data['parent'])
-            if parent_category:
-                subcategory, created = Category.objects.get_or_create(
-                    name=subcat_data['name'],
-                    defaults={
-                        'description': subcat_data['description'],
-                        'parent': parent_category
-                    }
-                )
-                created_categories[subcat_data['name']] = subcategory
-        
-        return created_categories
 
-    def create_materials(self, categories, units):
-        materials_data = [
+    def get_materials_data(self):
+        return [
             # Concrete Products
             {'name': 'Ready-Mix Concrete M25', 'description': 'Standard grade concrete for general construction', 'category': 'Concrete Products', 'unit': 'Cubic Meter', 'price': 8500, 'cost': 7500, 'reorder_level': 5, 'reorder_qty': 20},
             {'name': 'Ready-Mix Concrete M30', 'description': 'High-strength concrete for structural elements', 'category': 'Concrete Products', 'unit': 'Cubic Meter', 'price': 9200, 'cost': 8100, 'reorder_level': 3, 'reorder_qty': 15},
@@ -312,7 +317,58 @@ class Command(BaseCommand):
             {'name': 'Drainage Gravel', 'description': 'Washed gravel for drainage', 'category': 'Aggregates', 'unit': 'Cubic Meter', 'price': 1350, 'cost': 1100, 'reorder_level': 15, 'reorder_qty': 60},
             {'name': 'Landscape Fabric', 'description': 'Weed barrier landscape fabric', 'category': 'Landscaping Materials', 'unit': 'Square Meter', 'price': 25, 'cost': 18, 'reorder_level': 300, 'reorder_qty': 1200},
         ]
+
+    def create_units(self):
+        units_data = self.get_units_data()
+
+        created_units = {}
+        for unit_data in units_data:
+            unit, created = UnitOfMeasure.objects.get_or_create(
+                name=unit_data['name'],
+                defaults={
+                    'abbreviation': unit_data['abbreviation'],
+                    'description': unit_data['description']
+                }
+            )
+            created_units[unit_data['name']] = unit
+        
+        return created_units
+
+    def create_categories(self):
+        categories_data = self.get_categories_data()
+        subcategories_data = self.get_subcategories_data()
+
+        created_categories = {}
+        
+        # Create main categories first
+        for cat_data in categories_data:
+            category, created = Category.objects.get_or_create(
+                name=cat_data['name'],
+                defaults={
+                    'description': cat_data['description'],
+                    'parent': None
+                }
+            )
+            created_categories[cat_data['name']] = category
+        
+        # Create subcategories
+        for subcat_data in subcategories_data:
+            parent_category = created_categories.get(subcat_data['parent'])
+            if parent_category:
+                subcategory, created = Category.objects.get_or_create(
+                    name=subcat_data['name'],
+                    defaults={
+                        'description': subcat_data['description'],
+                        'parent': parent_category
+                    }
+                )
+                created_categories[subcat_data['name']] = subcategory
         
+        return created_categories
+
+    def create_materials(self, categories, units):
+        materials_data = self.get_materials_data()
+
         created_materials = []
         for material_data in materials_data:
             category = categories.get(material_data['category'])
@@ -334,4 +390,119 @@ class Command(BaseCommand):
                 )
                 created_materials.append(material)
         
-        return created_materials
\ No newline at end of file
+        return created_materials
+
+    # Bulk mode
+
+    def raw_delete(self, queryset):
+        """Delete rows in primary-key batches without loading them or sending signals."""
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.model.objects.filter(pk__in=ids)._raw_delete(queryset.db)
+
+    def bulk_clear(self):
+        if SaleItem.objects.exists() or PurchaseOrderItem.objects.exists():
+            raise CommandError(
+                'Materials are referenced by sales or purchase orders and cannot be cleared.'
+            )
+
+        with transaction.atomic():
+            # Raw deletes skip the ORM cascade, so dependent rows go first.
+            for model in (StockAdjustment, MaterialLocation, SupplierMaterial, CostLayer,
+                          MaterialValuation, MaterialDailySales, Material.alternative_suppliers.through):
+                self.raw_delete(model.objects.all())
+            materials = self.raw_delete(Material.objects.all())
+
+            Category.objects.exclude(parent=None).update(parent=None)
+            categories = self.raw_delete(Category.objects.all())
+            units = self.raw_delete(UnitOfMeasure.objects.all())
+
+        self.stdout.write(f'Deleted {materials} materials, {categories} categories and {units} units.')
+
+    def bulk_create_units(self):
+        units_data = self.get_units_data()
+        names = [unit_data['name'] for unit_data in units_data]
+
+        existing = UnitOfMeasure.objects.in_bulk(names, field_name='name')
+        missing = [
+            UnitOfMeasure(
+                name=unit_data['name'],
+                abbreviation=unit_data['abbreviation'],
+                description=unit_data['description'],
+            )
+            for unit_data in units_data if unit_data['name'] not in existing
+        ]
+        if not missing:
+            return existing
+
+        UnitOfMeasure.objects.bulk_create(missing, ignore_conflicts=True)
+        return UnitOfMeasure.objects.in_bulk(names, field_name='name')
+
+    def bulk_create_categories(self):
+        categories_data = self.get_categories_data()
+        subcategories_data = self.get_subcategories_data()
+        names = [data['name'] for data in categories_data + subcategories_data]
+
+        existing = Category.objects.in_bulk(names, field_name='name')
+        missing_parents = [
+            Category(name=cat_data['name'], description=cat_data['description'])
+            for cat_data in categories_data if cat_data['name'] not in existing
+        ]
+        if missing_parents:
+            Category.objects.bulk_create(missing_parents, ignore_conflicts=True)
+            existing = Category.objects.in_bulk(names, field_name='name')
+
+        missing_children = [
+            Category(
+                name=subcat_data['name'],
+                description=subcat_data['description'],
+                parent=existing[subcat_data['parent']],
+            )
+            for subcat_data in subcategories_data
+            if subcat_data['name'] not in existing and subcat_data['parent'] in existing
+        ]
+        if missing_children:
+            Category.objects.bulk_create(missing_children, ignore_conflicts=True)
+            existing = Category.objects.in_bulk(names, field_name='name')
+
+        return existing
+
+    def bulk_create_materials(self, categories, units, multiplier):
+        materials_data = [
+            material_data for material_data in self.get_materials_data()
+            if material_data['category'] in categories and material_data['unit'] in units
+        ]
+        # Material names are not unique, so in_bulk() cannot key on them; one
+        # values_list() query resolves what is already there instead.
+        existing = set(Material.objects.values_list('name', flat=True))
+
+        created = 0
+        chunk = []
+        for copy in range(1, multiplier + 1):
+            for material_data in materials_data:
+                name = material_data['name'] if copy == 1 else f"{material_data['name']} #{copy}"
+                if name in existing:
+                    continue
+                chunk.append(Material(
+                    name=name,
+                    description=material_data['description'],
+                    category=categories[material_data['category']],
+                    unit=units[material_data['unit']],
+                    price_per_unit=Decimal(str(material_data['price'])),
+                    cost_per_unit=Decimal(str(material_data['cost'])),
+                    reorder_level=Decimal(str(material_data['reorder_level'])),
+                    reorder_quantity=Decimal(str(material_data['reorder_qty'])),
+                    quantity_in_stock=Decimal('0'),
+                ))
+                if len(chunk) >= self.batch_size:
+                    Material.objects.bulk_create(chunk, ignore_conflicts=True)
+                    created += len(chunk)
+                    chunk = []
+        if chunk:
+            Material.objects.bulk_create(chunk, ignore_conflicts=True)
+            created += len(chunk)
+
+        return created
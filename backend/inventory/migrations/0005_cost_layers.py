@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_remove_sku_barcode_brand_fields'),
+        ('purchases', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fifo_value', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('average_value', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='valuation', to='inventory.material')),
+            ],
+            options={
+                'verbose_name': 'material valuation',
+                'verbose_name_plural': 'material valuations',
+            },
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField()),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('quantity_received', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('quantity_remaining', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.material')),
+                ('purchase_order_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layers', to='purchases.purchaseorderitem')),
+            ],
+            options={
+                'verbose_name': 'cost layer',
+                'verbose_name_plural': 'cost layers',
+                'ordering': ['material', 'received_at', 'id'],
+                'indexes': [models.Index(fields=['material', 'received_at', 'id'], name='inventory_c_materia_2cdf5c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def create_opening_layers(apps, schema_editor):
+    """Value existing stock as one opening layer per material at its cost_per_unit."""
+    Material = apps.get_model('inventory', 'Material')
+    CostLayer = apps.get_model('inventory', 'CostLayer')
+    MaterialValuation = apps.get_model('inventory', 'MaterialValuation')
+
+    now = timezone.now()
+    layers, valuations = [], []
+    for material_id, quantity, cost in Material.objects.values_list(
+        'id', 'quantity_in_stock', 'cost_per_unit'
+    ).iterator(chunk_size=2000):
+        if quantity > 0:
+            layers.append(CostLayer(
+                material_id=material_id, received_at=now, unit_cost=cost,
+                quantity_received=quantity, quantity_remaining=quantity,
+            ))
+        valuations.append(MaterialValuation(
+            material_id=material_id, quantity=quantity,
+            fifo_value=quantity * cost, average_value=quantity * cost,
+        ))
+    CostLayer.objects.bulk_create(layers, batch_size=2000)
+    MaterialValuation.objects.bulk_create(valuations, batch_size=2000)
+
+
+def remove_opening_layers(apps, schema_editor):
+    apps.get_model('inventory', 'CostLayer').objects.all().delete()
+    apps.get_model('inventory', 'MaterialValuation').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_cost_layers'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_layers, remove_opening_layers),
+    ]
@@ -1,15 +1,20 @@
 # inventory/models.py
 
+from decimal import Decimal
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 # We'll reference User model but need to use settings.AUTH_USER_MODEL
 # to avoid circular imports
 from django.conf import settings
 
+from building_material_management import batch
+
+
 class Category(models.Model):
     """Model for material categories."""
     
@@ -184,6 +189,62 @@ class MaterialLocation(models.Model):
         return f"{self.material.name} - {self.warehouse}/{self.zone}/{self.rack}/{self.shelf}/{self.bin}"
 
 
+class CostLayer(models.Model):
+    """A quantity of a material received at one unit cost, consumed oldest first."""
+    
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='cost_layers')
+    purchase_order_item = models.ForeignKey(
+        'purchases.PurchaseOrderItem',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cost_layers'
+    )
+    received_at = models.DateTimeField()
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4)
+    quantity_received = models.DecimalField(max_digits=12, decimal_places=2)
+    quantity_remaining = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    class Meta:
+        verbose_name = _('cost layer')
+        verbose_name_plural = _('cost layers')
+        ordering = ['material', 'received_at', 'id']
+        indexes = [
+            models.Index(fields=['material', 'received_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.material.name}: {self.quantity_remaining}/{self.quantity_received} @ {self.unit_cost}"
+
+
+class MaterialValuation(models.Model):
+    """Running on-hand quantity and value of a material, maintained on every costed stock movement."""
+    
+    material = models.OneToOneField(Material, on_delete=models.CASCADE, related_name='valuation')
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fifo_value = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    average_value = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('material valuation')
+        verbose_name_plural = _('material valuations')
+    
+    def __str__(self):
+        return f"{self.material.name}: {self.quantity} valued {self.fifo_value} (FIFO)"
+    
+    @property
+    def average_cost(self):
+        """Weighted-average unit cost of what is on hand."""
+        if self.quantity <= 0:
+            return Decimal('0')
+        return self.average_value / self.quantity
+
+
+# Deferred by create_stock_adjustment_on_material_save inside building_material_management.batch.deferred()
+STOCK_ADJUSTMENTS = 'stock_adjustments'
+
+
 # Signal to create a stock adjustment record when material stock changes
 @receiver(post_save, sender=Material)
 def create_stock_adjustment_on_material_save(sender, instance, created, **kwargs):
@@ -192,6 +253,9 @@ def create_stock_adjustment_on_material_save(sender, instance, created, **kwargs
     For other stock changes (from sales, purchases, etc.), we'll create adjustments directly.
     """
     if not created and hasattr(instance, '_stock_changed') and instance._stock_changed:
+        if batch.defer(STOCK_ADJUSTMENTS, instance.pk, instance._previous_quantity):
+            del instance._stock_changed, instance._previous_quantity
+            return
         StockAdjustment.objects.create(
             material=instance,
             adjustment_type='correction',
@@ -202,4 +266,41 @@ def create_stock_adjustment_on_material_save(sender, instance, created, **kwargs
             performed_by=instance.updated_by
         )
         delattr(instance, '_stock_changed')
-        delattr(instance, '_previous_quantity')
\ No newline at end of file
+        delattr(instance, '_previous_quantity')
+
+
+@batch.register(STOCK_ADJUSTMENTS)
+def create_stock_adjustments(pending):
+    """Batch equivalent of create_stock_adjustment_on_material_save for {material id: quantity before}."""
+    adjustments = []
+    for material_ids in batch.chunked(pending):
+        for pk, quantity, updated_by in Material.objects.filter(id__in=material_ids).values_list(
+            'id', 'quantity_in_stock', 'updated_by'
+        ):
+            if quantity != pending[pk]:
+                adjustments.append(StockAdjustment(
+                    material_id=pk,
+                    adjustment_type='correction',
+                    quantity=quantity - pending[pk],
+                    previous_quantity=pending[pk],
+                    new_quantity=quantity,
+                    reason='System adjustment',
+                    performed_by_id=updated_by,
+                ))
+    StockAdjustment.objects.bulk_create(adjustments, batch_size=1000)
+
+
+# Cached reorder suggestions depend on sales, receipts, stock, open orders and supplier terms
+@receiver(post_save, sender=Material)
+@receiver(post_save, sender=CostLayer)
+@receiver(post_save, sender='sales.SaleItem')
+@receiver(post_delete, sender='sales.SaleItem')
+@receiver(post_save, sender='purchases.PurchaseOrder')
+@receiver(post_save, sender='purchases.PurchaseOrderItem')
+@receiver(post_delete, sender='purchases.PurchaseOrderItem')
+@receiver(post_save, sender='suppliers.SupplierMaterial')
+@receiver(post_delete, sender='suppliers.SupplierMaterial')
+def invalidate_reorder_suggestions(sender, **kwargs):
+    """Drop cached reorder suggestions when any of their inputs change."""
+    from .replenishment import invalidate
+    invalidate()
@@ -0,0 +1,161 @@
+"""
+Reorder suggestions from sales velocity and supplier lead times.
+
+Daily demand per material comes from the per-day sales aggregate
+(MaterialDailySales) as the larger of a short and a long moving average.
+With the main supplier's lead time and minimum order quantity that gives a
+reorder point and an order-up-to level for every material at once in NumPy;
+materials whose stock plus open orders is at or below their reorder point
+are suggested, grouped by main supplier.
+
+The result is cached and dropped when a sale, receipt, stock change or
+supplier terms change the inputs (see the receivers in inventory.models).
+That only reaches every worker through a shared cache backend, which the
+settings configure (see CACHES).
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from purchases.models import PurchaseOrder, PurchaseOrderItem
+from sales.models import MaterialDailySales
+from suppliers.models import SupplierMaterial
+
+from .models import Material
+
+
+CACHE_KEY = 'reorder_suggestions'
+
+DEFAULTS = {
+    'REORDER_SHORT_WINDOW_DAYS': 7,
+    'REORDER_LONG_WINDOW_DAYS': 28,
+    # Days of demand an order should cover beyond the reorder point
+    'REORDER_REVIEW_DAYS': 14,
+    # Standard deviations of daily demand held as safety stock (1.65 ~ 95% service level)
+    'REORDER_SAFETY_FACTOR': 1.65,
+    'REORDER_DEFAULT_LEAD_TIME_DAYS': 7,
+    'REORDER_CACHE_TIMEOUT': 3600,
+}
+
+
+def _setting(name):
+    return getattr(settings, name, DEFAULTS[name])
+
+
+def _cache_timeout():
+    """Keep suggestions at most until midnight, when the demand windows move on."""
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min))
+    return max(1, min(_setting('REORDER_CACHE_TIMEOUT'), int((midnight - now).total_seconds())))
+
+
+def invalidate():
+    """Drop cached suggestions once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def demand_matrix(material_ids, days, today):
+    """Quantity sold per material (rows) per day (columns) over the last ``days`` days."""
+    index = {pk: row for row, pk in enumerate(material_ids)}
+    matrix = np.zeros((len(material_ids), days))
+    start = today - timedelta(days=days - 1)
+    sales = MaterialDailySales.objects.filter(date__gte=start, date__lte=today).values_list(
+        'material_id', 'date', 'quantity'
+    )
+    for material_id, date, quantity in sales.iterator(chunk_size=5000):
+        row = index.get(material_id)
+        if row is not None:
+            matrix[row, (date - start).days] += float(quantity)
+    return matrix
+
+
+def compute_suggestions(today=None):
+    """Suggested orders for the whole active catalog, grouped by main supplier."""
+    today = today or timezone.localdate()
+    short_days = _setting('REORDER_SHORT_WINDOW_DAYS')
+    long_days = max(_setting('REORDER_LONG_WINDOW_DAYS'), short_days)
+
+    materials = list(Material.objects.filter(is_active=True).values_list(
+        'id', 'name', 'main_supplier_id', 'main_supplier__name', 'quantity_in_stock',
+        'reorder_level', 'reorder_quantity', 'cost_per_unit',
+    ))
+    result = {'as_of': today, 'generated_at': timezone.now(), 'suppliers': []}
+    if not materials:
+        return result
+    ids, names, supplier_ids, supplier_names, stock, reorder_levels, reorder_quantities, costs = zip(*materials)
+
+    terms = {
+        material_id: (lead_time, moq, price)
+        for material_id, lead_time, moq, price in SupplierMaterial.objects.filter(
+            material__is_active=True, supplier_id=F('material__main_supplier_id')
+        ).values_list('material_id', 'lead_time_days', 'minimum_order_quantity', 'unit_price')
+    }
+    on_order = dict(
+        PurchaseOrderItem.objects.filter(
+            purchase_order__status__in=PurchaseOrder.OPEN_STATUSES, purchase_order__is_deleted=False
+        ).values('material_id').annotate(total=Sum('quantity')).values_list('material_id', 'total')
+    )
+
+    default_lead_time = _setting('REORDER_DEFAULT_LEAD_TIME_DAYS')
+    lead_time = np.array([terms.get(pk, (default_lead_time,))[0] for pk in ids], dtype=float)
+    moq = np.array([float(terms[pk][1]) if pk in terms else 1.0 for pk in ids])
+    unit_price = np.array([float(terms[pk][2]) if pk in terms else float(cost) for pk, cost in zip(ids, costs)])
+    stock = np.array(stock, dtype=float)
+    open_orders = np.array([float(on_order.get(pk, 0)) for pk in ids])
+
+    sold = demand_matrix(ids, long_days, today)
+    demand = np.maximum(sold[:, -short_days:].mean(axis=1), sold.mean(axis=1))
+    safety_stock = _setting('REORDER_SAFETY_FACTOR') * sold.std(axis=1) * np.sqrt(lead_time)
+    reorder_point = np.maximum(demand * lead_time + safety_stock, np.array(reorder_levels, dtype=float))
+    order_up_to = reorder_point + demand * _setting('REORDER_REVIEW_DAYS')
+
+    position = stock + open_orders
+    quantity = np.maximum(order_up_to - position, np.array(reorder_quantities, dtype=float))
+    quantity = np.ceil(quantity / np.where(moq > 0, moq, 1)) * np.where(moq > 0, moq, 1)
+    suggested = (position <= reorder_point) & (quantity > 0)
+
+    groups = {}
+    for row in np.flatnonzero(suggested):
+        supplier_id = supplier_ids[row]
+        group = groups.setdefault(supplier_id, {
+            'supplier_id': supplier_id,
+            'supplier_name': supplier_names[row],
+            'total_cost': 0.0,
+            'lines': [],
+        })
+        line_total = round(float(quantity[row] * unit_price[row]), 2)
+        group['lines'].append({
+            'material_id': ids[row],
+            'material_name': names[row],
+            'quantity_in_stock': round(float(stock[row]), 2),
+            'on_order': round(float(open_orders[row]), 2),
+            'daily_demand': round(float(demand[row]), 3),
+            'days_of_cover': round(float(stock[row] / demand[row]), 1) if demand[row] > 0 else None,
+            'lead_time_days': int(lead_time[row]),
+            'minimum_order_quantity': round(float(moq[row]), 2),
+            'reorder_point': round(float(reorder_point[row]), 2),
+            'suggested_quantity': round(float(quantity[row]), 2),
+            'unit_price': round(float(unit_price[row]), 2),
+            'line_total': line_total,
+        })
+        group['total_cost'] = round(group['total_cost'] + line_total, 2)
+
+    # Materials without a main supplier are listed last
+    result['suppliers'] = sorted(
+        groups.values(), key=lambda group: (group['supplier_id'] is None, group['supplier_name'] or '')
+    )
+    return result
+
+
+def get_suggestions():
+    """Cached suggestions, computed on first use after an invalidation."""
+    suggestions = cache.get(CACHE_KEY)
+    if suggestions is None:
+        suggestions = compute_suggestions()
+        cache.set(CACHE_KEY, suggestions, _cache_timeout())
+    return suggestions
@@ -1,6 +1,9 @@
 # inventory/serializers.py
 
+from django.db import transaction
 from rest_framework import serializers
+
+from . import costing
 from .models import Category, UnitOfMeasure, Material, StockAdjustment, MaterialLocation
 
 
@@ -61,11 +64,16 @@ class MaterialSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         validated_data['created_by'] = user
         validated_data['updated_by'] = user
-        return super().create(validated_data)
+        with transaction.atomic():
+            material = super().create(validated_data)
+            # Opening stock is costed at the material's own cost
+            costing.receive(material, material.quantity_in_stock, material.cost_per_unit)
+        return material
     
     def update(self, instance, validated_data):
         """Update a material and record who updated it."""
         user = self.context['request'].user
+        previous_quantity = instance.quantity_in_stock
         
         # Track stock changes for signal processing
         if 'quantity_in_stock' in validated_data and validated_data['quantity_in_stock'] != instance.quantity_in_stock:
@@ -73,7 +81,10 @@ class MaterialSerializer(serializers.ModelSerializer):
             instance._previous_quantity = instance.quantity_in_stock
         
         validated_data['updated_by'] = user
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            material = super().update(instance, validated_data)
+            costing.adjust(material, previous_quantity, material.quantity_in_stock)
+        return material
 
 
 class StockAdjustmentSerializer(serializers.ModelSerializer):
@@ -120,7 +131,9 @@ class StockAdjustmentSerializer(serializers.ModelSerializer):
         validated_data['new_quantity'] = new_quantity
         validated_data['performed_by'] = user
         material.updated_by = user
-        material.save()
-        
-        # Create the adjustment record
-        return super().create(validated_data)
\ No newline at end of file
+        with transaction.atomic():
+            material.save()
+            costing.adjust(material, validated_data['previous_quantity'], new_quantity)
+            
+            # Create the adjustment record
+            return super().create(validated_data)
\ No newline at end of file
@@ -1,3 +1,224 @@
+import io
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Sum
 from django.test import TestCase
+from django.utils import timezone
+
+from building_material_management import batch
+from customers.models import Customer
+from debts.models import Debt, DebtPayment
+from sales.models import MaterialDailySales, Sale
+from suppliers.models import Supplier, SupplierMaterial
+
+from . import costing, replenishment
+from .models import Category, CostLayer, Material, MaterialValuation, StockAdjustment, UnitOfMeasure
+
+
+class CatalogMixin:
+    def make_catalog(self):
+        self.category = Category.objects.create(name='Binders')
+        self.unit = UnitOfMeasure.objects.create(name='Bag', abbreviation='bag')
+        self.supplier = Supplier.objects.create(name='Cement Co', phone='1', address='-', city='-')
+
+    def make_material(self, name, stock, **fields):
+        return Material.objects.create(
+            name=name, category=self.category, unit=self.unit, quantity_in_stock=Decimal(stock),
+            price_per_unit=Decimal('12.00'), cost_per_unit=Decimal('9.00'), **fields
+        )
+
+
+class SeedInventoryTests(TestCase):
+    def seed(self, *args):
+        call_command('seed_inventory', '--bulk', *args, stdout=io.StringIO())
+
+    def catalog(self):
+        return sorted(Material.objects.values_list('name', 'category__name', 'unit__abbreviation', 'price_per_unit'))
+
+    def test_bulk_seed_matches_the_regular_seed_and_is_idempotent(self):
+        call_command('seed_inventory', stdout=io.StringIO())
+        regular = self.catalog()
+        Material.objects.all().delete()
+
+        self.seed()
+        self.assertEqual(self.catalog(), regular)
+        self.seed('--multiplier', '2')
+        self.seed('--multiplier', '2')
+        self.assertEqual(Material.objects.count(), 2 * len(regular))
+        self.assertTrue(Material.objects.filter(name=f'{regular[0][0]} #2').exists())
+
+    def test_bulk_clear_removes_valuations_layers_and_sales_aggregates(self):
+        self.seed()
+        self.assertTrue(Material.objects.exists())
+        costing.rebuild()
+        material = Material.objects.order_by('id').first()
+        MaterialDailySales.objects.record_items(timezone.localdate(), [(material.id, Decimal('2'), Decimal('5'))])
+
+        self.seed('--clear')
+        connection.check_constraints()
+        self.assertTrue(Material.objects.exists())
+        self.assertFalse(CostLayer.objects.exists())
+        self.assertFalse(MaterialValuation.objects.exists())
+        self.assertFalse(MaterialDailySales.objects.exists())
+
+
+class CostingTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cement = self.make_material('Cement', '0')
+
+    def valuation(self):
+        valuation = MaterialValuation.objects.get(material=self.cement)
+        return valuation.quantity, valuation.fifo_value, valuation.average_value
+
+    def test_issues_consume_oldest_layers_and_average_the_rest(self):
+        start = timezone.now() - timedelta(days=2)
+        costing.receive(self.cement, 10, '4', received_at=start)
+        costing.receive(self.cement, 10, '6', received_at=start + timedelta(days=1))
+
+        self.assertEqual(costing.issue(self.cement, 15), (Decimal('70'), Decimal('75')))
+        self.assertEqual(self.valuation(), (Decimal('5'), Decimal('30'), Decimal('25')))
+
+        # Returned units come back at the average cost
+        costing.restock(self.cement, 5)
+        self.assertEqual(self.valuation(), (Decimal('10'), Decimal('55'), Decimal('50')))
+
+        # Units beyond the layers are costed at the average
+        self.assertEqual(costing.issue(self.cement, 12), (Decimal('65'), Decimal('60')))
+        self.assertEqual(self.valuation(), (Decimal('0'), Decimal('0'), Decimal('0')))
+        self.assertFalse(CostLayer.objects.filter(quantity_remaining__gt=0).exists())
+
+    def test_rebuild_keeps_the_newest_receipts_on_hand(self):
+        from purchases.models import PurchaseOrder, PurchaseOrderItem
+
+        sand = self.make_material('Sand', '50')
+        Material.objects.filter(pk=self.cement.pk).update(quantity_in_stock=Decimal('30'))
+        received = timezone.now() - timedelta(days=5)
+        for days, material, quantity, price in [(0, self.cement, '20', '3'), (1, self.cement, '15', '5'),
+                                                (0, sand, '20', '3')]:
+            order = PurchaseOrder.objects.create(
+                supplier=self.supplier, status=PurchaseOrder.STATUS_RECEIVED,
+                received_at=received + timedelta(days=days),
+            )
+            PurchaseOrderItem.objects.bulk_create([PurchaseOrderItem(
+                purchase_order=order, material=material, quantity=Decimal(quantity), price=Decimal(price),
+            )])
+
+        costing.rebuild(Material.objects.filter(pk__in=[self.cement.pk, sand.pk]))
+        # 15 at 5 from the newest order, then 15 of the 20 at 3
+        self.assertEqual(self.valuation(), (Decimal('30'), Decimal('120'), Decimal('120')))
+        # Stock older than the receipts opens at the material cost
+        opening = CostLayer.objects.get(material=sand, purchase_order_item__isnull=True)
+        self.assertEqual((opening.quantity_remaining, opening.unit_cost), (Decimal('30'), Decimal('9')))
+        self.assertEqual(costing.issue(sand, 30), (Decimal('270'), Decimal('198')))
+
+        totals = costing.warehouse_valuation()
+        self.assertEqual((totals['materials'], totals['fifo_value']), (2, Decimal('180.00')))
+
+
+class ReorderSuggestionTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cement = self.make_material(
+            'Cement', '10', reorder_level=Decimal('5'), reorder_quantity=Decimal('0'), main_supplier=self.supplier
+        )
+        self.sand = self.make_material('Sand', '1000', reorder_level=Decimal('5'), main_supplier=self.supplier)
+        SupplierMaterial.objects.create(
+            supplier=self.supplier, material=self.cement, unit_price=Decimal('3.00'),
+            minimum_order_quantity=Decimal('25'), lead_time_days=5,
+        )
+        today = timezone.localdate()
+        for days_ago in range(28):
+            MaterialDailySales.objects.record_items(
+                today - timedelta(days=days_ago),
+                [(self.cement.id, Decimal('2'), Decimal('12')), (self.sand.id, Decimal('2'), Decimal('12'))],
+            )
+
+    def test_suggests_materials_at_their_reorder_point_in_supplier_multiples(self):
+        suggestions = replenishment.compute_suggestions()
+        [group] = suggestions['suppliers']
+        [line] = group['lines']
+        self.assertEqual(group['supplier_id'], self.supplier.id)
+        self.assertEqual(line['material_id'], self.cement.id)
+        # Two a day over a five day lead time, topped up for fourteen more days, in packs of 25
+        self.assertEqual((line['reorder_point'], line['suggested_quantity']), (10.0, 50.0))
+        self.assertEqual(group['total_cost'], 150.0)
+
+    def test_cached_suggestions_are_shared_and_dropped_on_stock_changes(self):
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+        caches['default'].delete(replenishment.CACHE_KEY)
+        self.assertEqual(len(replenishment.get_suggestions()['suppliers']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cement.quantity_in_stock = Decimal('100')
+            self.cement.save()
+        self.assertEqual(replenishment.get_suggestions()['suppliers'], [])
+
+
+class DeferredStockAdjustmentTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cement = self.make_material('Cement', '10')
+
+    def set_stock(self, quantity):
+        self.cement._stock_changed = True
+        self.cement._previous_quantity = self.cement.quantity_in_stock
+        self.cement.quantity_in_stock = Decimal(quantity)
+        self.cement.save()
+
+    def test_one_adjustment_from_the_first_to_the_last_quantity(self):
+        with batch.deferred():
+            self.set_stock('14')
+            self.set_stock('6')
+            self.assertFalse(StockAdjustment.objects.exists())
+
+        adjustment = StockAdjustment.objects.get()
+        self.assertEqual(
+            (adjustment.previous_quantity, adjustment.new_quantity, adjustment.quantity),
+            (Decimal('10'), Decimal('6'), Decimal('-4')),
+        )
+
+    def test_no_adjustment_when_the_stock_ends_where_it_started(self):
+        with batch.deferred():
+            self.set_stock('14')
+            self.set_stock('10')
+        self.assertFalse(StockAdjustment.objects.exists())
+
+
+class BenchmarkDataTests(TestCase):
+    def test_generated_books_are_consistent_and_benchmarks_run(self):
+        call_command(
+            'generate_benchmark_data', materials=20, customers=5, suppliers=2, sales=60, debts=15,
+            payments=20, purchase_orders=4, expenses=3, days=60, stdout=io.StringIO(),
+        )
+        self.assertEqual((Sale.objects.count(), Debt.objects.count()), (60, 15))
+        self.assertEqual(DebtPayment.objects.count(), 20)
+        for debt in Debt.objects.annotate(payments_total=Sum('payments__amount')):
+            self.assertEqual(debt.paid_amount, debt.payments_total or 0)
+        for customer in Customer.objects.annotate(
+            remaining=Sum(F('debts__total_amount') - F('debts__paid_amount'))
+        ):
+            self.assertEqual(customer.outstanding_balance, customer.remaining or 0)
+        self.assertEqual(MaterialValuation.objects.count(), Material.objects.count())
 
-# Create your tests here.
+        with tempfile.TemporaryDirectory() as base:
+            output = Path(base) / 'results.json'
+            call_command(
+                'run_benchmarks', only='debts.aging,payments.daily_summary', iterations=1,
+                output=str(output), stdout=io.StringIO(),
+            )
+            report = json.loads(output.read_text())
+        self.assertEqual(
+            {result['name']: result['status_code'] for result in report['results']},
+            {'debts.aging': 200, 'payments.daily_summary': 200},
+        )
+        with self.assertRaisesMessage(CommandError, '--iterations must be at least 1.'):
+            call_command('run_benchmarks', iterations=0, stdout=io.StringIO())
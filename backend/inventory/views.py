@@ -6,9 +6,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField
+from django.db.models import F
 from django.utils.translation import gettext_lazy as _
 
+from . import costing, replenishment
 from .models import Category, UnitOfMeasure, Material, StockAdjustment, MaterialLocation
 from .serializers import (
     CategorySerializer, 
@@ -114,18 +115,34 @@ class MaterialViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(materials, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='reorder-suggestions')
+    def reorder_suggestions(self, request):
+        """
+        Suggested purchase orders grouped by main supplier, from sales velocity,
+        lead time and minimum order quantity. Optional ?supplier=<id>.
+        """
+        suggestions = replenishment.get_suggestions()
+        supplier = request.query_params.get('supplier')
+        if supplier:
+            if not supplier.isdigit():
+                return Response({'detail': 'supplier must be an id.'}, status=status.HTTP_400_BAD_REQUEST)
+            suggestions = {
+                **suggestions,
+                'suppliers': [
+                    group for group in suggestions['suppliers'] if group['supplier_id'] == int(supplier)
+                ],
+            }
+        return Response(suggestions)
+    
     @action(detail=False, methods=['get'])
     def stock_value(self, request):
-        """Get total stock value."""
-        total_value = Material.objects.filter(is_active=True).aggregate(
-            total_value=Sum(
-                ExpressionWrapper(
-                    F('quantity_in_stock') * F('cost_per_unit'), 
-                    output_field=DecimalField()
-                )
-            )
-        )
-        return Response({'total_stock_value': total_value['total_value'] or 0})
+        """Get total stock value at cost (FIFO and weighted average)."""
+        valuation = costing.warehouse_valuation()
+        return Response({
+            'total_stock_value': valuation['fifo_value'],
+            'fifo_value': valuation['fifo_value'],
+            'average_value': valuation['average_value'],
+        })
 
 
 class StockAdjustmentViewSet(viewsets.ModelViewSet):
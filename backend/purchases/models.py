@@ -1,17 +1,77 @@
-from django.db import models
+import math
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, When
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from inventory.models import Material
-from suppliers.models import Supplier
+from building_material_management import batch
+from inventory import costing
+from inventory.models import CostLayer, Material
+from suppliers.models import Supplier, SupplierMaterial
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+class PurchaseOrderManager(models.Manager):
+    def create_drafts(self, materials=None, user=None):
+        """
+        Draft one purchase order per supplier covering every low-stock material.
+
+        Each material is ordered from its preferred (else cheapest) supplier,
+        falling back to its main supplier at cost_per_unit, for its
+        reorder_quantity (at least enough to get back to the reorder level)
+        rounded up to the supplier's minimum order quantity. Materials already
+        on a draft or pending order are left out. Returns (orders, skipped
+        material ids that have no supplier).
+        """
+        materials = Material.objects.all() if materials is None else materials
+        on_order = PurchaseOrderItem.objects.filter(
+            purchase_order__status__in=PurchaseOrder.OPEN_STATUSES, purchase_order__is_deleted=False
+        ).values('material_id')
+        low_stock = list(
+            materials.filter(is_active=True, quantity_in_stock__lte=F('reorder_level'))
+            .exclude(id__in=on_order)
+            .values_list('id', 'main_supplier_id', 'quantity_in_stock', 'reorder_level',
+                         'reorder_quantity', 'cost_per_unit')
+        )
+        terms = SupplierMaterial.objects.preferred_for([row[0] for row in low_stock])
+
+        lines, skipped = {}, []
+        for material_id, main_supplier_id, stock, reorder_level, reorder_quantity, cost in low_stock:
+            row = terms.get(material_id)
+            if row is not None:
+                supplier_id, price, moq = row.supplier_id, row.unit_price, row.minimum_order_quantity
+            elif main_supplier_id is not None:
+                supplier_id, price, moq = main_supplier_id, cost, Decimal('1')
+            else:
+                skipped.append(material_id)
+                continue
+            quantity = max(reorder_quantity, reorder_level - stock, moq)
+            if moq > 0:
+                quantity = math.ceil(quantity / moq) * moq
+            lines.setdefault(supplier_id, []).append((material_id, quantity, price))
+
+        orders = []
+        with transaction.atomic(using=self.db):
+            for supplier_id, supplier_lines in lines.items():
+                order = self.create(supplier_id=supplier_id, status=PurchaseOrder.STATUS_DRAFT, created_by=user)
+                orders.append(order)
+                PurchaseOrderItem.objects.bulk_create([
+                    PurchaseOrderItem(purchase_order=order, material_id=material_id, quantity=quantity, price=price)
+                    for material_id, quantity, price in supplier_lines
+                ], batch_size=1000)
+        return orders, skipped
+
+
 class PurchaseOrder(models.Model):
+    STATUS_DRAFT = 'draft'
     STATUS_PENDING = 'pending'
     STATUS_RECEIVED = 'received'
     STATUS_CANCELLED = 'cancelled'
     STATUS_CHOICES = [
+        (STATUS_DRAFT, _('Draft')),
         (STATUS_PENDING, _('Pending')),
         (STATUS_RECEIVED, _('Received')),
         (STATUS_CANCELLED, _('Cancelled')),
@@ -25,6 +85,11 @@ class PurchaseOrder(models.Model):
     received_at = models.DateTimeField(null=True, blank=True)
     is_deleted = models.BooleanField(default=False)
 
+    # Ordered but not yet received
+    OPEN_STATUSES = [STATUS_DRAFT, STATUS_PENDING]
+
+    objects = PurchaseOrderManager()
+
 class PurchaseOrderItem(models.Model):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='items')
     material = models.ForeignKey(Material, on_delete=models.PROTECT)
@@ -35,10 +100,60 @@ class PurchaseOrderItem(models.Model):
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+# Deferred by adjust_inventory_on_receive inside building_material_management.batch.deferred()
+RECEIPTS = 'purchase_receipts'
+
+
 @receiver(post_save, sender=PurchaseOrder)
 def adjust_inventory_on_receive(sender, instance, created, **kwargs):
     if not created and instance.status == PurchaseOrder.STATUS_RECEIVED:
+        if batch.defer(RECEIPTS, instance.pk):
+            return
+        # Orders with cost layers were stocked when they were first received
+        if costed_orders([instance.pk]):
+            return
         for item in instance.items.all():
             m = item.material
             m.quantity_in_stock = models.F('quantity_in_stock') + item.quantity
-            m.save()
\ No newline at end of file
+            m.save()
+        record_cost_layers([instance.pk])
+
+
+@batch.register(RECEIPTS)
+def receive_orders(pending):
+    """Batch equivalent of adjust_inventory_on_receive: each received order is stocked once."""
+    stock_field = Material._meta.get_field('quantity_in_stock')
+    for order_ids in batch.chunked(pending):
+        order_ids = set(PurchaseOrder.objects.filter(
+            id__in=order_ids, status=PurchaseOrder.STATUS_RECEIVED
+        ).values_list('id', flat=True))
+        # Orders with cost layers were stocked when they were first received
+        order_ids -= costed_orders(order_ids)
+        received = dict(
+            PurchaseOrderItem.objects.filter(purchase_order_id__in=order_ids)
+            .values('material_id').annotate(total=Sum('quantity')).values_list('material_id', 'total')
+        )
+        if received:
+            Material.objects.filter(id__in=received).update(
+                quantity_in_stock=Case(
+                    *[When(id=pk, then=F('quantity_in_stock') + quantity) for pk, quantity in received.items()],
+                    output_field=stock_field,
+                ),
+                updated_at=timezone.now(),
+            )
+        record_cost_layers(order_ids)
+
+
+def costed_orders(order_ids):
+    """The ids among ``order_ids`` of orders that already have cost layers."""
+    return set(CostLayer.objects.filter(
+        purchase_order_item__purchase_order__in=order_ids
+    ).values_list('purchase_order_item__purchase_order', flat=True))
+
+
+def record_cost_layers(order_ids):
+    """Add a cost layer at the purchase price for each item of the given received orders, once."""
+    items = PurchaseOrderItem.objects.filter(
+        purchase_order_id__in=set(order_ids) - costed_orders(order_ids)
+    ).values_list('material_id', 'quantity', 'price', 'id', 'purchase_order__received_at')
+    return costing.receive_many(items)
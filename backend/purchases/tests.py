@@ -1,3 +1,121 @@
+from contextlib import nullcontext
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from building_material_management import batch
+from inventory.models import CostLayer, Material
+from inventory.tests import CatalogMixin
+from suppliers.models import Supplier, SupplierMaterial
+from users.models import User
+
+from .models import PurchaseOrder, PurchaseOrderItem
+
+
+class DeferredReceiptTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cement = self.make_material('Cement', '10')
+        self.order = PurchaseOrder.objects.create(supplier=self.supplier)
+        PurchaseOrderItem.objects.create(
+            purchase_order=self.order, material=self.cement, quantity=Decimal('25'), price=Decimal('8.00')
+        )
+
+    def receive(self):
+        self.order.status = PurchaseOrder.STATUS_RECEIVED
+        self.order.received_at = timezone.now()
+        self.order.save()
+
+    def test_received_orders_are_stocked_once_when_the_batch_exits(self):
+        with batch.deferred():
+            self.receive()
+            self.receive()
+            self.cement.refresh_from_db()
+            self.assertEqual(self.cement.quantity_in_stock, Decimal('10'))
+
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.quantity_in_stock, Decimal('35'))
+        layer = CostLayer.objects.get()
+        self.assertEqual((layer.quantity_received, layer.unit_cost), (Decimal('25'), Decimal('8')))
+
+    def test_resaving_an_order_received_before_the_batch_does_not_restock_it(self):
+        self.receive()
+        with batch.deferred():
+            self.order.save()
+
+        self.cement.refresh_from_db()
+        self.assertEqual(self.cement.quantity_in_stock, Decimal('35'))
+        self.assertEqual(CostLayer.objects.count(), 1)
+
+    def test_saving_a_received_order_twice_stocks_it_once_batched_or_not(self):
+        for deferred in (False, True):
+            with self.subTest(deferred=deferred):
+                CostLayer.objects.all().delete()
+                Material.objects.filter(pk=self.cement.pk).update(quantity_in_stock=Decimal('10'))
+                with batch.deferred() if deferred else nullcontext():
+                    self.receive()
+                    self.order.save()
+
+                self.cement.refresh_from_db()
+                self.assertEqual(self.cement.quantity_in_stock, Decimal('35'))
+                self.assertEqual(CostLayer.objects.count(), 1)
+
+
+class DraftOrderTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.wholesaler = Supplier.objects.create(name='Wholesaler', phone='2', address='-', city='-')
+        self.cement = self.make_material(
+            'Cement', '2', reorder_level=Decimal('10'), reorder_quantity=Decimal('30'), main_supplier=self.supplier
+        )
+        SupplierMaterial.objects.create(
+            supplier=self.wholesaler, material=self.cement, unit_price=Decimal('3.00'),
+            minimum_order_quantity=Decimal('25'), is_preferred=True,
+        )
+        SupplierMaterial.objects.create(supplier=self.supplier, material=self.cement, unit_price=Decimal('2.00'))
+        self.sand = self.make_material(
+            'Sand', '0', reorder_level=Decimal('5'), reorder_quantity=Decimal('0'), main_supplier=self.supplier
+        )
+        self.gravel = self.make_material('Gravel', '0', reorder_level=Decimal('5'))
+        self.make_material('Brick', '50', reorder_level=Decimal('5'), main_supplier=self.supplier)
+        lime = self.make_material('Lime', '0', reorder_level=Decimal('5'), main_supplier=self.supplier)
+        pending = PurchaseOrder.objects.create(supplier=self.supplier)
+        PurchaseOrderItem.objects.create(purchase_order=pending, material=lime, quantity=Decimal('5'), price=Decimal('1'))
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email='buyer@example.com', password='x', role=User.ADMIN)
+        )
+
+    def generate(self, **body):
+        return self.client.post('/api/purchases/orders/generate-drafts/', body, format='json')
+
+    def test_one_draft_per_supplier_for_low_stock_not_on_order(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['skipped_materials'], [self.gravel.id])
+
+        lines = {
+            (item.purchase_order.supplier_id, item.material_id): (item.quantity, item.price)
+            for item in PurchaseOrderItem.objects.filter(purchase_order__status=PurchaseOrder.STATUS_DRAFT)
+        }
+        self.assertEqual(lines, {
+            # Preferred supplier, reorder quantity rounded up to its packs of 25
+            (self.wholesaler.id, self.cement.id): (Decimal('50'), Decimal('3.00')),
+            # No supplier terms: main supplier at cost, enough to reach the reorder level
+            (self.supplier.id, self.sand.id): (Decimal('5'), Decimal('9.00')),
+        })
+
+        again = self.generate()
+        self.assertEqual((again.status_code, again.data['orders']), (200, []))
 
-# Create your tests here.
+    def test_limits_the_run_to_the_given_materials(self):
+        self.assertEqual(self.generate(materials=[self.sand.id]).status_code, 201)
+        self.assertEqual(
+            list(PurchaseOrderItem.objects.filter(purchase_order__status=PurchaseOrder.STATUS_DRAFT)
+                 .values_list('material_id', flat=True)),
+            [self.sand.id],
+        )
+        self.assertEqual(self.generate(materials='all').status_code, 400)
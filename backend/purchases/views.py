@@ -5,6 +5,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 
+from inventory.models import Material
+
 from .models import PurchaseOrder
 from .serializers import PurchaseOrderSerializer
 from users.permissions import IsAdminOrManagerOrReadOnly
@@ -48,6 +50,51 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             ip_address=self.request.META.get('REMOTE_ADDR')
         )
 
+    @action(detail=False, methods=['post'], url_path='generate-drafts')
+    def generate_drafts(self, request):
+        """
+        Draft purchase orders, one per supplier, for every low-stock material
+        not already on order. Optional body: {"materials": [ids]} to limit the run.
+        """
+        materials = Material.objects.all()
+        material_ids = request.data.get('materials')
+        if material_ids is not None:
+            if not isinstance(material_ids, list) or not all(isinstance(pk, int) for pk in material_ids):
+                return Response({'detail': 'materials must be a list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+            materials = materials.filter(id__in=material_ids)
+
+        orders, skipped = PurchaseOrder.objects.create_drafts(materials, user=request.user)
+        if orders:
+            UserActivity.objects.create(
+                user=request.user,
+                action="Draft Purchase Orders Generated",
+                module="Purchases",
+                description=f"Drafted POs {', '.join(str(po.id) for po in orders)} for low-stock materials",
+                ip_address=request.META.get('REMOTE_ADDR')
+            )
+        orders = PurchaseOrder.objects.filter(id__in=[po.id for po in orders]).prefetch_related('items')
+        return Response({
+            'orders': self.get_serializer(orders, many=True).data,
+            'skipped_materials': skipped,
+        }, status=status.HTTP_201_CREATED if orders else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """Turn a draft into a pending order."""
+        po = self.get_object()
+        if po.status != PurchaseOrder.STATUS_DRAFT:
+            return Response({'detail':'Invalid status.'}, status=status.HTTP_400_BAD_REQUEST)
+        po.status = PurchaseOrder.STATUS_PENDING
+        po.save()
+        UserActivity.objects.create(
+            user=request.user,
+            action="Purchase Order Submitted",
+            module="Purchases",
+            description=f"PO {po.id} submitted",
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+        return Response(self.get_serializer(po).data)
+
     @action(detail=True, methods=['post'])
     def receive(self, request, pk=None):
         po = self.get_object()
@@ -1,3 +1,25 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DailyCashSnapshot, DailyClose
+
+
+class DailyCashSnapshotInline(admin.TabularInline):
+    model = DailyCashSnapshot
+    fields = ('source', 'payment_method', 'transaction_count', 'amount')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(DailyClose)
+class DailyCloseAdmin(admin.ModelAdmin):
+    list_display = ('date', 'transaction_count', 'total_amount', 'closed_at', 'closed_by')
+    date_hierarchy = 'date'
+    readonly_fields = ('date', 'transaction_count', 'total_amount', 'closed_at', 'closed_by')
+    inlines = [DailyCashSnapshotInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,136 @@
+"""
+End-of-day cash-up.
+
+Closing a day totals what was received through each payment method from cash
+sales, debt payments and customer payments, and stores the result in
+DailyClose / DailyCashSnapshot rows that are never changed afterwards.
+Historical cash-up reports read those rows instead of the transactions.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from customers.models import CustomerPayment
+from debts.models import DebtPayment
+from sales.models import Sale
+
+from .models import DailyCashSnapshot, DailyClose
+
+
+class DayAlreadyClosed(Exception):
+    """Raised when closing a day that already has a close."""
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def day_totals(day):
+    """(source, payment method, count, amount) received on ``day``, one grouped query per source."""
+    start, end = day_bounds(day)
+    sources = [
+        (
+            DailyCashSnapshot.SALE,
+            Sale.objects.filter(sale_date__gte=start, sale_date__lt=end, is_deleted=False)
+            .exclude(payment_method=Sale.CREDIT),
+            'total_amount',
+        ),
+        (
+            DailyCashSnapshot.DEBT_PAYMENT,
+            DebtPayment.objects.filter(
+                payment_date__gte=start, payment_date__lt=end,
+                status=DebtPayment.COMPLETED, is_deleted=False,
+            ),
+            'amount',
+        ),
+        (
+            DailyCashSnapshot.CUSTOMER_PAYMENT,
+            CustomerPayment.objects.filter(
+                payment_date__gte=start, payment_date__lt=end, status=CustomerPayment.COMPLETED,
+            ),
+            'amount',
+        ),
+    ]
+    rows = []
+    for source, queryset, amount_field in sources:
+        grouped = queryset.values('payment_method').annotate(
+            count=Count('id'), amount=Sum(amount_field)
+        ).order_by('payment_method')
+        rows.extend((source, row['payment_method'], row['count'], row['amount']) for row in grouped)
+    return rows
+
+
+def close_day(day, user=None):
+    """
+    Compute and store the cash-up for ``day``. Raises DayAlreadyClosed if it exists.
+
+    Only finished days can be closed: a close is never changed, so closing
+    today would leave out everything received later in the day.
+    """
+    if day >= timezone.localdate():
+        raise ValueError('Only days before today can be closed.')
+
+    rows = day_totals(day)
+    with transaction.atomic():
+        # The unique date decides between concurrent closes of the same day
+        try:
+            with transaction.atomic():
+                close = DailyClose.objects.create(
+                    date=day,
+                    transaction_count=sum(count for _, _, count, _ in rows),
+                    total_amount=sum((amount for _, _, _, amount in rows), Decimal('0')),
+                    closed_by=user,
+                )
+        except IntegrityError:
+            raise DayAlreadyClosed(f'{day} is already closed.')
+        DailyCashSnapshot.objects.bulk_create([
+            DailyCashSnapshot(
+                close=close, date=day, source=source, payment_method=method,
+                transaction_count=count, amount=amount,
+            )
+            for source, method, count, amount in rows
+        ])
+    return close
+
+
+def cash_up_report(start_date, end_date):
+    """Closed days in the range with their per-source, per-method lines, plus range totals."""
+    closes = DailyClose.objects.filter(date__range=(start_date, end_date)).order_by('date')
+    lines = DailyCashSnapshot.objects.filter(date__range=(start_date, end_date)).values(
+        'date', 'source', 'payment_method', 'transaction_count', 'amount'
+    )
+
+    days = {
+        close.date: {
+            'date': close.date,
+            'transaction_count': close.transaction_count,
+            'total_amount': close.total_amount,
+            'closed_at': close.closed_at,
+            'sources': {},
+        }
+        for close in closes
+    }
+    totals = {}
+    for line in lines:
+        day = days.get(line['date'])
+        if day is None:
+            continue
+        day['sources'].setdefault(line['source'], {})[line['payment_method']] = {
+            'count': line['transaction_count'], 'amount': line['amount'],
+        }
+        method = totals.setdefault(line['payment_method'], {'count': 0, 'amount': Decimal('0')})
+        method['count'] += line['transaction_count']
+        method['amount'] += line['amount']
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'days_closed': len(days),
+        'total_amount': sum((day['total_amount'] for day in days.values()), Decimal('0')),
+        'payment_methods': totals,
+        'days': list(days.values()),
+    }
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reports.cashup import DayAlreadyClosed, close_day
+from reports.models import DailyClose
+
+
+class Command(BaseCommand):
+    help = 'Close business days, storing their cash-up snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to close as YYYY-MM-DD (default: yesterday)')
+        parser.add_argument('--backfill-from',
+                            help='Also close every unclosed day from this date up to --date')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['date']) if options['date'] else (
+                timezone.localdate() - timedelta(days=1)
+            )
+            start = date.fromisoformat(options['backfill_from']) if options['backfill_from'] else end
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+        if start > end:
+            raise CommandError('--backfill-from must not be after --date.')
+
+        closed = set(DailyClose.objects.filter(date__range=(start, end)).values_list('date', flat=True))
+        day = start
+        count = 0
+        while day <= end:
+            if day not in closed:
+                try:
+                    close = close_day(day)
+                except (DayAlreadyClosed, ValueError) as e:
+                    raise CommandError(str(e))
+                count += 1
+                self.stdout.write(f'{day}: {close.transaction_count} transactions, {close.total_amount:,.2f}')
+            elif start == end:
+                raise CommandError(f'{day} is already closed.')
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Closed {count} day(s).'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_closes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'daily close',
+                'verbose_name_plural': 'daily closes',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCashSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('sale', 'Sale'), ('debt_payment', 'Debt Payment'), ('customer_payment', 'Customer Payment')], max_length=20)),
+                ('payment_method', models.CharField(max_length=20)),
+                ('transaction_count', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('close', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='reports.dailyclose')),
+            ],
+            options={
+                'verbose_name': 'daily cash snapshot',
+                'verbose_name_plural': 'daily cash snapshots',
+                'ordering': ['date', 'source', 'payment_method'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'source', 'payment_method'), name='unique_daily_cash_line')],
+            },
+        ),
+    ]
@@ -1,3 +1,74 @@
+from django.conf import settings
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class DailyClose(models.Model):
+    """End-of-day cash-up for one business day. Immutable once written."""
+
+    date = models.DateField(unique=True)
+    transaction_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='daily_closes'
+    )
+
+    class Meta:
+        verbose_name = _('daily close')
+        verbose_name_plural = _('daily closes')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Close {self.date} - {self.total_amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Daily closes are immutable.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Daily closes are immutable.')
+
+
+class DailyCashSnapshot(models.Model):
+    """Money received on a closed day from one source through one payment method."""
+
+    SALE = 'sale'
+    DEBT_PAYMENT = 'debt_payment'
+    CUSTOMER_PAYMENT = 'customer_payment'
+
+    SOURCE_CHOICES = [
+        (SALE, _('Sale')),
+        (DEBT_PAYMENT, _('Debt Payment')),
+        (CUSTOMER_PAYMENT, _('Customer Payment')),
+    ]
+
+    close = models.ForeignKey(DailyClose, on_delete=models.PROTECT, related_name='lines')
+    date = models.DateField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    payment_method = models.CharField(max_length=20)
+    transaction_count = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=16, decimal_places=2)
+
+    class Meta:
+        verbose_name = _('daily cash snapshot')
+        verbose_name_plural = _('daily cash snapshots')
+        ordering = ['date', 'source', 'payment_method']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'source', 'payment_method'], name='unique_daily_cash_line'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.source} {self.payment_method}: {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Cash snapshots are immutable.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Cash snapshots are immutable.')
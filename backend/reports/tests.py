@@ -1,3 +1,78 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from debts.models import Debt, DebtPayment
+from sales.models import Sale
+from users.models import User
+
+from . import cashup
+from .cashup import DayAlreadyClosed, close_day
+from .models import DailyCashSnapshot, DailyClose
+
+
+class CloseDayTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='manager@example.com', password='x', role=User.ADMIN)
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+        noon = timezone.make_aware(datetime.combine(self.yesterday, time(12)))
+
+        customer = Customer.objects.create(name='Builder', phone='123')
+        for method, amount in [(Sale.CASH, '30.00'), (Sale.CASH, '20.00'), (Sale.CREDIT, '99.00')]:
+            sale = Sale.objects.create(
+                customer=customer, total_amount=Decimal(amount), payment_method=method,
+                payment_status=Sale.PENDING if method == Sale.CREDIT else Sale.PAID, created_by=self.user,
+            )
+            Sale.objects.filter(pk=sale.pk).update(sale_date=noon)
+        debt = Debt.objects.create(customer=customer, total_amount=Decimal('100.00'), due_date=self.yesterday)
+        DebtPayment.objects.create(debt=debt, customer=customer, amount=Decimal('40.00'), payment_date=noon)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_close_snapshots_totals_per_source_and_method(self):
+        close = close_day(self.yesterday, self.user)
+        self.assertEqual((close.transaction_count, close.total_amount), (3, Decimal('90.00')))
+        lines = {
+            (line.source, line.payment_method): (line.transaction_count, line.amount)
+            for line in DailyCashSnapshot.objects.filter(close=close)
+        }
+        self.assertEqual(lines, {
+            (DailyCashSnapshot.SALE, Sale.CASH): (2, Decimal('50.00')),
+            (DailyCashSnapshot.DEBT_PAYMENT, DebtPayment.CASH): (1, Decimal('40.00')),
+        })
+        with self.assertRaises(DayAlreadyClosed):
+            close_day(self.yesterday)
+
+    def test_a_concurrent_close_of_the_same_day_is_reported_as_closed(self):
+        def close_meanwhile(day):
+            DailyClose.objects.create(date=day)
+            return totals(day)
+
+        totals = cashup.day_totals
+        with mock.patch.object(cashup, 'day_totals', close_meanwhile):
+            response = self.client.post('/api/reports/close-day/', {'date': self.yesterday.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(DailyClose.objects.count(), 1)
+        self.assertFalse(DailyCashSnapshot.objects.exists())
+
+    def test_only_finished_days_can_be_closed(self):
+        with self.assertRaises(ValueError):
+            close_day(timezone.localdate())
+
+        response = self.client.post('/api/reports/close-day/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/reports/close-day/', {'date': timezone.localdate().isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DailyClose.objects.exists())
 
-# Create your tests here.
+        response = self.client.post('/api/reports/close-day/', {'date': self.yesterday.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_amount'], Decimal('90.00'))
+        again = self.client.post('/api/reports/close-day/', {'date': self.yesterday.isoformat()}, format='json')
+        self.assertEqual(again.status_code, 409)
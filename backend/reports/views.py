@@ -15,6 +15,7 @@ from inventory.models import Material
 from purchases.models import PurchaseOrderItem, PurchaseOrder
 from sales.models import SaleItem, Sale
 from users.permissions import IsAdminOrManagerOrReadOnly
+from .cashup import DayAlreadyClosed, cash_up_report, close_day as close_business_day
 
 
 class ReportViewSet(viewsets.ViewSet):
@@ -89,6 +90,35 @@ class ReportViewSet(viewsets.ViewSet):
             'end_date': end.date() if end else None,
         })
 
+    @action(detail=False, methods=['get'], url_path='cash-up')
+    def cash_up(self, request):
+        """
+        Cash-up figures for closed days, read from the daily snapshots.
+        Query params: start_date, end_date (default: the last 30 days).
+        """
+        start, end = self._parse_dates(request)
+        end_date = end.date() if end else timezone.localdate()
+        start_date = start.date() if start else end_date - timezone.timedelta(days=29)
+        return Response(cash_up_report(start_date, end_date))
+
+    @action(detail=False, methods=['post'], url_path='close-day')
+    def close_day(self, request):
+        """
+        Close a finished business day, storing its cash-up snapshot.
+        Body: date (YYYY-MM-DD, required; before today).
+        """
+        day = request.data.get('date')
+        if not day:
+            return Response({'detail': 'date is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            day = timezone.datetime.strptime(day, '%Y-%m-%d').date()
+            close = close_business_day(day, request.user)
+        except DayAlreadyClosed as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        except (TypeError, ValueError) as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(cash_up_report(close.date, close.date), status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def export(self, request):
         """
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from sales.models import MaterialDailySales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-material daily sales aggregate from sale items'
+
+    def handle(self, *args, **options):
+        MaterialDailySales.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {MaterialDailySales.objects.count()} material daily sales rows.'
+        ))
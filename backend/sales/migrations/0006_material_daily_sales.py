@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_remove_sku_barcode_brand_fields'),
+        ('sales', '0005_sale_sales_sale_sale_da_2fd927_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.material')),
+            ],
+            options={
+                'verbose_name': 'material daily sales',
+                'verbose_name_plural': 'material daily sales',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'material', 'quantity'], name='sales_mater_date_f3405e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('material', 'date'), name='unique_material_daily_sales')],
+            },
+        ),
+    ]
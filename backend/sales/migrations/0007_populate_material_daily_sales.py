@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate(apps, schema_editor):
+    """Build the daily aggregate from existing sale items of sales that are not deleted."""
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    MaterialDailySales = apps.get_model('sales', 'MaterialDailySales')
+
+    rows = SaleItem.objects.filter(sale__is_deleted=False).annotate(
+        date=TruncDate('sale__sale_date')
+    ).values('material_id', 'date').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(F('quantity') * F('price')),
+        sales=Count('sale_id', distinct=True),
+    ).order_by()
+    MaterialDailySales.objects.bulk_create(
+        (
+            MaterialDailySales(
+                material_id=row['material_id'], date=row['date'],
+                quantity=row['total_quantity'], revenue=row['total_revenue'], sale_count=row['sales'],
+            )
+            for row in rows.iterator(chunk_size=5000)
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_material_daily_sales'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
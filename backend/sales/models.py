@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from django.conf import settings
@@ -54,6 +59,9 @@ class Sale(models.Model):
         ordering = ['-sale_date']
         verbose_name = _('sale')
         verbose_name_plural = _('sales')
+        indexes = [
+            models.Index(fields=['sale_date']),
+        ]
 
     def __str__(self):
         return f"Sale #{self.id} to {self.customer.name} on {self.sale_date.date()}"
@@ -84,4 +92,94 @@ class SaleItem(models.Model):
     )
 
     def __str__(self):
-        return f"{self.quantity}× {self.material.name} @ {self.price}"
\ No newline at end of file
+        return f"{self.quantity}× {self.material.name} @ {self.price}"
+
+
+class MaterialDailySalesManager(models.Manager):
+    """Keeps the per-material, per-day sales aggregate in step with sale writes."""
+    
+    def record_sale(self, sale, sign=1):
+        """Add (sign=1) or remove (sign=-1) a sale's items from the aggregate for its sale date."""
+        items = sale.items.values_list('material_id', 'quantity', 'price')
+        return self.record_items(timezone.localdate(sale.sale_date), items, sign)
+    
+    def record_items(self, day, items, sign=1):
+        """Apply (material_id, quantity, price) rows to the aggregate row of each material for ``day``."""
+        totals = {}
+        for material_id, quantity, price in items:
+            quantity_total, revenue_total = totals.get(material_id, (Decimal('0'), Decimal('0')))
+            totals[material_id] = (quantity_total + quantity, revenue_total + quantity * price)
+        if not totals:
+            return
+        
+        with transaction.atomic(using=self.db):
+            # Make sure every row exists, then increment in place so concurrent sales never lose updates
+            self.bulk_create(
+                [self.model(material_id=material_id, date=day) for material_id in totals],
+                ignore_conflicts=True,
+            )
+            for material_id, (quantity, revenue) in totals.items():
+                self.filter(material_id=material_id, date=day).update(
+                    quantity=F('quantity') + sign * quantity,
+                    revenue=F('revenue') + sign * revenue,
+                    sale_count=F('sale_count') + sign,
+                )
+    
+    def rebuild(self):
+        """Recompute the whole aggregate from sale items of sales that are not deleted."""
+        rows = SaleItem.objects.filter(sale__is_deleted=False).annotate(
+            date=TruncDate('sale__sale_date')
+        ).values('material_id', 'date').annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum(F('quantity') * F('price')),
+            sales=Count('sale_id', distinct=True),
+        ).order_by()
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        material_id=row['material_id'], date=row['date'],
+                        quantity=row['total_quantity'], revenue=row['total_revenue'], sale_count=row['sales'],
+                    )
+                    for row in rows.iterator(chunk_size=5000)
+                ),
+                batch_size=5000,
+            )
+    
+    def leaderboard(self, since=None, category_ids=None, limit=5):
+        """Top materials by quantity sold on or after ``since``."""
+        queryset = self.all()
+        if since is not None:
+            queryset = queryset.filter(date__gte=since)
+        if category_ids:
+            queryset = queryset.filter(material__category_id__in=category_ids)
+        return queryset.values('material_id', 'material__name').annotate(
+            total_sold=Sum('quantity'), total_revenue=Sum('revenue')
+        ).order_by('-total_sold', 'material_id')[:limit]
+
+
+class MaterialDailySales(models.Model):
+    """Quantity and revenue sold per material per day, maintained on sale writes."""
+    
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    sale_count = models.IntegerField(default=0)
+    
+    objects = MaterialDailySalesManager()
+    
+    class Meta:
+        verbose_name = _('material daily sales')
+        verbose_name_plural = _('material daily sales')
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['material', 'date'], name='unique_material_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'material', 'quantity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.material.name} on {self.date}: {self.quantity}"
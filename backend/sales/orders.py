@@ -0,0 +1,107 @@
+"""
+Order writing shared by the sale and credit-sale endpoints.
+
+A sale locks every material it touches with one SELECT ... FOR UPDATE in
+primary key order (so concurrent orders cannot deadlock on each other),
+decrements stock with conditional UPDATEs that never let it go below zero,
+and writes its lines with one bulk insert. The sale row is created with its
+final total, so the credit-sale signal in debts.models inserts exactly one
+debt for it.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from debts.exposure import check_credit_limit
+from inventory import costing, replenishment
+from inventory.models import Material
+
+from .models import MaterialDailySales, Sale, SaleItem
+
+
+class InsufficientStock(Exception):
+    """Raised when a material does not have enough stock for an order."""
+
+    def __init__(self, material):
+        self.material = material
+        super().__init__(f"Insufficient stock for {material.name}.")
+
+
+def lock_materials(material_ids):
+    """Lock the given materials in primary key order and return them keyed by id."""
+    materials = Material.objects.select_for_update().filter(id__in=material_ids).order_by('id')
+    return {material.id: material for material in materials}
+
+
+def decrement_stock(materials, quantities):
+    """
+    Take ``quantities`` ({material_id: quantity}) out of stock.
+
+    Each UPDATE only applies while enough stock is left, so even a writer
+    that skipped the row lock cannot drive stock negative.
+    """
+    now = timezone.now()
+    for material_id in sorted(quantities):
+        material, quantity = materials[material_id], quantities[material_id]
+        updated = Material.objects.filter(id=material_id, quantity_in_stock__gte=quantity).update(
+            quantity_in_stock=F('quantity_in_stock') - quantity, updated_at=now
+        )
+        if not updated:
+            raise InsufficientStock(material)
+        material.quantity_in_stock -= quantity
+        costing.issue(material, quantity)
+
+
+@transaction.atomic
+def write_sale(customer, items, user, payment_method=Sale.CASH, payment_status=Sale.PAID,
+               tax=Decimal('0'), discount=Decimal('0'), due_date=None, debt_fields=None):
+    """
+    Create a sale with its lines and take the stock out.
+
+    ``items`` are (material_id, quantity, price) with Decimal quantity and
+    price. ``debt_fields`` (interest_rate, payment_terms, notes) are passed
+    to the debt created for a credit sale. Raises InsufficientStock,
+    Material.DoesNotExist or debts.exposure.CreditLimitExceeded; nothing is
+    written in that case.
+    """
+    quantities = {}
+    for material_id, quantity, _ in items:
+        quantities[material_id] = quantities.get(material_id, Decimal('0')) + quantity
+
+    materials = lock_materials(quantities)
+    missing = set(quantities) - set(materials)
+    if missing:
+        raise Material.DoesNotExist(f"Material {min(missing)} does not exist.")
+
+    total_amount = sum((quantity * price for _, quantity, price in items), Decimal('0')) + tax - discount
+    if payment_method == Sale.CREDIT and customer is not None:
+        # Materials, then the customer: the order the debt's ledger entry locks them in
+        check_credit_limit(customer.pk, total_amount)
+    decrement_stock(materials, quantities)
+
+    sale = Sale(
+        customer=customer,
+        tax=tax,
+        discount=discount,
+        total_amount=total_amount,
+        payment_method=payment_method,
+        payment_status=payment_status,
+        due_date=due_date,
+        created_by=user,
+    )
+    # Read by create_debt_for_credit_sale
+    sale._debt_fields = debt_fields or {}
+    sale.save()
+
+    SaleItem.objects.bulk_create([
+        SaleItem(sale=sale, material_id=material_id, quantity=quantity, price=price)
+        for material_id, quantity, price in items
+    ])
+    MaterialDailySales.objects.record_items(
+        timezone.localdate(sale.sale_date), items
+    )
+    # Bulk inserts and UPDATEs send no signals
+    replenishment.invalidate()
+    return sale
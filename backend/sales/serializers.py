@@ -1,8 +1,14 @@
 # sales/serializers.py
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.db import transaction
-from .models import Sale, SaleItem
+from django.utils import timezone
+from .models import MaterialDailySales, Sale, SaleItem
+from .orders import InsufficientStock, lock_materials, write_sale
+from inventory import costing
 from inventory.models import Material
+from debts.exposure import CreditLimitExceeded, check_credit_limit
 
 class SaleItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,25 +34,8 @@ class SaleSerializer(serializers.ModelSerializer):
         return value
     
     def validate(self, data):
-        """Custom validation for sales, including credit limit checks."""
-        customer = data.get('customer')
+        """Custom validation for sales; the credit limit is checked when the sale is written."""
         payment_method = data.get('payment_method')
-        items = data.get('items', [])
-        
-        # Calculate total amount - use Decimal for consistency
-        from decimal import Decimal
-        
-        total = Decimal('0')
-        for item in items:
-            quantity = Decimal(str(item['quantity']))
-            price = Decimal(str(item['price']))
-            total += quantity * price
-        
-        # Add tax, subtract discount
-        tax = Decimal(str(data.get('tax', 0)))
-        discount = Decimal(str(data.get('discount', 0)))
-        total += tax
-        total -= discount
         
         # Credit sale validation
         if payment_method == Sale.CREDIT:
@@ -54,19 +43,6 @@ class SaleSerializer(serializers.ModelSerializer):
             if not data.get('due_date'):
                 raise serializers.ValidationError("Due date is required for credit sales.")
             
-            # Check customer credit limit
-            if customer and customer.credit_limit > 0:
-                current_outstanding = Decimal(str(customer.outstanding_balance or 0))
-                credit_limit = Decimal(str(customer.credit_limit))
-                
-                if current_outstanding + total > credit_limit:
-                    available_credit = credit_limit - current_outstanding
-                    raise serializers.ValidationError(
-                        f"This sale would exceed customer's credit limit of ${float(credit_limit):,.2f}. "
-                        f"Current outstanding: ${float(current_outstanding):,.2f}, Sale amount: ${float(total):,.2f}, "
-                        f"Available credit: ${float(available_credit):,.2f}"
-                    )
-            
             # Set payment status for credit sales
             data['payment_status'] = Sale.PENDING
         else:
@@ -77,46 +53,45 @@ class SaleSerializer(serializers.ModelSerializer):
         
         return data
 
-    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        user = self.context['request'].user
-
-        # initial create to get an ID
-        sale = Sale.objects.create(**validated_data, created_by=user)
-        total = 0
-        for item in items_data:
-            mat = Material.objects.select_for_update().get(pk=item['material'].id)
-            if mat.quantity_in_stock < item['quantity']:
-                raise serializers.ValidationError(
-                    f"Insufficient stock for {mat.name}."
-                )
-            # decrement stock
-            mat.quantity_in_stock -= item['quantity']
-            mat.save()
-
-            # create line item
-            line = SaleItem.objects.create(
-                sale=sale,
-                material=mat,
-                quantity=item['quantity'],
-                price=item['price']
+        try:
+            return write_sale(
+                user=self.context['request'].user,
+                items=[(item['material'].id, item['quantity'], item['price']) for item in items_data],
+                **validated_data,
             )
-            total += line.quantity * line.price
-
-        # compute and save total_amount
-        sale.total_amount = total + sale.tax - sale.discount
-        sale.save(update_fields=['total_amount'])
-        return sale
+        except (InsufficientStock, CreditLimitExceeded) as e:
+            raise serializers.ValidationError(str(e))
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        customer = validated_data.get('customer', instance.customer)
+        if validated_data.get('payment_method', instance.payment_method) == Sale.CREDIT and customer:
+            items = validated_data.get('items', [])
+            total = sum((item['quantity'] * item['price'] for item in items), Decimal('0'))
+            total += validated_data.get('tax', instance.tax) - validated_data.get('discount', instance.discount)
+            # Only the increase over what this sale already owes is new credit
+            owed = instance.total_amount if instance.payment_method == Sale.CREDIT else Decimal('0')
+            # Materials first, then the customer, as write_sale locks them
+            lock_materials({old.material_id for old in instance.items.all()} | {item['material'].id for item in items})
+            try:
+                check_credit_limit(customer.pk, total - owed)
+            except CreditLimitExceeded as e:
+                raise serializers.ValidationError(str(e))
         # simple approach: restore previous stock, then reapply new items
         old_items = list(instance.items.all())
+        if not instance.is_deleted:
+            MaterialDailySales.objects.record_items(
+                timezone.localdate(instance.sale_date),
+                [(old.material_id, old.quantity, old.price) for old in old_items],
+                sign=-1,
+            )
         for old in old_items:
             mat = Material.objects.select_for_update().get(pk=old.material_id)
             mat.quantity_in_stock += old.quantity
             mat.save()
+            costing.restock(mat, old.quantity)
         instance.items.all().delete()
 
         # update fields
@@ -135,6 +110,7 @@ class SaleSerializer(serializers.ModelSerializer):
                 )
             mat.quantity_in_stock -= item['quantity']
             mat.save()
+            costing.issue(mat, item['quantity'])
             line = SaleItem.objects.create(
                 sale=instance,
                 material=mat,
@@ -145,4 +121,6 @@ class SaleSerializer(serializers.ModelSerializer):
 
         instance.total_amount = total + instance.tax - instance.discount
         instance.save(update_fields=['total_amount'])
+        if not instance.is_deleted:
+            MaterialDailySales.objects.record_sale(instance)
         return instance
@@ -1,3 +1,78 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from inventory.models import Category
+from inventory.tests import CatalogMixin
+from users.models import User
+
+from .models import MaterialDailySales, Sale
+
+
+class TopSellingLeaderboardTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cement = self.make_material('Cement', '100')
+        self.sand = self.make_material('Sand', '100')
+        self.tools = Category.objects.create(name='Tools')
+        self.trowel = self.make_material('Trowel', '100')
+        self.trowel.category = Category.objects.create(name='Hand tools', parent=self.tools)
+        self.trowel.save()
+
+        user = User.objects.create_user(email='cashier@example.com', password='x', role=User.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.customer = Customer.objects.create(name='Builder', phone='123')
+
+    def sell(self, *lines):
+        response = self.client.post('/api/sales/orders/', {
+            'customer': self.customer.id,
+            'payment_method': Sale.CASH,
+            'tax': '0.00',
+            'discount': '0.00',
+            'items': [
+                {'material': material.id, 'quantity': quantity, 'price': '12.00'} for material, quantity in lines
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def leaderboard(self, **params):
+        response = self.client.get('/api/dashboard/top-selling-materials/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['material__name'], row['total_sold']) for row in response.data]
+
+    def test_sales_are_aggregated_and_deleted_sales_removed(self):
+        self.sell((self.cement, '3'), (self.sand, '5'))
+        second = self.sell((self.cement, '4'))
+        self.sell((self.trowel, '1'))
+        self.assertEqual(
+            self.leaderboard(),
+            [('Cement', Decimal('7.00')), ('Sand', Decimal('5.00')), ('Trowel', Decimal('1.00'))],
+        )
+        cement = MaterialDailySales.objects.get(material=self.cement)
+        self.assertEqual((cement.date, cement.revenue, cement.sale_count), (timezone.localdate(), Decimal('84.00'), 2))
+
+        self.client.delete(f'/api/sales/orders/{second}/')
+        self.assertEqual(self.leaderboard(limit=1), [('Sand', Decimal('5.00'))])
+
+        maintained = list(MaterialDailySales.objects.order_by('material_id').values_list('material_id', 'quantity'))
+        MaterialDailySales.objects.rebuild()
+        self.assertEqual(
+            list(MaterialDailySales.objects.order_by('material_id').values_list('material_id', 'quantity')),
+            [row for row in maintained if row[1]],
+        )
 
-# Create your tests here.
+    def test_window_and_category_filters(self):
+        self.sell((self.cement, '3'), (self.trowel, '2'))
+        MaterialDailySales.objects.record_items(
+            timezone.localdate() - timedelta(days=10), [(self.sand.id, Decimal('9'), Decimal('5'))]
+        )
+        self.assertEqual(self.leaderboard()[0], ('Sand', Decimal('9.00')))
+        self.assertEqual([name for name, _ in self.leaderboard(window='7d')], ['Cement', 'Trowel'])
+        self.assertEqual(self.leaderboard(category=self.tools.id), [('Trowel', Decimal('2.00'))])
+        self.assertEqual(self.client.get('/api/dashboard/top-selling-materials/', {'window': '2w'}).status_code, 400)
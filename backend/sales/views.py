@@ -3,12 +3,13 @@ from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
-from .models import Sale
+from .models import MaterialDailySales, Sale
 from .serializers import SaleSerializer
 from users.permissions import IsAdminOrManagerOrReadOnly
+from users.idempotency import IdempotentCreateMixin
 from users.models import UserActivity
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     API endpoints for creating and managing sales orders.
     """
@@ -43,6 +44,7 @@ class SaleViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         instance.is_deleted = True
         instance.save()
+        MaterialDailySales.objects.record_sale(instance, sign=-1)
         UserActivity.objects.create(
             user=self.request.user,
             action="Sale Deleted",
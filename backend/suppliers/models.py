@@ -1,6 +1,8 @@
 # suppliers/models.py
 
 from django.db import models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
@@ -64,6 +66,28 @@ class SupplierContact(models.Model):
         return f"{self.name} - {self.supplier.name}"
 
 
+class SupplierMaterialManager(models.Manager):
+    """Supplier terms lookups used when ordering materials."""
+    
+    def preferred_for(self, material_ids, active_only=True):
+        """
+        The supplier row to order each material from: the preferred one, else the
+        cheapest, among active suppliers unless ``active_only`` is False. Keyed by
+        material id; one query.
+        """
+        rows = self.filter(material_id__in=material_ids)
+        if active_only:
+            rows = rows.filter(supplier__is_active=True)
+        rows = rows.annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F('material_id')],
+                order_by=[F('is_preferred').desc(), F('unit_price').asc(), F('id').asc()],
+            )
+        ).filter(rank=1).select_related('supplier', 'material__unit')
+        return {row.material_id: row for row in rows}
+
+
 class SupplierMaterial(models.Model):
     """Model for tracking supplier-specific material information."""
     
@@ -78,6 +102,8 @@ class SupplierMaterial(models.Model):
     last_purchase_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
     
+    objects = SupplierMaterialManager()
+    
     class Meta:
         verbose_name = _('supplier material')
         verbose_name_plural = _('supplier materials')
@@ -1,3 +1,59 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from inventory.tests import CatalogMixin
+from users.models import User
+
+from .models import Supplier, SupplierMaterial
+
+
+class PreferredSupplierTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.cheap = Supplier.objects.create(name='Cheap Co', phone='2', address='-', city='-')
+        self.closed = Supplier.objects.create(name='Closed Co', phone='3', address='-', city='-', is_active=False)
+        self.cement = self.make_material('Cement', '0')
+        self.sand = self.make_material('Sand', '0')
+        self.gravel = self.make_material('Gravel', '0')
+        for supplier, material, price, preferred in [
+            (self.supplier, self.cement, '5.00', True), (self.cheap, self.cement, '3.00', False),
+            (self.supplier, self.sand, '5.00', False), (self.cheap, self.sand, '3.00', False),
+            (self.closed, self.sand, '1.00', True), (self.closed, self.gravel, '1.00', False),
+        ]:
+            SupplierMaterial.objects.create(
+                supplier=supplier, material=material, unit_price=Decimal(price), is_preferred=preferred,
+                lead_time_days=4, minimum_order_quantity=Decimal('10'),
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email='buyer@example.com', password='x', role=User.ADMIN)
+        )
+
+    def test_preferred_else_cheapest_active_supplier(self):
+        preferred = SupplierMaterial.objects.preferred_for([self.cement.id, self.sand.id, self.gravel.id])
+        self.assertEqual(
+            {material_id: row.supplier_id for material_id, row in preferred.items()},
+            {self.cement.id: self.supplier.id, self.sand.id: self.cheap.id},
+        )
+
+    def test_batch_endpoint_returns_terms_and_missing_ids(self):
+        ids = f'{self.sand.id},{self.gravel.id},{self.cement.id}'
+        response = self.client.get('/api/suppliers/materials/preferred-suppliers/', {'material_ids': ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['material'], row['supplier'], row['lead_time_days']) for row in response.data['results']],
+            [(self.cement.id, self.supplier.id, 4), (self.sand.id, self.cheap.id, 4)],
+        )
+        self.assertEqual(response.data['missing'], [self.gravel.id])
+
+        bad = self.client.get('/api/suppliers/materials/preferred-suppliers/', {'material_ids': 'cement'})
+        self.assertEqual(bad.status_code, 400)
 
-# Create your tests here.
+    def test_single_material_endpoint_still_considers_inactive_suppliers(self):
+        for material, supplier in [(self.sand, self.closed), (self.gravel, self.closed), (self.cement, self.supplier)]:
+            response = self.client.get('/api/suppliers/materials/preferred_supplier/', {'material_id': material.id})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['supplier'], supplier.id)
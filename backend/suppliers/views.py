@@ -21,6 +21,10 @@ from users.permissions import (
 from users.models import UserActivity
 
 
+# Most material ids one preferred-suppliers request may resolve
+MAX_PREFERRED_LOOKUPS = 1000
+
+
 class SupplierViewSet(viewsets.ModelViewSet):
     """API endpoints for supplier management."""
     
@@ -152,16 +156,9 @@ class SupplierMaterialViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            supplier_material = SupplierMaterial.objects.filter(
-                material_id=material_id, 
-                is_preferred=True
-            ).first()
-            
-            if not supplier_material:
-                # If no preferred supplier, get the one with lowest price
-                supplier_material = SupplierMaterial.objects.filter(
-                    material_id=material_id
-                ).order_by('unit_price').first()
+            supplier_material = SupplierMaterial.objects.preferred_for(
+                [material_id], active_only=False
+            ).get(int(material_id))
             
             if supplier_material:
                 serializer = self.get_serializer(supplier_material)
@@ -176,4 +173,38 @@ class SupplierMaterialViewSet(viewsets.ModelViewSet):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+    
+    @action(detail=False, methods=['get'], url_path='preferred-suppliers')
+    def preferred_suppliers(self, request):
+        """
+        Preferred (else cheapest) supplier, with lead time and minimum order
+        quantity, for many materials in one query: ?material_ids=1,2,3
+        """
+        material_ids = request.query_params.get('material_ids', '').split(',')
+        try:
+            material_ids = sorted({int(pk) for pk in material_ids if pk.strip()})
+        except ValueError:
+            return Response(
+                {'error': _('material_ids must be a comma-separated list of ids')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not material_ids:
+            return Response(
+                {'error': _('material_ids parameter is required')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(material_ids) > MAX_PREFERRED_LOOKUPS:
+            return Response(
+                {'error': _('At most %(max)d material ids per request') % {'max': MAX_PREFERRED_LOOKUPS}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        preferred = SupplierMaterial.objects.preferred_for(material_ids)
+        serializer = self.get_serializer(
+            [preferred[pk] for pk in material_ids if pk in preferred], many=True
+        )
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in material_ids if pk not in preferred],
+        })
@@ -0,0 +1,97 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client that may retry a POST sends an Idempotency-Key header. The first
+request with a key runs normally and its response is stored against the
+user and key; a retry with the same key and the same body gets the stored
+response back without running the view again. The key row is locked while
+the first request runs, so a concurrent duplicate waits for it to finish
+and then replays its response instead of racing it.
+
+Only successful (2xx) responses are stored. When the view raises or answers
+with any 4xx or 5xx status the key is released along with anything the view
+wrote, so the same request can be corrected or retried with the same key and
+a rejected request behaves the same whether it was rejected by a raised
+ValidationError or by an error response. Keys expire after
+IDEMPOTENCY_KEY_TTL seconds; purge_idempotency_keys deletes expired rows.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+
+
+def request_hash(request):
+    """Fingerprint of what a request asks for: method, path and body."""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}\n{request.path}\n{body}'.encode()).hexdigest()
+
+
+def idempotent_response(request, handler):
+    """Run ``handler`` once per Idempotency-Key, replaying the stored response on retries."""
+    key = request.headers.get(HEADER)
+    if not key or not request.user.is_authenticated:
+        return handler()
+    if len(key) > 255:
+        return Response({'detail': f'{HEADER} must be at most 255 characters.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    digest = request_hash(request)
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+    with transaction.atomic():
+        # A concurrent request with the same key blocks here until the first one commits
+        IdempotencyKey.objects.bulk_create(
+            [IdempotencyKey(user=request.user, key=key, request_hash=digest, path=request.path,
+                            expires_at=now + ttl)],
+            ignore_conflicts=True,
+        )
+        record = IdempotencyKey.objects.select_for_update().get(user=request.user, key=key)
+
+        if record.expires_at <= now:
+            record.request_hash, record.path = digest, request.path
+            record.response_status, record.response_body = None, ''
+            record.expires_at = now + ttl
+        elif record.request_hash != digest:
+            return Response({'detail': f'{HEADER} was already used for a different request.'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        elif record.response_status is not None:
+            return Response(json.loads(record.response_body or 'null'), status=record.response_status,
+                            headers={'Idempotent-Replayed': 'true'})
+
+        response = handler()
+        if not status.is_success(response.status_code):
+            # Nothing is kept, so the client can retry with the same key
+            transaction.set_rollback(True)
+            return response
+        record.response_status = response.status_code
+        record.response_body = JSONRenderer().render(response.data).decode()
+        record.save()
+    return response
+
+
+def idempotent(view):
+    """Decorator for function views (inside @api_view) that honours Idempotency-Key."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return idempotent_response(request, lambda: view(request, *args, **kwargs))
+    return wrapper
+
+
+class IdempotentCreateMixin:
+    """ViewSet mixin that makes create() honour Idempotency-Key."""
+
+    def create(self, request, *args, **kwargs):
+        return idempotent_response(request, lambda: super(IdempotentCreateMixin, self).create(request, *args, **kwargs))